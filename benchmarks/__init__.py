@@ -0,0 +1,6 @@
+import os
+
+# benchmarks run against a local, in-memory setup
+os.environ.setdefault("SLACK_TOKEN", "xoxb-00000000")
+os.environ.setdefault("SLACK_SIGNING_SECRET", "1b5d1a00001001010be0a59fce1b8977")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
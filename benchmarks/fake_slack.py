@@ -0,0 +1,153 @@
+"""
+A local stand-in for the Slack Web API methods used by the app, to load test
+it without hitting Slack. Run the app with `SLACK_API_URL=http://HOST:PORT/api/`.
+
+    python -m benchmarks.fake_slack [--port PORT] [--latency SECONDS]
+        [--rate-limited RATIO] [--members N] [--page-size N]
+
+- conversations.members: N members per channel, paginated with cursors
+- usergroups.users.list: N members per usergroup
+- users.info: users in the UTC timezone
+- chat.postMessage: messages are recorded, with the time they were received
+
+Every call waits for the latency (with +/- 50% jitter), and a ratio of them
+are answered with 429 Too Many Requests. `POST /response/<id>` accepts the
+messages sent to the response URLs of actions. `GET /_stats` returns the
+number of calls by method, the number of 429 responses and the messages
+(`?since=<timestamp>` for the messages received since), `POST /_reset`
+clears them.
+"""
+import argparse
+import asyncio
+from collections import Counter
+import random
+import time
+
+from sanic import Sanic, response
+
+
+app = Sanic("fake_slack", configure_logging=False)
+app.config.LATENCY = 0.05
+app.config.RATE_LIMITED = 0.0
+app.config.MEMBERS = 20
+app.config.PAGE_SIZE = 100
+
+calls: Counter = Counter()
+messages = []
+
+
+def get_params(request):
+    """
+    Merge the parameters of the query string, form or JSON body.
+    """
+    params = {name: values[0] for name, values in request.args.items()}
+    if request.form:
+        params.update((name, values[0]) for name, values in request.form.items())
+    elif request.body and request.content_type.startswith("application/json"):
+        params.update(request.json)
+    return params
+
+
+def make_members(target):
+    return [f"U{target[1:]}{index:04}" for index in range(app.config.MEMBERS)]
+
+
+def ok(body):
+    return response.json({"ok": True, **body})
+
+
+@app.middleware("request")
+async def simulate_slack(request):
+    if not request.path.startswith("/api/"):
+        return None
+    method = request.path[len("/api/") :]
+    calls[method] += 1
+    latency = app.config.LATENCY
+    await asyncio.sleep(random.uniform(latency * 0.5, latency * 1.5))
+    if random.random() < app.config.RATE_LIMITED:
+        calls["429"] += 1
+        return response.json(
+            {"ok": False, "error": "ratelimited"},
+            status=429,
+            headers={"Retry-After": "1"},
+        )
+    return None
+
+
+@app.route("/api/conversations.members", methods=["GET", "POST"])
+async def conversations_members(request):
+    params = get_params(request)
+    members = make_members(params["channel"])
+    start = int(params.get("cursor") or 0)
+    end = start + min(int(params.get("limit") or 100), app.config.PAGE_SIZE)
+    return ok(
+        {
+            "members": members[start:end],
+            "response_metadata": {
+                "next_cursor": str(end) if end < len(members) else ""
+            },
+        }
+    )
+
+
+@app.route("/api/usergroups.users.list", methods=["GET", "POST"])
+async def usergroups_users_list(request):
+    return ok({"users": make_members(get_params(request)["usergroup"])})
+
+
+@app.route("/api/users.info", methods=["GET", "POST"])
+async def users_info(request):
+    user_id = get_params(request)["user"]
+    return ok({"user": {"id": user_id, "tz": "UTC"}, "tz": "UTC"})
+
+
+@app.route("/api/chat.postMessage", methods=["POST"])
+async def chat_post_message(request):
+    params = get_params(request)
+    messages.append((time.time(), params["channel"], params["text"]))
+    return ok({"channel": params["channel"], "ts": f"{time.time():.6f}"})
+
+
+@app.route("/response/<response_id>", methods=["POST"])
+async def response_url(request, response_id):
+    calls["response_url"] += 1
+    return response.text("ok")
+
+
+@app.route("/_stats", methods=["GET"])
+async def stats(request):
+    since = float(request.args.get("since", 0))
+    return response.json(
+        {
+            "calls": calls,
+            "messages": [message for message in messages if message[0] >= since],
+        }
+    )
+
+
+@app.route("/_reset", methods=["POST"])
+async def reset(request):
+    calls.clear()
+    messages.clear()
+    return response.text("ok")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=app.config.LATENCY)
+    parser.add_argument("--rate-limited", type=float, default=0.0)
+    parser.add_argument("--members", type=int, default=app.config.MEMBERS)
+    parser.add_argument("--page-size", type=int, default=app.config.PAGE_SIZE)
+    args = parser.parse_args()
+
+    app.config.LATENCY = args.latency
+    app.config.RATE_LIMITED = args.rate_limited
+    app.config.MEMBERS = args.members
+    app.config.PAGE_SIZE = args.page_size
+    app.run(host=args.host, port=args.port, access_log=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Measure the rendering of job lists, with trigger descriptions computed from
+scratch, memoized, or stored with the jobs.
+
+    python -m benchmarks.format_scheduled_jobs [--number N]
+"""
+import argparse
+import asyncio
+import itertools
+import timeit
+
+from apscheduler.job import Job
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+
+from randompicker import format as format_
+from randompicker.slack_utils import pick_user_and_send_message
+
+
+JOB_COUNTS = (100, 300, 500)
+DAYS_OF_WEEK = ("mon", "tue", "wed", "thu", "fri", "mon,thu", "mon-fri")
+
+
+def make_jobs(count, named):
+    """
+    Make jobs spread over channels, usergroups and triggers.
+    """
+    scheduler = AsyncIOScheduler()
+    triggers = itertools.cycle(
+        CronTrigger(day_of_week=day_of_week, hour=str(hour), minute="0", week=week)
+        for day_of_week in DAYS_OF_WEEK
+        for hour in range(8, 18)
+        for week in ("*", "*/2")
+    )
+    jobs = []
+    for index, trigger in zip(range(count), triggers):
+        kwargs = {
+            "func": pick_user_and_send_message,
+            "args": (),
+            "kwargs": {
+                "channel_id": "C0001",
+                "target": f"{'CS'[index % 2]}{index % 40:04}",
+                "task": "play music",
+            },
+            "trigger": trigger,
+        }
+        if named:
+            kwargs["name"] = format_.format_trigger(trigger)
+        jobs.append(Job(scheduler, id=f"T1-U1-{index:040}", **kwargs))
+    return jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    print(f"{'jobs':>6}{'no cache':>12}{'memoized':>12}{'stored':>12}")
+    for count in JOB_COUNTS:
+        legacy_jobs = make_jobs(count, named=False)
+        named_jobs = make_jobs(count, named=True)
+
+        def render(jobs, clear_memo=False):
+            if clear_memo:
+                format_._format_cron_fields.cache_clear()
+            loop.run_until_complete(format_.format_scheduled_jobs("C0001", jobs))
+
+        timings = [
+            timeit.timeit(lambda: render(legacy_jobs, True), number=args.number),
+            timeit.timeit(lambda: render(legacy_jobs), number=args.number),
+            timeit.timeit(lambda: render(named_jobs), number=args.number),
+        ]
+        print(
+            f"{count:>6}"
+            + "".join(f"{timing / args.number * 1000:>10.2f}ms" for timing in timings)
+        )
+
+
+if __name__ == "__main__":
+    main()
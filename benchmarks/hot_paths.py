@@ -0,0 +1,200 @@
+"""
+Measure the hot paths of commands, job lists and picks, and compare them with
+the baselines saved in `benchmarks/baselines.json`.
+
+    python -m benchmarks.hot_paths [--filter TEXT] [--repeat N] [--save] [--check]
+
+Each case is timed over enough calls to last 0.2s, several times, and the best
+time per call is kept: it is the least affected by the noise of the machine.
+Baselines depend on the machine, save them again when it changes.
+"""
+import argparse
+import asyncio
+from datetime import datetime
+import json
+import os
+import random
+import sys
+import timeit
+
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+
+from randompicker import format as format_, jobs, parser, rotation
+
+from benchmarks.format_scheduled_jobs import make_jobs
+
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+# ratio to the baseline above which a case is reported as a regression
+DEFAULT_TOLERANCE = 1.5
+
+JOB_COUNTS = (10, 100, 1000)
+MEMBERS = [f"U{index:04}" for index in range(50)]
+
+
+def make_cases():
+    """
+    Return the benchmark cases, as (name, function) pairs. Fixtures are made
+    with a fixed random seed, so that all runs measure the same work.
+    """
+    random.seed(0)
+    loop = asyncio.get_event_loop()
+    parser.preload_parsers()
+    cases = [
+        (
+            "parse_command, immediate",
+            lambda: parser.parse_command("<#C012X7LEUSV|general> to play music"),
+        ),
+        (
+            "parse_command, recurring",
+            lambda: parser.parse_command(
+                "<!subteam^S013R9HGXJ5|test-group> 2 people to review the "
+                "pull requests every Monday and Thursday at 10:30"
+            ),
+        ),
+    ]
+
+    for frequency in (
+        "every day at 10am",
+        "every weekday at 9am",
+        "every other Wednesday at 2pm",
+        "every first Monday of the month",
+        "next Monday at 9am",
+    ):
+        cases.append(
+            (
+                f"parse_frequency, {frequency}",
+                lambda frequency=frequency: parser.parse_frequency(frequency),
+            )
+        )
+
+    cron_trigger = CronTrigger(
+        day_of_week="mon,thu", hour="10", minute="30", timezone="UTC"
+    )
+    date_trigger = DateTrigger(run_date=datetime(2020, 6, 10, 12), timezone="UTC")
+    cases += [
+        ("format_trigger, cron", lambda: format_.format_trigger(cron_trigger)),
+        ("format_trigger, date", lambda: format_.format_trigger(date_trigger)),
+    ]
+
+    for count in JOB_COUNTS:
+        job_list = make_jobs(count, named=True)
+        cases.append(
+            (
+                f"format_scheduled_jobs, {count} jobs",
+                lambda job_list=job_list: loop.run_until_complete(
+                    format_.format_scheduled_jobs("C0001", job_list)
+                ),
+            )
+        )
+    job_list = make_jobs(1000, named=True)
+    cases.append(
+        (
+            "split_jobs_by_category, 1000 jobs",
+            lambda: format_.split_jobs_by_category("C0001", job_list),
+        )
+    )
+
+    recurring_event = parser.parse_frequency("every day at 10am")
+    cases += [
+        (
+            "make_job_id, date",
+            lambda: jobs.make_job_id(
+                "T1", "U1", "play music", "C1234", datetime(2020, 6, 10, 12)
+            ),
+        ),
+        (
+            "make_job_id, recurring",
+            lambda: jobs.make_job_id(
+                "T1", "U1", "play music", "C1234", recurring_event, count=2
+            ),
+        ),
+    ]
+
+    members = set(MEMBERS)
+    shuffle_bag = rotation.new_rotation(members)
+    changed_members = set(MEMBERS[1:] + ["U9999"])
+    weighted_state = rotation.pick_weighted(members)[1]
+    cases += [
+        (
+            "load_rotation + pick, 50 members",
+            lambda: rotation.pick_from_rotation(
+                rotation.load_rotation(members, shuffle_bag)
+            ),
+        ),
+        (
+            "sync_rotation, 1 joined 1 left",
+            lambda: rotation.sync_rotation(
+                {"order": list(shuffle_bag["order"]), "cursor": 25}, changed_members
+            ),
+        ),
+        (
+            "pick_weighted, 50 members",
+            lambda: rotation.pick_weighted(members, weighted_state),
+        ),
+        (
+            "pick_weighted 3 people, 50 members",
+            lambda: rotation.pick_weighted(members, weighted_state, count=3),
+        ),
+    ]
+    return cases
+
+
+def measure(func, repeat):
+    """
+    Return the best time per call of func, in seconds.
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, number)
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--filter", default="", help="only run matching cases")
+    argparser.add_argument("--repeat", type=int, default=5)
+    argparser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    argparser.add_argument(
+        "--save", action="store_true", help="save the results as baselines"
+    )
+    argparser.add_argument(
+        "--check", action="store_true", help="exit with an error on regressions"
+    )
+    args = argparser.parse_args()
+
+    baselines = {}
+    if os.path.exists(BASELINES_PATH):
+        with open(BASELINES_PATH) as f:
+            baselines = json.load(f)
+
+    results = {}
+    regressions = []
+    print(f"{'case':<48}{'time':>12}{'baseline':>12}{'ratio':>8}")
+    for name, func in make_cases():
+        if args.filter not in name:
+            continue
+        duration = results[name] = measure(func, args.repeat)
+        baseline = baselines.get(name)
+        line = f"{name:<48}{duration * 1e6:>10.2f}us"
+        if baseline:
+            ratio = duration / baseline
+            line += f"{baseline * 1e6:>10.2f}us{ratio:>7.2f}x"
+            if ratio > args.tolerance:
+                line += "  REGRESSION"
+                regressions.append(name)
+        print(line)
+
+    if args.save:
+        with open(BASELINES_PATH, "w") as f:
+            json.dump({**baselines, **results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved baselines to {BASELINES_PATH}")
+    if args.check and regressions:
+        sys.exit(f"Regressions: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
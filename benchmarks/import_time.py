@@ -0,0 +1,75 @@
+"""
+Measure how long it takes to import the application, which is on the
+critical path of every cold start, and check that the slow modules are
+only imported on first use.
+
+    python -m benchmarks.import_time [--budget SECONDS] [--runs N]
+
+The import time is only reported, unless a budget is given: it depends too
+much on the machine to be checked on shared CI runners.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+
+# modules that must only be loaded on first use
+LAZY_MODULES = ("dateparser", "recurrent", "cron_descriptor", "sqlalchemy")
+
+MEASURE_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import randompicker.app
+print(time.perf_counter() - start)
+print(",".join(name for name in {lazy_modules!r} if name in sys.modules))
+"""
+
+
+def measure_import_time():
+    """
+    Import the application in a fresh interpreter, and return the import
+    duration along with the lazy modules that were loaded anyway.
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE_SCRIPT.format(lazy_modules=LAZY_MODULES)],
+        check=True,
+        stdout=subprocess.PIPE,
+        env=os.environ,
+        universal_newlines=True,
+    ).stdout.splitlines()
+    loaded = output[1].split(",") if len(output) > 1 and output[1] else []
+    return float(output[0]), loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--budget", type=float, help="fail if the median time exceeds it, in seconds"
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    durations = []
+    for _ in range(args.runs):
+        duration, loaded = measure_import_time()
+        if loaded:
+            sys.exit(f"Modules imported eagerly: {', '.join(loaded)}")
+        durations.append(duration)
+
+    median = statistics.median(durations)
+    report = (
+        f"import randompicker.app: median {median * 1000:.0f}ms, "
+        f"min {min(durations) * 1000:.0f}ms over {args.runs} runs"
+    )
+    if args.budget is None:
+        print(report)
+        return
+    print(f"{report} (budget {args.budget * 1000:.0f}ms)")
+    if median > args.budget:
+        sys.exit("Import time budget exceeded")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Measure how the scheduler and the job store behave as the number of jobs
+grows, on a local SQLite database or any database URL such as a local
+Postgres (its jobs table is emptied first).
+
+    python -m benchmarks.jobstore_scale [--sizes 1000,10000,100000]
+        [--database-url URL] [--jobs-per-team N]
+
+Jobs are created through `schedule_randompick_for_later`, in transactions
+of 1000 jobs, with a mix of recurring and one-off picks, timezones, targets
+and counts. For each size, in a fresh process:
+
+- fill: jobs created per second
+- start: start of the scheduler, with the recovery of missed picks: only
+  the due jobs are loaded
+- get_jobs: loading all the jobs with `scheduler.get_jobs`, which the app
+  never does
+- wakeup: the job store queries of a scheduler wakeup
+- list: a page of the jobs of a team, as the `list` command does
+- add, remove: a job scheduled by a command, and removed
+- memory: peak RSS of the process, after the start and after get_jobs
+
+SQLite databases are kept in the temporary directory, and reused by the next
+runs unless `--refill` is given: filling 1M jobs takes a while.
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from randompicker import app as randompicker_app
+from randompicker.jobs import list_scheduled_jobs_page, recover_missed_jobs
+from randompicker.jobstore import RandomPickerJobStore
+from randompicker.parser import parse_frequency
+
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+BATCH_SIZE = 1000
+FREQUENCIES = (
+    "every day at 9am",
+    "every weekday at 10am",
+    "every Monday at 9:30am",
+    "every Monday and Thursday at 2pm",
+    "every other Friday at 4pm",
+)
+TIMEZONES = ("Europe/Paris", "America/New_York", "Asia/Tokyo", "UTC")
+
+
+def make_schedule(index, jobs_per_team):
+    """
+    Return the arguments of `schedule_randompick_for_later` for the job index.
+    """
+    team, job = divmod(index, jobs_per_team)
+    # one-off picks are scheduled in the next month
+    if job % 5 == 4:
+        frequency = datetime(2030, 1, 1, 9) + timedelta(hours=index % 720)
+    else:
+        frequency = parse_frequency(FREQUENCIES[job % len(FREQUENCIES)])
+    return {
+        "frequency": frequency,
+        "user_tz": TIMEZONES[team % len(TIMEZONES)],
+        "target": f"{'CS'[job % 2]}{team:06}{job % 7:02}",
+        "task": f"review pull requests {job}",
+        "user_id": f"U{team:06}{job % 3:02}",
+        "channel_id": f"C{team:06}{job % 10:02}",
+        "team_id": f"T{team:08}",
+        "count": 1 + job % 3 // 2,
+    }
+
+
+def start_scheduler(url):
+    """
+    Start the scheduler like the app does, and set it on the app module
+    for `schedule_randompick_for_later`.
+    """
+    jobstore = RandomPickerJobStore(url=url)
+    scheduler = AsyncIOScheduler(jobstores={"default": jobstore})
+    scheduler.start(paused=True)
+    recover_missed_jobs(jobstore, 1, datetime.now(timezone.utc))
+    randompicker_app.scheduler, randompicker_app.jobstore = scheduler, jobstore
+    return scheduler, jobstore
+
+
+def fill(jobstore, start, size, jobs_per_team):
+    for batch_start in range(start, size, BATCH_SIZE):
+        with jobstore.transaction():
+            for index in range(batch_start, min(batch_start + BATCH_SIZE, size)):
+                randompicker_app.schedule_randompick_for_later(
+                    **make_schedule(index, jobs_per_team)
+                )
+
+
+def timed(func, runs):
+    """
+    Return the durations of runs of func, in seconds.
+    """
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def max_rss():
+    # in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def fill_to_size(url, size, jobs_per_team):
+    """
+    Fill the job store with size jobs, unless it has them already, and return
+    the number of jobs created per second.
+    """
+    scheduler, jobstore = start_scheduler(url)
+    results = {}
+    if jobstore.count_jobs_by_prefix("T") != size:
+        jobstore.remove_all_jobs()
+        start = time.perf_counter()
+        fill(jobstore, 0, size, jobs_per_team)
+        results["fill"] = size / (time.perf_counter() - start)
+    scheduler.shutdown(wait=False)
+    return results
+
+
+def measure(url, size, jobs_per_team, runs):
+    """
+    Return the measures on a job store of size jobs.
+    """
+    random.seed(0)
+    results = {}
+    start = time.perf_counter()
+    scheduler, jobstore = start_scheduler(url)
+    scheduler.resume()
+    results["start"] = time.perf_counter() - start
+    results["rss_start"] = max_rss()
+    scheduler.pause()
+
+    results["get_jobs"] = min(timed(scheduler.get_jobs, 3))
+    results["rss_get_jobs"] = max_rss()
+
+    now = datetime.now(timezone.utc)
+    results["wakeup"] = statistics.median(
+        timed(lambda: (jobstore.get_due_jobs(now), jobstore.get_next_run_time()), runs)
+    )
+
+    teams = (size + jobs_per_team - 1) // jobs_per_team
+    results["list"] = timed(
+        lambda: list_scheduled_jobs_page(jobstore, f"T{random.randrange(teams):08}"),
+        runs,
+    )
+
+    add, remove = [], []
+    for index in range(runs):
+        schedule = make_schedule(random.randrange(size), jobs_per_team)
+        schedule["task"] = f"load test {index}"
+        start = time.perf_counter()
+        job = randompicker_app.schedule_randompick_for_later(**schedule)
+        add.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        scheduler.remove_job(job.id)
+        remove.append(time.perf_counter() - start)
+    results["add"], results["remove"] = add, remove
+    scheduler.shutdown(wait=False)
+    return results
+
+
+def run_size(args, size):
+    """
+    Measure a size in a fresh process, so that memory isn't shared.
+    """
+    url = args.database_url or "sqlite:///" + os.path.join(
+        tempfile.gettempdir(), f"randompicker-jobstore-{size}.db"
+    )
+    if args.refill and url.startswith("sqlite:///"):
+        path = url[len("sqlite:///") :]
+        if os.path.exists(path):
+            os.remove(path)
+    results = {"size": size}
+    for step in ("--fill", "--measure"):
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.jobstore_scale",
+                step,
+                str(size),
+                "--database-url",
+                url,
+                "--jobs-per-team",
+                str(args.jobs_per_team),
+                "--runs",
+                str(args.runs),
+            ],
+            check=True,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        ).stdout
+        results.update(json.loads(output.splitlines()[-1]))
+    return results
+
+
+def format_quantiles(durations):
+    durations = sorted(durations)
+    p99 = durations[min(int(0.99 * len(durations)), len(durations) - 1)]
+    return f"{statistics.median(durations) * 1000:.1f}/{p99 * 1000:.1f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--sizes", default=",".join(str(size) for size in DEFAULT_SIZES)
+    )
+    parser.add_argument("--database-url")
+    parser.add_argument("--jobs-per-team", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--refill", action="store_true")
+    parser.add_argument("--fill", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--measure", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.fill:
+        print(
+            json.dumps(fill_to_size(args.database_url, args.fill, args.jobs_per_team))
+        )
+        return
+    if args.measure:
+        print(
+            json.dumps(
+                measure(args.database_url, args.measure, args.jobs_per_team, args.runs)
+            )
+        )
+        return
+
+    print(
+        f"{'jobs':>8}{'fill':>10}{'start':>9}{'get_jobs':>10}{'wakeup':>9}"
+        f"{'list p50/p99':>16}{'add p50/p99':>16}{'remove p50/p99':>16}"
+        f"{'rss':>14}"
+    )
+    for size in (int(size) for size in args.sizes.split(",")):
+        results = run_size(args, size)
+        fill = f"{results['fill']:.0f}/s" if "fill" in results else "reused"
+        print(
+            f"{size:>8}{fill:>10}{results['start']:>8.2f}s"
+            f"{results['get_jobs']:>9.2f}s{results['wakeup'] * 1000:>7.1f}ms"
+            f"{format_quantiles(results['list']):>16}"
+            f"{format_quantiles(results['add']):>16}"
+            f"{format_quantiles(results['remove']):>16}"
+            f"{results['rss_start']:>6.0f}/{results['rss_get_jobs']:.0f}MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Compare the JSON encoding of responses and the decoding of action payloads,
+with the standard library and the encoder configured on the app.
+
+    python -m benchmarks.json_encoding [--number N]
+"""
+import argparse
+import asyncio
+import json
+import timeit
+
+from sanic import response
+
+from randompicker import encoding
+from randompicker.format import HELP, format_scheduled_jobs
+
+from benchmarks.format_scheduled_jobs import make_jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=10000)
+    args = parser.parse_args()
+
+    page = asyncio.get_event_loop().run_until_complete(
+        format_scheduled_jobs("C0001", make_jobs(40, named=True))
+    )
+    payload = json.dumps(
+        {
+            "team": {"id": "T0001"},
+            "user": {"id": "U0001"},
+            "channel": {"id": "C0001"},
+            "response_url": "https://hooks.slack.com/actions/T0001/1/xxx",
+            "actions": [{"action_id": "REMOVE_JOB", "value": "T1-U1-" + "0" * 40}],
+            "message": page,
+        }
+    )
+    help_json = encoding.encode_json(HELP)
+
+    cases = [
+        ("HELP response, json", lambda: response.json(HELP, dumps=json.dumps)),
+        (
+            "HELP response, app encoder",
+            lambda: response.json(HELP, dumps=encoding.json_dumps),
+        ),
+        (
+            "HELP response, pre-encoded",
+            lambda: encoding.static_json_response(help_json),
+        ),
+        ("40 jobs page, json", lambda: json.dumps(page)),
+        ("40 jobs page, app encoder", lambda: encoding.json_dumps(page)),
+        ("actions payload, json", lambda: json.loads(payload)),
+        ("actions payload, app decoder", lambda: encoding.json_loads(payload)),
+    ]
+    for name, func in cases:
+        duration = timeit.timeit(func, number=args.number)
+        print(f"{name:<32}{duration / args.number * 1e6:>10.2f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Load test a running app, with the Slack API replaced by `benchmarks.fake_slack`:
+
+    python -m benchmarks.fake_slack --port 8001 &
+    SLACK_API_URL=http://127.0.0.1:8001/api/ USER_COMMAND_RATE=100000 \\
+        TEAM_COMMAND_RATE=100000 python -m randompicker.app &
+    python -m benchmarks.load_test [--teams N] [--jobs M] [--requests R]
+        [--concurrency C] [--lead SECONDS]
+
+The app and this script must share SLACK_SIGNING_SECRET. Leave the command
+rate limits at their defaults to measure them instead.
+
+1. N teams x M jobs are scheduled with signed `/slashcommand` requests, all
+   of them to run every day at the same minute, at least `--lead` seconds
+   from now.
+2. R requests are sent: `list` commands, immediate picks, and next page
+   actions of `/actions`.
+3. Once the scheduled picks ran, their messages are looked up in the fake
+   Slack server, to measure the pick lag: from the scheduled time to the
+   time the message was received.
+
+For each kind of request, it reports the throughput, the p50 and p99 latency,
+the errors, and the requests refused by the rate limits or load shedding.
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+import hashlib
+import hmac
+import json
+import math
+import os
+import random
+import time
+import urllib.parse
+
+import aiohttp
+
+from randompicker.admission import BUSY_MESSAGE
+from randompicker.format import SLACK_ACTION_NEXT_PAGE
+from randompicker.quotas import RATE_LIMITED_MESSAGE
+
+
+# marks the messages of the scheduled picks, in the fake Slack server
+SCHEDULED_TASK = "run load test job"
+
+
+def sign(body, signing_secret):
+    """
+    Return the headers of a request signed like Slack does.
+    """
+    timestamp = str(int(time.time()))
+    signature = hmac.new(
+        signing_secret.encode(), f"v0:{timestamp}:{body}".encode(), hashlib.sha256
+    ).hexdigest()
+    return {
+        "X-Slack-Request-Timestamp": timestamp,
+        "X-Slack-Signature": f"v0={signature}",
+        "Content-Type": "application/x-www-form-urlencoded",
+    }
+
+
+def percentile(values, quantile):
+    """
+    Return the quantile of values, by nearest rank.
+    """
+    if not values:
+        return math.nan
+    values = sorted(values)
+    return values[min(int(quantile * len(values)), len(values) - 1)]
+
+
+class Results:
+    """
+    Latencies and outcomes of the requests, by kind.
+    """
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.refused = {}
+
+    def add(self, kind, latency, status, text):
+        self.latencies.setdefault(kind, []).append(latency)
+        self.errors.setdefault(kind, 0)
+        self.refused.setdefault(kind, 0)
+        if status >= 400:
+            self.errors[kind] += 1
+        elif text in (BUSY_MESSAGE, RATE_LIMITED_MESSAGE) or text.startswith(":x:"):
+            self.refused[kind] += 1
+
+    def report(self, duration):
+        print(
+            f"{'requests':<20}{'count':>8}{'req/s':>10}{'p50':>10}{'p99':>10}"
+            f"{'errors':>8}{'refused':>9}"
+        )
+        for kind, latencies in self.latencies.items():
+            print(
+                f"{kind:<20}{len(latencies):>8}{len(latencies) / duration:>10.1f}"
+                f"{percentile(latencies, 0.5) * 1000:>8.0f}ms"
+                f"{percentile(latencies, 0.99) * 1000:>8.0f}ms"
+                f"{self.errors[kind]:>8}{self.refused[kind]:>9}"
+            )
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.results = Results()
+        self.semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def post(self, session, kind, path, data):
+        body = urllib.parse.urlencode(data)
+        headers = sign(body, self.args.signing_secret)
+        async with self.semaphore:
+            start = time.perf_counter()
+            try:
+                async with session.post(
+                    self.args.app_url + path, data=body, headers=headers
+                ) as resp:
+                    text = await resp.text()
+                    status = resp.status
+            except aiohttp.ClientError:
+                text, status = "", 599
+            self.results.add(kind, time.perf_counter() - start, status, text)
+
+    async def slashcommand(self, session, kind, team, text):
+        await self.post(
+            session,
+            kind,
+            "/slashcommand",
+            {
+                "command": "/pickrandom",
+                "text": text,
+                "user_id": f"U{team:04}0000",
+                "channel_id": f"C{team:04}0000",
+                "team_id": f"T{team:04}",
+            },
+        )
+
+    async def next_page(self, session, team, index):
+        payload = {
+            "team": {"id": f"T{team:04}"},
+            "user": {"id": f"U{team:04}0000"},
+            "channel": {"id": f"C{team:04}0000"},
+            "response_url": f"{self.args.slack_url}/response/{index}",
+            # the cursor is the id after which the page starts
+            "actions": [{"action_id": SLACK_ACTION_NEXT_PAGE, "value": f"T{team:04}-"}],
+        }
+        await self.post(
+            session, "next page", "/actions", {"payload": json.dumps(payload)}
+        )
+
+    async def schedule_jobs(self, session, run_time):
+        at = f"{run_time:%H:%M}"
+        await asyncio.gather(
+            *(
+                self.slashcommand(
+                    session,
+                    "schedule",
+                    team,
+                    f"<#C{team:04}{job:04}|load> to {SCHEDULED_TASK} {job} "
+                    f"every day at {at}",
+                )
+                for team in range(self.args.teams)
+                for job in range(self.args.jobs)
+            )
+        )
+
+    async def send_requests(self, session):
+        random.seed(0)
+        requests = []
+        for index in range(self.args.requests):
+            team = random.randrange(self.args.teams)
+            kind = random.choice(("list", "list", "pick now", "next page"))
+            if kind == "list":
+                requests.append(self.slashcommand(session, kind, team, "list"))
+            elif kind == "pick now":
+                requests.append(
+                    self.slashcommand(
+                        session, kind, team, f"<#C{team:04}0001|load> to pick now"
+                    )
+                )
+            else:
+                requests.append(self.next_page(session, team, index))
+        await asyncio.gather(*requests)
+
+    async def measure_pick_lag(self, session, run_time, since):
+        expected = self.args.teams * self.args.jobs
+        deadline = run_time.timestamp() + self.args.wait
+        lags = []
+        while True:
+            async with session.get(
+                f"{self.args.slack_url}/_stats", params={"since": str(since)}
+            ) as resp:
+                stats = await resp.json()
+            lags = [
+                received - run_time.timestamp()
+                for received, _, text in stats["messages"]
+                if SCHEDULED_TASK in text
+            ]
+            if len(lags) >= expected or time.time() > deadline:
+                break
+            await asyncio.sleep(1)
+
+        print(
+            f"\nscheduled picks: {len(lags)}/{expected} delivered, lag "
+            f"p50 {percentile(lags, 0.5):.2f}s, p99 {percentile(lags, 0.99):.2f}s, "
+            f"max {max(lags, default=math.nan):.2f}s"
+        )
+        calls = stats["calls"]
+        print(
+            "Slack API calls: "
+            + ", ".join(f"{method} {count}" for method, count in sorted(calls.items()))
+        )
+
+    async def run(self):
+        since = time.time()
+        now = datetime.now(timezone.utc)
+        run_time = (now + timedelta(seconds=self.args.lead + 60)).replace(
+            second=0, microsecond=0
+        )
+        async with aiohttp.ClientSession() as session:
+            start = time.perf_counter()
+            await self.schedule_jobs(session, run_time)
+            duration = time.perf_counter() - start
+            print(
+                f"Scheduled {self.args.teams} teams x {self.args.jobs} jobs "
+                f"to run at {run_time:%H:%M} UTC in {duration:.1f}s"
+            )
+            self.results.report(duration)
+
+            self.results = Results()
+            start = time.perf_counter()
+            await self.send_requests(session)
+            duration = time.perf_counter() - start
+            print(f"\nSent {self.args.requests} requests in {duration:.1f}s")
+            self.results.report(duration)
+
+            wait = run_time.timestamp() - time.time()
+            if wait > 0:
+                print(f"\nWaiting {wait:.0f}s for the scheduled picks to run")
+                await asyncio.sleep(wait)
+            await self.measure_pick_lag(session, run_time, since)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--app-url", default="http://127.0.0.1:80")
+    parser.add_argument("--slack-url", default="http://127.0.0.1:8001")
+    parser.add_argument(
+        "--signing-secret", default=os.environ.get("SLACK_SIGNING_SECRET", "")
+    )
+    parser.add_argument("--teams", type=int, default=10)
+    parser.add_argument("--jobs", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument(
+        "--lead", type=float, default=30, help="minimum delay before the picks run"
+    )
+    parser.add_argument(
+        "--wait", type=float, default=120, help="maximum wait for the picks to run"
+    )
+    args = parser.parse_args()
+    asyncio.get_event_loop().run_until_complete(LoadTest(args).run())
+
+
+if __name__ == "__main__":
+    main()
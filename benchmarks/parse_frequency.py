@@ -0,0 +1,45 @@
+"""
+Compare the fast path for common frequencies with the `recurrent` parser.
+
+    python -m benchmarks.parse_frequency [--number N]
+"""
+import argparse
+import timeit
+
+from randompicker import parser as randompicker_parser
+
+
+COMMON_FREQUENCIES = [
+    "every day at 10am",
+    "every weekday at 9am",
+    "every Monday at 9am",
+    "every Monday and Thursday at 10:30",
+    "every other Wednesday at 2pm",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=1000)
+    args = parser.parse_args()
+
+    randompicker_parser.preload_parsers()
+    print(f"{'frequency':<40}{'recurrent':>12}{'fast path':>12}{'speedup':>10}")
+    for frequency in COMMON_FREQUENCIES:
+        normalized = randompicker_parser.normalize_frequency(frequency)
+        full = timeit.timeit(
+            lambda: randompicker_parser.parse_recurring_event(frequency),
+            number=args.number,
+        )
+        fast = timeit.timeit(
+            lambda: randompicker_parser.parse_common_frequency(normalized),
+            number=args.number,
+        )
+        print(
+            f"{frequency:<40}{full / args.number * 1e6:>10.1f}us"
+            f"{fast / args.number * 1e6:>10.1f}us{full / fast:>9.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
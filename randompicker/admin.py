@@ -0,0 +1,37 @@
+import functools
+import hmac
+from typing import Optional, Text
+
+from sanic import response
+
+from randompicker.constants import ADMIN_TOKEN
+
+
+def is_admin_token(token: Optional[Text]) -> bool:
+    """
+    Return True if token is the admin token, which must be set.
+    """
+    if not ADMIN_TOKEN:
+        return False
+    return hmac.compare_digest(token or "", ADMIN_TOKEN)
+
+
+def requires_admin_token(func):
+    """
+    Decorator to require the admin token on sanic endpoints, as a bearer token
+    in the Authorization header. Admin endpoints are disabled if no token is set.
+    """
+
+    @functools.wraps(func)
+    async def inner(request):
+        if not ADMIN_TOKEN:
+            return response.text("Not found", status=404)
+
+        if not hmac.compare_digest(
+            request.headers.get("Authorization", ""), f"Bearer {ADMIN_TOKEN}"
+        ):
+            return response.text("Invalid token", status=401)
+
+        return await func(request)
+
+    return inner
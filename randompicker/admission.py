@@ -0,0 +1,79 @@
+import asyncio
+from typing import Optional, Text
+
+from randompicker.format import SLACK_ACTION_NEXT_PAGE, SLACK_ACTION_PREVIOUS_PAGE
+from randompicker.parser import (
+    is_batch_command,
+    is_list_command,
+    is_stats_command,
+    parse_command,
+)
+
+
+# kinds of work shed when the event loop lags, by priority: immediate picks,
+# job runs and the other actions are never shed
+LISTING_WORK = "listing"
+SCHEDULING_WORK = "scheduling"
+
+# interval (in seconds) between two measures of the event loop lag
+LOOP_LAG_INTERVAL = 0.1
+# factor applied to the lag at each measure, so that it decreases progressively
+LOOP_LAG_DECAY = 0.5
+
+BUSY_MESSAGE = (
+    "I'm a bit overloaded right now :sweat_smile: Please try again in a minute."
+)
+
+
+class LoopLagMonitor:
+    """
+    Measure the event loop lag, as the delay of a periodic wake-up past its
+    scheduled time. The lag decays progressively rather than dropping at the
+    first quick wake-up, so that shedding doesn't flap during bursts.
+    """
+
+    def __init__(self, threshold: float, interval: float = LOOP_LAG_INTERVAL):
+        self.threshold = threshold
+        self.interval = interval
+        self.lag = 0.0
+
+    @property
+    def overloaded(self) -> bool:
+        return self.lag > self.threshold
+
+    def update(self, lag: float) -> None:
+        self.lag = max(lag, self.lag * LOOP_LAG_DECAY)
+
+    async def run(self) -> None:
+        loop = asyncio.get_event_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.update(max(loop.time() - expected, 0.0))
+
+
+def classify_request(request) -> Optional[Text]:
+    """
+    Return the kind of work of a request that can be shed, or None if the
+    request must be served even when overloaded.
+    """
+    if request.path == "/slashcommand":
+        command = request.form.get("text", "")
+        if is_list_command(command) or is_stats_command(command):
+            return LISTING_WORK
+        if is_batch_command(command):
+            return SCHEDULING_WORK
+        params = parse_command(command)
+        if params is not None and params.get("frequency"):
+            return SCHEDULING_WORK
+    elif request.path == "/actions":
+        try:
+            payload = request.app.config.JSON_LOADS(request.form.get("payload", ""))
+            action_ids = {action["action_id"] for action in payload["actions"]}
+        except (ValueError, KeyError, TypeError):
+            return None
+        if action_ids & {SLACK_ACTION_NEXT_PAGE, SLACK_ACTION_PREVIOUS_PAGE}:
+            return LISTING_WORK
+    elif request.path == "/admin/schedules":
+        return SCHEDULING_WORK
+    return None
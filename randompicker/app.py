@@ -1,62 +1,336 @@
-from datetime import datetime
+import asyncio
+from datetime import datetime, timezone
+import time
 from functools import partial
-import json
-from typing import Text, Union
+from logging.handlers import QueueListener
+from typing import Dict, List, Optional, Text, Union, TYPE_CHECKING
 
-from apscheduler.events import EVENT_JOB_EXECUTED
+from apscheduler.events import (
+    EVENT_ALL_JOBS_REMOVED,
+    EVENT_JOB_ADDED,
+    EVENT_JOB_ERROR,
+    EVENT_JOB_EXECUTED,
+    EVENT_JOB_MODIFIED,
+    EVENT_JOB_REMOVED,
+)
 from apscheduler.jobstores.base import JobLookupError
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from recurrent import RecurringEvent
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.util import astimezone
 import requests
 from sanic import Sanic, response
 from sanic.log import logger
 
-from randompicker.constants import DATABASE_URL
+from randompicker.admin import is_admin_token, requires_admin_token
+from randompicker.admission import BUSY_MESSAGE, LoopLagMonitor, classify_request
+from randompicker.cache import VersionedCache
+from randompicker.constants import (
+    DATABASE_URL,
+    HISTORY_FLUSH_INTERVAL,
+    LISTING_CACHE_SIZE,
+    LOAD_SHEDDING_LAG,
+    LOG_FORMAT,
+    LOG_QUEUE_SIZE,
+    LOG_SAMPLING,
+    MAX_JOBS_PER_CHANNEL,
+    MAX_JOBS_PER_TEAM,
+    MISFIRE_RECOVERY_RATE,
+    PROFILES_DIR,
+    TEAM_COMMAND_RATE,
+    USER_COMMAND_RATE,
+)
+from randompicker.encoding import (
+    encode_json,
+    json_dumps,
+    json_loads,
+    json_response,
+    static_json_response,
+)
 from randompicker.format import (
     HELP,
+    NO_JOBS,
+    NO_STATS,
     SLACK_ACTION_REMOVE_JOB,
     SLACK_ACTION_CLOSE,
-    format_slack_message,
+    SLACK_ACTION_NEXT_PAGE,
+    SLACK_ACTION_PREVIOUS_PAGE,
+    cron_description_hit_rate,
+    format_count,
+    format_pick_stats,
     format_scheduled_jobs,
     mention_slack_id,
     format_trigger,
+    get_page_start,
+    preload_formatters,
+    remove_job_block,
+)
+from randompicker.lag import LAG_EVENTS, LagTracker
+from randompicker.logs import (
+    parse_sampling_rates,
+    start_logging_queue,
+    stop_logging_queue,
 )
-from randompicker.jobs import list_scheduled_jobs, make_job_id, update_picker_rotation
+from randompicker.jobs import (
+    count_job_error,
+    invalidate_team_cache,
+    list_scheduled_jobs_page,
+    make_job_id,
+    recover_missed_jobs,
+    update_picker_rotation,
+)
+from randompicker.metrics import (
+    CACHE_HIT_RATIO,
+    ERRORS,
+    EVENT_LOOP_LAG,
+    HELP_FALLBACKS,
+    LIMITED_REQUESTS,
+    REGISTRY,
+    REQUEST_DURATION,
+    SHED_REQUESTS,
+)
+from randompicker.profiling import PROFILING_EVENTS, Profiler
 from randompicker.parser import (
+    RECURRING_EVENT_CACHE,
     convert_recurring_event_to_trigger_format,
+    is_batch_command,
     is_list_command,
+    is_stats_command,
     parse_command,
     parse_frequency,
+    preload_parsers,
 )
+from randompicker.quotas import (
+    RATE_LIMITED_MESSAGE,
+    QuotaExceeded,
+    RateLimiter,
+    check_job_quotas,
+)
+from randompicker.rotation import PICKING_STRATEGIES
 from randompicker.slack_utils import (
+    deduplicate_slack_retries,
     slack_client,
     list_users_target,
     pick_user_and_send_message,
     requires_slack_signature,
 )
 
+if TYPE_CHECKING:  # pragma: no cover
+    from recurrent import RecurringEvent
+
+    from randompicker.history import PickHistory
+    from randompicker.jobstore import RandomPickerJobStore
+
 
 app = Sanic("randompicker")
+app.config.JSON_DUMPS = json_dumps
+app.config.JSON_LOADS = json_loads
+
+
+# constant responses, encoded once
+HELP_JSON = encode_json(HELP)
+NO_JOBS_JSON = encode_json(NO_JOBS)
+NO_STATS_JSON = encode_json(NO_STATS)
 
 
 scheduler: AsyncIOScheduler = None
+jobstore: "RandomPickerJobStore" = None  # type: ignore
+history: "PickHistory" = None  # type: ignore
+lag_tracker: LagTracker = None  # type: ignore
+history_flush_task: Optional[asyncio.Task] = None
+loop_lag_task: Optional[asyncio.Task] = None
+log_listener: Optional[QueueListener] = None
+
+# formatted job lists, by team and version of the team jobs
+listing_cache = VersionedCache(maxsize=LISTING_CACHE_SIZE)
+
+CACHE_HIT_RATIO.set_function(lambda: listing_cache.hit_rate, cache="listing")
+CACHE_HIT_RATIO.set_function(
+    lambda: RECURRING_EVENT_CACHE.hit_rate, cache="recurring_event"
+)
+CACHE_HIT_RATIO.set_function(cron_description_hit_rate, cache="cron_description")
+
+# lag of the event loop, to refuse low priority requests when it is overloaded
+loop_lag_monitor = LoopLagMonitor(LOAD_SHEDDING_LAG)
+EVENT_LOOP_LAG.set_function(lambda: loop_lag_monitor.lag)
+
+# commands allowed per minute, by user and by team
+user_rate_limiter = RateLimiter(USER_COMMAND_RATE)
+team_rate_limiter = RateLimiter(TEAM_COMMAND_RATE)
+
+# captures of requests and job runs, on demand
+profiler = Profiler(PROFILES_DIR)
+# header to profile a request, with the admin token as value
+PROFILE_HEADER = "X-Profile-Token"
+
+
+@app.listener("before_server_start")
+async def start_logging(app, loop):
+    # log records are written by a thread, off the event loop
+    global log_listener
+    log_listener = start_logging_queue(
+        LOG_QUEUE_SIZE, parse_sampling_rates(LOG_SAMPLING), LOG_FORMAT == "json"
+    )
+
+
+@app.listener("after_server_stop")
+async def stop_logging(app, loop):
+    if log_listener:
+        stop_logging_queue(log_listener)
 
 
 @app.listener("before_server_start")
 async def initialize_scheduler(app, loop):
     logger.info("Starting job scheduler")
-    global scheduler
-    scheduler = AsyncIOScheduler(
-        {"apscheduler.jobstores.default": {"type": "sqlalchemy", "url": DATABASE_URL,},}
-    )
-    scheduler.start()
+    # imported lazily, SQLAlchemy is slow to import
+    from randompicker.history import PickHistory, record_pick_history
+    from randompicker.jobstore import RandomPickerJobStore
+
+    global scheduler, jobstore, history, lag_tracker
+    jobstore = RandomPickerJobStore(url=DATABASE_URL)
+    history = PickHistory(jobstore.engine)
+    scheduler = AsyncIOScheduler(jobstores={"default": jobstore})
+    # start paused so that missed jobs don't all fire at once
+    scheduler.start(paused=True)
     scheduler.add_listener(
         partial(update_picker_rotation, scheduler), EVENT_JOB_EXECUTED
     )
+    scheduler.add_listener(partial(record_pick_history, history), EVENT_JOB_EXECUTED)
+    scheduler.add_listener(count_job_error, EVENT_JOB_ERROR)
+    lag_tracker = LagTracker(scheduler)
+    scheduler.add_listener(lag_tracker.handle_event, LAG_EVENTS)
+    scheduler.add_listener(profiler.handle_event, PROFILING_EVENTS)
+    scheduler.add_listener(
+        partial(invalidate_team_cache, listing_cache),
+        EVENT_JOB_ADDED
+        | EVENT_JOB_MODIFIED
+        | EVENT_JOB_REMOVED
+        | EVENT_ALL_JOBS_REMOVED,
+    )
+    recovered, dropped = recover_missed_jobs(
+        jobstore,
+        MISFIRE_RECOVERY_RATE,
+        datetime.now(timezone.utc),
+        lag_tracker.missed_run_times,
+    )
+    logger.info("Recovered %d missed picks, dropped %d", recovered, dropped)
+    scheduler.resume()
+
+
+@app.listener("after_server_start")
+async def warm_up_parsers(app, loop):
+    # load the parsing and formatting libraries in the background, once the
+    # server listens
+    loop.run_in_executor(None, preload_parsers)
+    loop.run_in_executor(None, preload_formatters)
+
+
+@app.listener("after_server_start")
+async def start_history_flush(app, loop):
+    global history_flush_task
+    history_flush_task = loop.create_task(flush_history_periodically())
+
+
+@app.listener("before_server_stop")
+async def stop_history_flush(app, loop):
+    if history_flush_task:
+        history_flush_task.cancel()
+    history.flush()
+
+
+@app.listener("after_server_start")
+async def start_loop_lag_monitor(app, loop):
+    global loop_lag_task
+    loop_lag_task = loop.create_task(loop_lag_monitor.run())
+
+
+@app.listener("before_server_stop")
+async def stop_loop_lag_monitor(app, loop):
+    if loop_lag_task:
+        loop_lag_task.cancel()
+
+
+async def flush_history_periodically():
+    """
+    Write the picks recorded since the last write, regularly.
+    """
+    while True:
+        await asyncio.sleep(HISTORY_FLUSH_INTERVAL)
+        try:
+            history.flush()
+        except Exception:
+            logger.exception("Cannot write the pick history")
+
+
+@app.middleware("request")
+async def start_request_timer(request):
+    request.ctx.start_time = time.perf_counter()
+
+
+@app.middleware("request")
+async def shed_low_priority_requests(request):
+    """
+    When the event loop lags, refuse listing and scheduling requests, which
+    would likely exceed the Slack timeout anyway, to keep serving immediate
+    picks and running the jobs.
+    """
+    if not loop_lag_monitor.overloaded:
+        return None
+    kind = classify_request(request)
+    if kind is None:
+        return None
+    SHED_REQUESTS.inc(kind=kind)
+    logger.warning(
+        "Shedding %s request, event loop lag is %.3fs", kind, loop_lag_monitor.lag
+    )
+    if request.path.startswith("/admin/"):
+        return response.text(BUSY_MESSAGE, status=503, headers={"Retry-After": "60"})
+    # Slack displays the message of a successful response to the user only
+    return response.text(BUSY_MESSAGE)
+
+
+@app.middleware("request")
+async def start_request_profile(request):
+    forced = PROFILE_HEADER in request.headers and is_admin_token(
+        request.headers[PROFILE_HEADER]
+    )
+    request.ctx.profile = profiler.start_request(forced)
+
+
+@app.middleware("response")
+async def stop_request_profile(request, response):
+    profile = getattr(request.ctx, "profile", None)
+    if profile is not None:
+        path = profiler.stop(profile, f"request-{request.path}")
+        logger.info("Saved the profile of %s to %s", request.path, path)
+
+
+@app.middleware("response")
+async def observe_request_duration(request, response):
+    start_time = getattr(request.ctx, "start_time", None)
+    if start_time is not None:
+        REQUEST_DURATION.observe(
+            time.perf_counter() - start_time,
+            route=request.uri_template or "unmatched",
+            method=request.method,
+        )
+    if response.status >= 500:
+        ERRORS.inc(source="request")
+
+
+@app.route("/metrics", methods=["GET"])
+async def metrics(request):
+    """
+    Endpoint that exposes the metrics in the Prometheus text format.
+    """
+    return response.text(
+        REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 
 @app.route("/slashcommand", methods=["POST"])
 @requires_slack_signature
+@deduplicate_slack_retries
 async def slashcommand(request):
     """
     Endpoint that receives `/pickrandom` command. Form data contains:
@@ -73,50 +347,98 @@ async def slashcommand(request):
 
     logger.info("Incoming command %s", command)
 
+    if not user_rate_limiter.allow((team_id, user_id)):
+        LIMITED_REQUESTS.inc(limit="user_commands")
+        return response.text(RATE_LIMITED_MESSAGE)
+    if not team_rate_limiter.allow(team_id):
+        LIMITED_REQUESTS.inc(limit="team_commands")
+        return response.text(RATE_LIMITED_MESSAGE)
+
     if is_list_command(command):
-        jobs = list_scheduled_jobs(scheduler, team_id)
-        jobs_json = await format_scheduled_jobs(channel_id, jobs)
-        return response.json(jobs_json)
+        jobs_json = await list_and_format_scheduled_jobs(team_id, channel_id)
+        if jobs_json is NO_JOBS:
+            return static_json_response(NO_JOBS_JSON)
+        return json_response(request, jobs_json)
+
+    if is_stats_command(command):
+        stats_json = format_pick_stats(history.get_stats(team_id))
+        if stats_json is NO_STATS:
+            return static_json_response(NO_STATS_JSON)
+        return json_response(request, stats_json)
+
+    if is_batch_command(command):
+        user_info = await slack_client.users_info(user=user_id)
+        results = schedule_batch(
+            [
+                parse_command(line) or {}
+                for line in command.strip().splitlines()
+                if line.strip()
+            ],
+            user_tz=user_info["tz"],
+            user_id=user_id,
+            channel_id=channel_id,
+            team_id=team_id,
+        )
+        return response.text(
+            "\n".join(
+                f":white_check_mark: I will pick {format_count(result.get('count', 1))} "
+                f"from {mention_slack_id(result['target'])} to {result['task']} "
+                f"{result['description']}"
+                if result["ok"]
+                else f":x: Line {index}: {result['error']}"
+                for index, result in enumerate(results, start=1)
+            )
+        )
 
     params = parse_command(command)
     if params is None:
-        return response.json(HELP)
+        HELP_FALLBACKS.inc()
+        return static_json_response(HELP_JSON)
 
     logger.info("Handling slash command with params %s", params)
 
     if not params.get("frequency"):
-        await pick_user_and_send_message(channel_id, params["target"], params["task"])
+        result = await pick_user_and_send_message(
+            channel_id, params["target"], params["task"], count=params["count"]
+        )
+        history.record(team_id, None, result.users, datetime.now(timezone.utc))
         return response.text("")
 
     frequency = parse_frequency(params["frequency"])
     if frequency is None:
-        return response.json(HELP)
+        HELP_FALLBACKS.inc()
+        return static_json_response(HELP_JSON)
 
     # get user timezone
     user_info = await slack_client.users_info(user=user_id)
     user_tz = user_info["tz"]
-    job = schedule_randompick_for_later(
-        frequency=frequency,
-        user_tz=user_tz,
-        target=params["target"],
-        task=params["task"],
-        user_id=user_id,
-        channel_id=channel_id,
-        team_id=team_id,
-    )
+    try:
+        job = schedule_randompick_for_later(
+            frequency=frequency,
+            user_tz=user_tz,
+            target=params["target"],
+            task=params["task"],
+            user_id=user_id,
+            channel_id=channel_id,
+            team_id=team_id,
+            count=params["count"],
+        )
+    except QuotaExceeded as e:
+        return response.text(f":x: {e}")
     return response.text(
-        f"OK, I will pick someone from {mention_slack_id(params['target'])} "
-        f"to {params['task']} {format_trigger(job.trigger)}"
+        f"OK, I will pick {format_count(params['count'])} "
+        f"from {mention_slack_id(params['target'])} to {params['task']} {job.name}"
     )
 
 
 @app.route("/actions", methods=["POST"])
 @requires_slack_signature
+@deduplicate_slack_retries
 async def actions(request):
     """
     This endpoint receives actions and other Interactivity elements from Slack.
     """
-    payload = json.loads(request.form["payload"][0])
+    payload = request.app.config.JSON_LOADS(request.form["payload"][0])
     team_id = payload["team"]["id"]
     user_id = payload["user"]["id"]
     channel_id = payload["channel"]["id"]
@@ -131,12 +453,39 @@ async def actions(request):
             except JobLookupError:
                 logger.error(f"Cannot find scheduled job with id {job_id}")
             else:
-                # update the message the user sees
-                jobs = list_scheduled_jobs(scheduler, team_id)
-                jobs_json = await format_scheduled_jobs(channel_id, jobs)
+                # update the message the user sees, patching it if Slack sent it
+                message = payload.get("message")
+                jobs_json = (
+                    remove_job_block(message["blocks"], job_id) if message else None
+                )
+                if jobs_json is None:
+                    # all the jobs of the page were removed: list the jobs
+                    # after the first of them, or the previous page if there
+                    # are none. Without the message, list the first page
+                    cursor = get_page_start(message["blocks"]) if message else None
+                    jobs_json = await list_and_format_scheduled_jobs(
+                        team_id, channel_id, cursor
+                    )
+                    if jobs_json is NO_JOBS and cursor is not None:
+                        jobs_json = await list_and_format_scheduled_jobs(
+                            team_id, channel_id, cursor, backwards=True
+                        )
                 resp = requests.post(response_url, json=jobs_json)
                 resp.raise_for_status()
             break
+        elif action["action_id"] in (
+            SLACK_ACTION_NEXT_PAGE,
+            SLACK_ACTION_PREVIOUS_PAGE,
+        ):
+            jobs_json = await list_and_format_scheduled_jobs(
+                team_id,
+                channel_id,
+                cursor=action["value"],
+                backwards=action["action_id"] == SLACK_ACTION_PREVIOUS_PAGE,
+            )
+            resp = requests.post(response_url, json=jobs_json)
+            resp.raise_for_status()
+            break
         elif action["action_id"] == SLACK_ACTION_CLOSE:
             resp = requests.post(response_url, json={"delete_original": "true"})
             resp.raise_for_status()
@@ -145,40 +494,245 @@ async def actions(request):
     return response.text("OK")
 
 
+async def list_and_format_scheduled_jobs(
+    team_id: Text,
+    channel_id: Text,
+    cursor: Optional[Text] = None,
+    backwards: bool = False,
+) -> Dict:
+    """
+    Format a page of the team jobs, from cache if the team jobs didn't change.
+    """
+    key = (channel_id, cursor, backwards)
+    jobs_json = listing_cache.get(team_id, key)
+    if jobs_json is None:
+        page = list_scheduled_jobs_page(jobstore, team_id, cursor, backwards)
+        jobs_json = await format_scheduled_jobs(channel_id, *page)
+        listing_cache.set(team_id, key, jobs_json)
+    return jobs_json
+
+
+@app.route("/admin/schedules", methods=["POST"])
+@requires_admin_token
+async def admin_schedules(request):
+    """
+    Admin endpoint to schedule several random picks at once. The JSON body contains:
+    - team_id, user_id and channel_id: the same as `/slashcommand`
+    - timezone: optional, defaults to the timezone of the user
+    - schedules: a list of objects with a target (channel or group id),
+      a task, a frequency, and optionally a picking strategy
+      (`rotation` or `weighted`) and a count of people to pick
+    """
+    body = request.json
+    user_tz = body.get("timezone")
+    if not user_tz:
+        user_info = await slack_client.users_info(user=body["user_id"])
+        user_tz = user_info["tz"]
+    else:
+        try:
+            astimezone(user_tz)
+        except (KeyError, TypeError, ValueError):
+            return json_response(
+                request, {"error": f"Unknown timezone {user_tz}"}, status=400
+            )
+
+    results = schedule_batch(
+        body["schedules"],
+        user_tz=user_tz,
+        user_id=body["user_id"],
+        channel_id=body["channel_id"],
+        team_id=body["team_id"],
+    )
+    return json_response(request, {"results": results})
+
+
+@app.route("/admin/scheduler", methods=["GET"])
+@requires_admin_token
+async def admin_scheduler(request):
+    """
+    Admin endpoint that reports how late the picks run: quantiles of the lag
+    from their scheduled time to their start and to their delivery, and the
+    number of missed, coalesced and failed runs.
+    """
+    return json_response(request, lag_tracker.get_stats())
+
+
+@app.route("/admin/profiling", methods=["GET", "POST"])
+@requires_admin_token
+async def admin_profiling(request):
+    """
+    Admin endpoint to profile the next request or job run. The JSON body contains:
+    - target: `request` or `job`
+    - job_id: optional, the job to profile, defaults to the next job that runs
+
+    A single request can also be profiled with the admin token in the
+    `X-Profile-Token` header. Both methods return the saved profiles.
+    """
+    if request.method == "POST":
+        body = request.json or {}
+        if body.get("target") == "request":
+            profiler.arm_request()
+        elif body.get("target") == "job":
+            profiler.arm_job(body.get("job_id"))
+        else:
+            return json_response(
+                request, {"error": "target must be request or job"}, status=400
+            )
+
+    return json_response(
+        request,
+        {
+            "armed_requests": profiler.armed_requests,
+            "armed_jobs": profiler.armed_jobs,
+            "profiles": profiler.list_profiles(),
+        },
+    )
+
+
+def schedule_batch(
+    schedules: List[Dict],
+    user_tz: Text,
+    user_id: Text,
+    channel_id: Text,
+    team_id: Text,
+) -> List[Dict]:
+    """
+    Schedule several random picks at once, writing all the jobs in a single
+    transaction. Each schedule is a dict with target, task and frequency keys,
+    and optional strategy and count keys.
+
+    Return a result for each schedule, with an `ok` key, and either an `error`
+    or the `job_id`, `target`, `task` and `description` of the scheduled job.
+    """
+    results: List[Dict] = []
+    valid_schedules = []
+    for schedule in schedules:
+        error = _validate_schedule(schedule)
+        frequency = None if error else parse_frequency(schedule["frequency"])
+        if error is None and frequency is None:
+            error = f"I don't understand the frequency \"{schedule['frequency']}\""
+        if error is None:
+            # a single failing line must not roll back the others
+            try:
+                trigger = make_trigger(frequency, user_tz)
+            except (KeyError, ValueError):
+                error = f"I can't schedule the frequency \"{schedule['frequency']}\""
+        if error:
+            results.append({"ok": False, "error": error})
+        else:
+            result = {
+                "ok": True,
+                "target": schedule["target"],
+                "task": schedule["task"],
+            }
+            if schedule.get("strategy"):
+                result["strategy"] = schedule["strategy"]
+            if schedule.get("count", 1) > 1:
+                result["count"] = schedule["count"]
+            results.append(result)
+            valid_schedules.append((result, frequency, trigger))
+
+    with jobstore.transaction():
+        for result, frequency, trigger in valid_schedules:
+            try:
+                job = schedule_randompick_for_later(
+                    frequency=frequency,
+                    trigger=trigger,
+                    user_tz=user_tz,
+                    target=result["target"],
+                    task=result["task"],
+                    user_id=user_id,
+                    channel_id=channel_id,
+                    team_id=team_id,
+                    strategy=result.get("strategy"),
+                    count=result.get("count", 1),
+                )
+            except QuotaExceeded as e:
+                result.clear()
+                result.update(ok=False, error=str(e))
+            else:
+                result["job_id"] = job.id
+                result["description"] = job.name
+    return results
+
+
+def _validate_schedule(schedule: Dict) -> Optional[Text]:
+    """
+    Return an error message if the schedule is incomplete.
+    """
+    if not schedule.get("target") or not schedule.get("task"):
+        return "I don't understand this command"
+    elif not schedule["target"].startswith(("C", "S")):
+        return f"Unknown channel or group {schedule['target']}"
+    elif not schedule.get("frequency"):
+        return "A frequency is required to schedule a random pick"
+    elif schedule.get("strategy") and schedule["strategy"] not in PICKING_STRATEGIES:
+        return f"Unknown picking strategy {schedule['strategy']}"
+    elif not isinstance(schedule.get("count", 1), int) or schedule.get("count", 1) < 1:
+        return "The number of people to pick must be a positive integer"
+    return None
+
+
+def make_trigger(
+    frequency: Union[datetime, "RecurringEvent"], user_tz: Text
+) -> Union[CronTrigger, DateTrigger]:
+    """
+    Return the trigger of a frequency, in the timezone of the user.
+
+    Raise KeyError or ValueError if the frequency or the timezone isn't supported.
+    """
+    if isinstance(frequency, datetime):
+        return DateTrigger(run_date=frequency, timezone=user_tz)
+    return CronTrigger(
+        timezone=user_tz, **convert_recurring_event_to_trigger_format(frequency)
+    )
+
+
 def schedule_randompick_for_later(
-    frequency: Union[datetime, RecurringEvent],
+    frequency: Union[datetime, "RecurringEvent"],
     user_tz: Text,
     target: Text,
     task: Text,
     user_id: Text,
     channel_id: Text,
     team_id: Text,
+    strategy: Optional[Text] = None,
+    count: int = 1,
+    trigger: Optional[Union[CronTrigger, DateTrigger]] = None,
 ):
     """
     Schedule a job to send a Slack message later, using the `pick_user_and_send_message`
-    function.
+    function, and the given picking strategy if any, to pick `count` users.
+    The trigger is made from the frequency, unless it is given.
+
+    Raise QuotaExceeded if the team or the channel has too many jobs already.
     """
-    if isinstance(frequency, datetime):
-        trigger_params = {
-            "trigger": "date",
-            "run_date": frequency,
-            "timezone": user_tz,
-        }
-    else:
-        trigger_params = {
-            "trigger": "cron",
-            "timezone": user_tz,
-        }
-        trigger_params.update(convert_recurring_event_to_trigger_format(frequency))
+    if trigger is None:
+        trigger = make_trigger(frequency, user_tz)
 
+    kwargs: Dict[Text, Union[Text, int]] = {
+        "channel_id": channel_id,
+        "target": target,
+        "task": task,
+    }
+    if strategy:
+        kwargs["strategy"] = strategy
+    if count > 1:
+        kwargs["count"] = count
+    job_id = make_job_id(team_id, user_id, task, target, frequency, count)
+    check_job_quotas(
+        jobstore, job_id, team_id, channel_id, MAX_JOBS_PER_TEAM, MAX_JOBS_PER_CHANNEL
+    )
     return scheduler.add_job(
         pick_user_and_send_message,
-        kwargs={"channel_id": channel_id, "target": target, "task": task},
-        id=make_job_id(team_id, user_id, task, target, frequency),
+        trigger=trigger,
+        kwargs=kwargs,
+        id=job_id,
+        # the description is stored, so that listing jobs doesn't compute it
+        name=format_trigger(trigger),
         replace_existing=True,  # replace job with same id
         misfire_grace_time=600,
         coalesce=True,
-        **trigger_params,
     )
 
 
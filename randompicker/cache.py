@@ -0,0 +1,127 @@
+from collections import defaultdict, OrderedDict
+import time
+from typing import Any, DefaultDict, Hashable, Optional
+
+
+class LRUCache:
+    """
+    A bounded mapping that evicts the least recently used entries,
+    and keeps track of its hits and misses.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Optional[Any]:
+        """
+        Return the value cached for key, or default if it isn't cached.
+        """
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Cache value for key, evicting the least recently used entry if full.
+        """
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Empty the cache and reset its statistics.
+        """
+        self._data.clear()
+        self.hits = self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Ratio of lookups that were served from the cache.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TTLCache(LRUCache):
+    """
+    An LRU cache whose entries expire `ttl` seconds after they are set.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        super().__init__(maxsize)
+        self.ttl = ttl
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Optional[Any]:
+        """
+        Return the value cached for key, or default if it isn't cached or expired.
+        """
+        entry = self._data.get(key)
+        if entry is not None and entry[0] <= time.monotonic():
+            del self._data[key]
+        entry = super().get(key)
+        return default if entry is None else entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Cache value for key until the ttl elapses.
+        """
+        super().set(key, (time.monotonic() + self.ttl, value))
+
+
+class VersionedCache:
+    """
+    An LRU cache of values that depend on a namespace, which is invalidated
+    at once by bumping the version of the namespace.
+    """
+
+    def __init__(self, maxsize: int):
+        self.versions: DefaultDict[Hashable, int] = defaultdict(int)
+        self.cache = LRUCache(maxsize)
+
+    def get(self, namespace: Hashable, key: Hashable) -> Optional[Any]:
+        """
+        Return the value cached for key in the current version of namespace.
+        """
+        return self.cache.get((namespace, self.versions[namespace], key))
+
+    def set(self, namespace: Hashable, key: Hashable, value: Any) -> None:
+        """
+        Cache value for key in the current version of namespace.
+        """
+        self.cache.set((namespace, self.versions[namespace], key), value)
+
+    def bump(self, namespace: Hashable) -> None:
+        """
+        Invalidate the values of namespace: they can't be looked up anymore,
+        and will be evicted with the least recently used ones.
+        """
+        self.versions[namespace] += 1
+
+    def clear(self) -> None:
+        """
+        Invalidate all the namespaces.
+        """
+        self.versions.clear()
+        self.cache.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Ratio of lookups that were served from the cache.
+        """
+        return self.cache.hit_rate
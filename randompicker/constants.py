@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 
 DATABASE_URL = os.environ["DATABASE_URL"]
@@ -6,3 +7,43 @@ DATABASE_URL = os.environ["DATABASE_URL"]
 SLACK_SIGNING_SECRET = os.environ["SLACK_SIGNING_SECRET"]
 
 SLACK_TOKEN = os.environ["SLACK_TOKEN"]
+
+# base URL of the Slack Web API, to use a stand-in such as `benchmarks.fake_slack`
+SLACK_API_URL = os.environ.get("SLACK_API_URL", "https://www.slack.com/api/")
+
+# bearer token of the admin endpoints, which are disabled if it isn't set
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+# rate (in picks per second) at which missed picks are caught up after a restart
+MISFIRE_RECOVERY_RATE = float(os.environ.get("MISFIRE_RECOVERY_RATE", "1"))
+
+# number of job lists kept in cache
+LISTING_CACHE_SIZE = int(os.environ.get("LISTING_CACHE_SIZE", "1000"))
+
+# interval (in seconds) between two writes of the pick history
+HISTORY_FLUSH_INTERVAL = float(os.environ.get("HISTORY_FLUSH_INTERVAL", "10"))
+
+# event loop lag (in seconds) above which listing and scheduling requests are refused
+LOAD_SHEDDING_LAG = float(os.environ.get("LOAD_SHEDDING_LAG", "0.5"))
+
+# number of commands a user, or a whole team, can send per minute
+USER_COMMAND_RATE = float(os.environ.get("USER_COMMAND_RATE", "10"))
+TEAM_COMMAND_RATE = float(os.environ.get("TEAM_COMMAND_RATE", "60"))
+
+# maximum number of active random picks of a team, and of a channel
+MAX_JOBS_PER_TEAM = int(os.environ.get("MAX_JOBS_PER_TEAM", "1000"))
+MAX_JOBS_PER_CHANNEL = int(os.environ.get("MAX_JOBS_PER_CHANNEL", "100"))
+
+# directory where the profiles of requests and job runs are saved
+PROFILES_DIR = os.environ.get(
+    "PROFILES_DIR", os.path.join(tempfile.gettempdir(), "randompicker-profiles")
+)
+
+# maximum number of log records waiting to be written, the next ones are dropped
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+
+# ratio of the info records kept by logger, such as `sanic.access=0.1`
+LOG_SAMPLING = os.environ.get("LOG_SAMPLING", "")
+
+# format of the log records, `json` for structured records
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")
@@ -0,0 +1,37 @@
+from functools import partial
+from typing import Any, Callable
+
+from sanic import response
+
+try:
+    # ujson is installed along with sanic on CPython
+    from ujson import dumps as ujson_dumps, loads as json_loads
+
+    json_dumps: Callable[[Any], str] = partial(
+        ujson_dumps, escape_forward_slashes=False
+    )
+except ImportError:  # pragma: no cover
+    from json import dumps, loads as json_loads  # type: ignore
+
+    json_dumps = partial(dumps, separators=(",", ":"))
+
+
+def encode_json(body: Any) -> bytes:
+    """
+    Encode a JSON response body once, to be sent with `static_json_response`.
+    """
+    return json_dumps(body).encode()
+
+
+def static_json_response(body: bytes) -> response.HTTPResponse:
+    """
+    Return a response for a JSON body encoded with `encode_json`.
+    """
+    return response.raw(body, content_type="application/json")
+
+
+def json_response(request, body: Any, status: int = 200) -> response.HTTPResponse:
+    """
+    Return a JSON response, encoded with the JSON encoder configured on the app.
+    """
+    return response.json(body, status=status, dumps=request.app.config.JSON_DUMPS)
@@ -1,10 +1,13 @@
 from collections import OrderedDict
-from typing import Dict, List, Text, Union, Collection
+import functools
+from typing import Dict, List, Optional, Text, Union, Collection, TYPE_CHECKING
 
 from apscheduler.job import Job
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.date import DateTrigger
-import cron_descriptor
+
+if TYPE_CHECKING:  # pragma: no cover
+    from randompicker.history import PickStats
 
 
 COMMAND_NAME = "/pickrandom"
@@ -12,6 +15,8 @@ COMMAND_NAME = "/pickrandom"
 
 SLACK_ACTION_REMOVE_JOB = "REMOVE_JOB"
 SLACK_ACTION_CLOSE = "CLOSE_EPHEMERAL_MESSAGE"
+SLACK_ACTION_PREVIOUS_PAGE = "PREVIOUS_JOBS_PAGE"
+SLACK_ACTION_NEXT_PAGE = "NEXT_JOBS_PAGE"
 CLOSE_BLOCK = {
     "type": "actions",
     "elements": [
@@ -33,8 +38,11 @@ HELP = {
                     f"_{COMMAND_NAME}_ @group to do something\n"
                     f"_{COMMAND_NAME}_ @group to do something every day at 9am\n"
                     f"_{COMMAND_NAME}_ @group to do something on Monday at 9am\n"
+                    f"_{COMMAND_NAME}_ @group 2 people to do something every day\n"
                     f"_{COMMAND_NAME}_ #channel to do something\n"
                     f"_{COMMAND_NAME}_ list\n"
+                    f"_{COMMAND_NAME}_ stats\n\n"
+                    f"Schedule several random picks at once with one command per line."
                 ),
             },
         },
@@ -43,28 +51,76 @@ HELP = {
 }
 
 
+NO_JOBS = {
+    "blocks": [
+        {
+            "type": "section",
+            "text": {
+                "type": "plain_text",
+                "text": "You haven't configured any random picks.",
+            },
+        },
+        CLOSE_BLOCK,
+    ]
+}
+
+
 KEY_THIS_CHANNEL = "In this channel"
 KEY_OTHER_CHANNEL = "Other channels"
 KEY_USER_GROUPS = "User groups"
 
 
-async def format_scheduled_jobs(channel: Text, jobs: List[Job]) -> Dict:
+NO_STATS = {
+    "blocks": [
+        {
+            "type": "section",
+            "text": {"type": "plain_text", "text": "Nobody has been picked yet."},
+        },
+        CLOSE_BLOCK,
+    ]
+}
+
+
+def format_pick_stats(stats: List["PickStats"]) -> Dict:
     """
-    Format the list of user jobs to text.
+    Format the number of picks of the users, and the date of their last pick.
     """
-    if not jobs:
-        return {
-            "blocks": [
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "plain_text",
-                        "text": "You haven't configured any random picks.",
-                    },
+    if not stats:
+        return NO_STATS
+
+    lines = [
+        f"{mention_slack_id(user_stats.user_id)}: "
+        f"{user_stats.picks} pick{'s' if user_stats.picks > 1 else ''}, "
+        f"last on <!date^{int(user_stats.last_picked_at.timestamp())}^{{date_short}}"
+        f"|{user_stats.last_picked_at:%Y-%m-%d}>"
+        for user_stats in stats
+    ]
+    return {
+        "blocks": [
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": "*Most picked people*\n" + "\n".join(lines),
                 },
-                CLOSE_BLOCK,
-            ]
-        }
+            },
+            CLOSE_BLOCK,
+        ]
+    }
+
+
+async def format_scheduled_jobs(
+    channel: Text,
+    jobs: List[Job],
+    previous_cursor: Optional[Text] = None,
+    next_cursor: Optional[Text] = None,
+) -> Dict:
+    """
+    Format the list of user jobs to text. If the jobs are a page of the list,
+    the cursors of the previous and next pages are given to add buttons.
+    """
+    if not jobs:
+        return NO_JOBS
 
     jobs_by_category = split_jobs_by_category(channel, jobs)
     blocks: List[Dict[Text, Union[Collection[Text], object]]] = []
@@ -82,7 +138,8 @@ async def format_scheduled_jobs(channel: Text, jobs: List[Job]) -> Dict:
                     "text": {
                         "type": "mrkdwn",
                         "text": f"_{COMMAND_NAME}_ {mention_slack_id(job.kwargs['target'])} "
-                        f"to {job.kwargs['task']} {format_trigger(job.trigger)}",
+                        f"{_format_job_count(job)}to {job.kwargs['task']} "
+                        f"{format_job_trigger(job)}",
                     },
                     "accessory": {
                         "type": "button",
@@ -94,10 +151,105 @@ async def format_scheduled_jobs(channel: Text, jobs: List[Job]) -> Dict:
                 }
             )
 
+    if previous_cursor or next_cursor:
+        blocks.append(format_pagination(previous_cursor, next_cursor))
     blocks.append(CLOSE_BLOCK)
     return {"blocks": blocks}
 
 
+def remove_job_block(blocks: List[Dict], job_id: Text) -> Optional[Dict]:
+    """
+    Patch the blocks of a message from `format_scheduled_jobs` to remove a job,
+    along with its category if it was the last job of the category.
+
+    Return None if there are jobs on other pages but none left in the message,
+    in which case the message has to be formatted again.
+    """
+    jobs_blocks = [
+        block
+        for block in blocks
+        if _is_job_block(block) and not _is_job_block(block, job_id)
+    ]
+    if not jobs_blocks:
+        if any(_is_pagination_block(block) for block in blocks):
+            return None
+        return NO_JOBS
+
+    patched_blocks: List[Dict] = []
+    for block in blocks:
+        if _is_job_block(block, job_id):
+            continue
+        # drop the categories that were left empty
+        if (
+            patched_blocks
+            and _is_category_block(patched_blocks[-1])
+            and not _is_job_block(block)
+        ):
+            patched_blocks.pop()
+        patched_blocks.append(block)
+    return {"blocks": patched_blocks}
+
+
+def get_page_start(blocks: List[Dict]) -> Optional[Text]:
+    """
+    Return the cursor of the previous page in the blocks of a message from
+    `format_scheduled_jobs`: the id of the first job of the page. Return None
+    for the first page.
+    """
+    for block in blocks:
+        if _is_pagination_block(block):
+            for element in block["elements"]:
+                if element.get("action_id") == SLACK_ACTION_PREVIOUS_PAGE:
+                    return element.get("value")
+    return None
+
+
+def _is_job_block(block: Dict, job_id: Optional[Text] = None) -> bool:
+    accessory = block.get("accessory") or {}
+    return accessory.get("action_id") == SLACK_ACTION_REMOVE_JOB and (
+        job_id is None or accessory.get("value") == job_id
+    )
+
+
+def _is_category_block(block: Dict) -> bool:
+    return block.get("type") == "section" and "accessory" not in block
+
+
+def _is_pagination_block(block: Dict) -> bool:
+    return block.get("type") == "actions" and any(
+        element.get("action_id") in (SLACK_ACTION_PREVIOUS_PAGE, SLACK_ACTION_NEXT_PAGE)
+        for element in block.get("elements", [])
+    )
+
+
+def format_pagination(
+    previous_cursor: Optional[Text], next_cursor: Optional[Text]
+) -> Dict:
+    """
+    Format the buttons to navigate between pages of jobs.
+    """
+    elements = []
+    if previous_cursor:
+        elements.append(
+            {
+                "type": "button",
+                "text": {"type": "plain_text", "text": "Previous"},
+                "value": previous_cursor,
+                "action_id": SLACK_ACTION_PREVIOUS_PAGE,
+            }
+        )
+    if next_cursor:
+        elements.append(
+            {
+                "type": "button",
+                "text": {"type": "plain_text", "text": "Next"},
+                "value": next_cursor,
+                "action_id": SLACK_ACTION_NEXT_PAGE,
+            }
+        )
+    return {"type": "actions", "elements": elements}
+
+
 def split_jobs_by_category(channel: Text, jobs: List[Job]) -> Dict[Text, List[Job]]:
     """
     Split jobs in 3 categories:
@@ -129,37 +281,108 @@ def split_jobs_by_category(channel: Text, jobs: List[Job]) -> Dict[Text, List[Jo
     return output
 
 
+def _format_job_count(job: Job) -> Text:
+    """
+    Format the number of people a job picks, if it picks several.
+    """
+    count = job.kwargs.get("count", 1)
+    return f"{count} people " if count > 1 else ""
+
+
+def format_job_trigger(job: Job) -> Text:
+    """
+    Return the human readable trigger of a job. It is stored as the job name
+    when the job is scheduled, jobs scheduled before that fall back to
+    `format_trigger`.
+    """
+    if job.name != job.func.__name__:
+        return job.name
+    return format_trigger(job.trigger)
+
+
 def format_trigger(trigger: Union[CronTrigger, DateTrigger]) -> Text:
     """
     Format a trigger to human readable format.
     """
     if isinstance(trigger, CronTrigger):
         trigger_fields = {field.name: str(field) for field in trigger.fields}
-        description = remove_first_cap(
-            cron_descriptor.get_description(
-                f"{trigger_fields['minute']} {trigger_fields['hour']} {trigger_fields['day']} "
-                f"{trigger_fields['month']} {trigger_fields['day_of_week']}"
-            ).replace("only on", "every")
+        return _format_cron_fields(
+            trigger_fields["minute"],
+            trigger_fields["hour"],
+            trigger_fields["day"],
+            trigger_fields["month"],
+            trigger_fields["day_of_week"],
+            trigger_fields["week"],
         )
-        if trigger_fields["day"] == "*" and trigger_fields["day_of_week"] == "*":
-            description = f"{description}, every day"
-        elif trigger_fields["week"].startswith("*/"):
-            week_interval = int(trigger_fields["week"][2:])
-            week_interval_ordinal = (
-                "other" if week_interval == 2 else format_ordinal(week_interval)
-            )
-            description = f"{description}, every {week_interval_ordinal} week"
-
-        return description
 
     return trigger.run_date.strftime("on %A %B %-d at %I:%M %p")
 
 
-def format_slack_message(user: Text, task: Text) -> Text:
+def preload_formatters() -> None:
+    """
+    Import and exercise the formatting libraries, so that the first
+    command doesn't pay for their loading time.
+    """
+    format_trigger(CronTrigger(hour="9", minute="0", timezone="UTC"))
+
+
+@functools.lru_cache(maxsize=512)
+def _format_cron_fields(
+    minute: Text, hour: Text, day: Text, month: Text, day_of_week: Text, week: Text
+) -> Text:
+    """
+    Format the fields of a cron trigger to human readable format.
+    """
+    import cron_descriptor
+
+    description = remove_first_cap(
+        cron_descriptor.get_description(
+            f"{minute} {hour} {day} {month} {day_of_week}"
+        ).replace("only on", "every")
+    )
+    if day == "*" and day_of_week == "*":
+        description = f"{description}, every day"
+    elif week.startswith("*/"):
+        week_interval = int(week[2:])
+        week_interval_ordinal = (
+            "other" if week_interval == 2 else format_ordinal(week_interval)
+        )
+        description = f"{description}, every {week_interval_ordinal} week"
+
+    return description
+
+
+def cron_description_hit_rate() -> float:
+    """
+    Ratio of cron trigger descriptions that were served from the cache.
+    """
+    info = _format_cron_fields.cache_info()
+    lookups = info.hits + info.misses
+    return info.hits / lookups if lookups else 0.0
+
+
+def format_slack_message(users: List[Text], task: Text) -> Text:
+    """
+    Format Slack message to send to the picked members.
+    """
+    return f"{format_mentions(users)} you have been picked to {task}"
+
+
+def format_mentions(slack_ids: List[Text]) -> Text:
+    """
+    Format a list of slack ids as mentions: "<@U1>, <@U2> and <@U3>".
+    """
+    mentions = [mention_slack_id(slack_id) for slack_id in slack_ids]
+    if len(mentions) == 1:
+        return mentions[0]
+    return f"{', '.join(mentions[:-1])} and {mentions[-1]}"
+
+
+def format_count(count: int) -> Text:
     """
-    Format Slack message to send to member.
+    Format the number of people to pick: "someone", "2 people".
     """
-    return f"{mention_slack_id(user)} you have been picked to {task}"
+    return "someone" if count == 1 else f"{count} people"
 
 
 def mention_slack_id(slack_id: Text):
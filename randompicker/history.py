@@ -0,0 +1,166 @@
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Text, Tuple
+
+from apscheduler.events import JobExecutionEvent
+from sqlalchemy import (
+    Column,
+    Float,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    and_,
+    select,
+)
+from sqlalchemy.engine import Engine
+
+
+class PickStats(NamedTuple):
+    user_id: Text
+    picks: int
+    last_picked_at: datetime
+
+
+class PickHistory:
+    """
+    Append-only history of the picks, with per-user counters maintained along,
+    so that stats never scan the history.
+
+    Picks are recorded in memory, and written in batches by `flush`.
+    """
+
+    def __init__(self, engine: Engine, batch_size: int = 100):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.pending: List[Tuple[Text, Optional[Text], Text, float]] = []
+
+        self.metadata = MetaData()
+        self.history_t = Table(
+            "pick_history",
+            self.metadata,
+            Column("id", Integer, primary_key=True),
+            Column("team_id", String(32), nullable=False),
+            Column("job_id", String(191)),
+            Column("user_id", String(32), nullable=False),
+            Column("picked_at", Float(25), nullable=False),
+            Index("ix_pick_history_team_id_user_id", "team_id", "user_id"),
+            Index("ix_pick_history_job_id", "job_id"),
+        )
+        self.stats_t = Table(
+            "pick_stats",
+            self.metadata,
+            Column("team_id", String(32), primary_key=True),
+            Column("user_id", String(32), primary_key=True),
+            Column("picks", Integer, nullable=False),
+            Column("last_picked_at", Float(25), nullable=False),
+        )
+        self.metadata.create_all(self.engine)
+
+    def record(
+        self,
+        team_id: Text,
+        job_id: Optional[Text],
+        users: List[Text],
+        picked_at: datetime,
+    ) -> None:
+        """
+        Record the users picked by a job (None for immediate picks), and write
+        the pending picks if there are enough of them.
+        """
+        timestamp = picked_at.timestamp()
+        self.pending.extend((team_id, job_id, user, timestamp) for user in users)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write the pending picks to the history, and update the counters,
+        in a single transaction.
+        """
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, []
+
+        counts: Counter = Counter()
+        last_picked_at: Dict[Tuple[Text, Text], float] = {}
+        for team_id, _, user_id, timestamp in pending:
+            counts[team_id, user_id] += 1
+            last_picked_at[team_id, user_id] = max(
+                timestamp, last_picked_at.get((team_id, user_id), timestamp)
+            )
+
+        with self.engine.begin() as connection:
+            connection.execute(
+                self.history_t.insert(),
+                [
+                    {
+                        "team_id": team_id,
+                        "job_id": job_id,
+                        "user_id": user_id,
+                        "picked_at": timestamp,
+                    }
+                    for team_id, job_id, user_id, timestamp in pending
+                ],
+            )
+            for (team_id, user_id), count in counts.items():
+                where = and_(
+                    self.stats_t.c.team_id == team_id,
+                    self.stats_t.c.user_id == user_id,
+                )
+                previous = connection.execute(
+                    select([self.stats_t.c.last_picked_at]).where(where)
+                ).scalar()
+                if previous is None:
+                    connection.execute(
+                        self.stats_t.insert().values(
+                            team_id=team_id,
+                            user_id=user_id,
+                            picks=count,
+                            last_picked_at=last_picked_at[team_id, user_id],
+                        )
+                    )
+                else:
+                    connection.execute(
+                        self.stats_t.update()
+                        .where(where)
+                        .values(
+                            picks=self.stats_t.c.picks + count,
+                            last_picked_at=max(
+                                previous, last_picked_at[team_id, user_id]
+                            ),
+                        )
+                    )
+
+    def get_stats(self, team_id: Text, limit: int = 20) -> List[PickStats]:
+        """
+        Return the users of a team picked the most often, with their counters.
+        """
+        self.flush()
+        selectable = (
+            select([self.stats_t])
+            .where(self.stats_t.c.team_id == team_id)
+            .order_by(self.stats_t.c.picks.desc(), self.stats_t.c.user_id)
+            .limit(limit)
+        )
+        return [
+            PickStats(
+                row.user_id,
+                row.picks,
+                datetime.fromtimestamp(row.last_picked_at, timezone.utc),
+            )
+            for row in self.engine.execute(selectable)
+        ]
+
+
+def record_pick_history(history: PickHistory, event: JobExecutionEvent) -> None:
+    """
+    When a job finishes, we record the users it picked.
+    """
+    history.record(
+        event.job_id.split("-", 1)[0],
+        event.job_id,
+        event.retval.users,
+        datetime.now(timezone.utc),
+    )
@@ -1,13 +1,31 @@
 from copy import deepcopy
-from datetime import datetime
+from datetime import datetime, timedelta
 import hashlib
 import re
-from typing import List, Optional, Text, Union
+from typing import Dict, List, NamedTuple, Optional, Text, Tuple, Union, TYPE_CHECKING
 
-from apscheduler.events import JobExecutionEvent
+from apscheduler.events import JobEvent, JobExecutionEvent, SchedulerEvent
 from apscheduler.job import Job
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from recurrent import RecurringEvent
+from apscheduler.triggers.date import DateTrigger
+
+from randompicker.cache import VersionedCache
+from randompicker.metrics import COALESCED_RUNS, ERRORS, MISSED_RUNS
+
+if TYPE_CHECKING:  # pragma: no cover
+    from recurrent import RecurringEvent
+
+    from randompicker.jobstore import RandomPickerJobStore
+
+
+class JobsPage(NamedTuple):
+    jobs: List[Job]
+    previous_cursor: Optional[Text]
+    next_cursor: Optional[Text]
+
+
+# a Slack message can have 50 blocks: leave room for categories and buttons
+JOBS_PAGE_SIZE = 40
 
 
 def make_job_id(
@@ -15,7 +33,8 @@ def make_job_id(
     user_id: Text,
     task: Text,
     target: Text,
-    frequency: Union[datetime, RecurringEvent],
+    frequency: Union[datetime, "RecurringEvent"],
+    count: int = 1,
 ) -> Text:
     """
     Make a job id from team id, user id and a hash of the task.
@@ -25,27 +44,147 @@ def make_job_id(
         if isinstance(frequency, datetime)
         else repr(frequency.get_params())
     )
-    task_id = hashlib.sha1(f"{task}{target}{freq_repr}".encode()).hexdigest()
+    # the count is left out when it is 1, to keep the ids of existing jobs
+    count_repr = str(count) if count > 1 else ""
+    task_id = hashlib.sha1(
+        f"{task}{target}{freq_repr}{count_repr}".encode()
+    ).hexdigest()
     return f"{team_id}-{user_id}-{task_id}"
 
 
-def list_scheduled_jobs(scheduler: AsyncIOScheduler, team_id: Text) -> List[Job]:
+def list_scheduled_jobs_page(
+    jobstore: "RandomPickerJobStore",
+    team_id: Text,
+    cursor: Optional[Text] = None,
+    backwards: bool = False,
+) -> JobsPage:
     """
-    Return all the jobs matching team_id.
+    Return a page of the jobs matching team_id, sorted by id. Only the jobs
+    of the page are loaded from the job store.
+
+    The cursor is the id of the job after which the page starts,
+    or before which it ends if `backwards` is True.
     """
     id_re = re.compile(rf"^{team_id}\-U[A-Z0-9]+\-[a-f0-9]{{40}}$")
-    return [job for job in scheduler.get_jobs() if id_re.match(job.id)]
+    prefix = f"{team_id}-"
+    if backwards:
+        jobs = jobstore.get_jobs_by_prefix(
+            prefix, before=cursor, limit=JOBS_PAGE_SIZE + 1
+        )
+        has_previous, has_next = len(jobs) > JOBS_PAGE_SIZE, cursor is not None
+        jobs = jobs[-JOBS_PAGE_SIZE:]
+    else:
+        jobs = jobstore.get_jobs_by_prefix(
+            prefix, after=cursor, limit=JOBS_PAGE_SIZE + 1
+        )
+        has_previous, has_next = cursor is not None, len(jobs) > JOBS_PAGE_SIZE
+        jobs = jobs[:JOBS_PAGE_SIZE]
+
+    return JobsPage(
+        jobs=[job for job in jobs if id_re.match(job.id)],
+        previous_cursor=jobs[0].id if jobs and has_previous else None,
+        next_cursor=jobs[-1].id if jobs and has_next else None,
+    )
+
+
+def invalidate_team_cache(
+    cache: VersionedCache, event: Union[JobEvent, SchedulerEvent]
+) -> None:
+    """
+    When jobs are added, modified or removed, invalidate the cached values
+    of their team.
+    """
+    if isinstance(event, JobEvent):
+        cache.bump(event.job_id.split("-", 1)[0])
+    else:  # all jobs removed
+        cache.clear()
+
+
+def count_job_error(event: JobExecutionEvent) -> None:
+    """
+    When a job raises, we count the error.
+    """
+    ERRORS.inc(source="job")
 
 
 def update_picker_rotation(
     scheduler: AsyncIOScheduler, event: JobExecutionEvent
 ) -> None:
     """
-    When a job finishes, we update its `previous_user_picks`
-    parameter so that next time it runs, it will be able to
-    pick users that were never picked.
+    When a job finishes, we update its `rotation` parameter
+    so that next time it runs, it will continue the rotation
+    and pick users that were not picked yet.
     """
     job = scheduler.get_job(event.job_id)
     new_kwargs = deepcopy(job.kwargs)
-    new_kwargs["previous_user_picks"] = event.retval
+    new_kwargs.pop("previous_user_picks", None)
+    new_kwargs["rotation"] = event.retval.rotation
     job.modify(kwargs=new_kwargs)
+
+
+def recover_missed_jobs(
+    jobstore: "RandomPickerJobStore",
+    rate: float,
+    now: datetime,
+    missed_run_times: Optional[Dict[Text, datetime]] = None,
+) -> Tuple[int, int]:
+    """
+    Spread the catch-up of jobs that were missed while the scheduler was down,
+    instead of letting them all fire at the same instant on startup.
+
+    Missed jobs are ordered by their misfire grace deadline (closest first)
+    and rescheduled one every `1 / rate` seconds. Jobs whose slot would land
+    after their deadline are dropped: recurring jobs move on to their next
+    run time, one-off jobs are removed. A rate of 0 or less drops them all.
+
+    The dropped jobs are counted as missed runs, and the other run times
+    missed by a job as coalesced runs, like the lag tracker does while the
+    scheduler runs.
+
+    If `missed_run_times` is given, it is filled with the missed run time
+    of the recovered jobs, by job id, as their next run is the catch-up slot.
+
+    Only the missed jobs are loaded from the job store. Its scheduler should
+    be paused while this runs. Returns the number of recovered and dropped jobs.
+    """
+    missed = []
+    for job in jobstore.get_due_jobs(now):
+        # find the last run time that was missed, like the scheduler would do
+        # when coalescing
+        last_run_time = run_time = job.next_run_time
+        missed_runs = 0
+        while run_time and run_time <= now:
+            last_run_time = run_time
+            missed_runs += 1
+            run_time = job.trigger.get_next_fire_time(run_time, now)
+        # the runs before the last one are coalesced into it
+        if missed_runs > 1:
+            COALESCED_RUNS.inc(missed_runs - 1)
+
+        deadline = (
+            last_run_time + timedelta(seconds=job.misfire_grace_time)
+            if job.misfire_grace_time is not None
+            else datetime.max.replace(tzinfo=now.tzinfo)
+        )
+        missed.append((deadline, job, last_run_time, run_time))
+
+    recovered = dropped = 0
+    interval = timedelta(seconds=1 / rate) if rate > 0 else None
+    for deadline, job, missed_run_time, next_run_time in sorted(
+        missed, key=lambda item: item[0]
+    ):
+        slot = now + interval * recovered if interval is not None else None
+        if slot is not None and slot <= deadline:
+            job.modify(next_run_time=slot)
+            if missed_run_times is not None:
+                missed_run_times[job.id] = missed_run_time
+            recovered += 1
+        else:
+            if isinstance(job.trigger, DateTrigger) or next_run_time is None:
+                job.remove()
+            else:
+                job.modify(next_run_time=next_run_time)
+            dropped += 1
+            MISSED_RUNS.inc()
+
+    return recovered, dropped
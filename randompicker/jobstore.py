@@ -0,0 +1,140 @@
+from contextlib import contextmanager
+import functools
+from typing import Callable, Iterator, List, Optional, Text, Union
+
+from apscheduler.job import Job
+from apscheduler.jobstores.base import ConflictingIdError
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from sqlalchemy import func, select
+from sqlalchemy.engine import Connection, Engine
+
+from randompicker.metrics import JOBSTORE_DURATION
+
+
+# job store operations whose duration is measured
+JOBSTORE_OPERATIONS = (
+    "lookup_job",
+    "get_due_jobs",
+    "get_next_run_time",
+    "get_all_jobs",
+    "get_jobs_by_prefix",
+    "has_job",
+    "count_jobs_by_prefix",
+    "add_job",
+    "update_job",
+    "remove_job",
+    "remove_all_jobs",
+)
+
+
+class RandomPickerJobStore(SQLAlchemyJobStore):
+    """
+    SQLAlchemy job store that can group several writes in a single transaction,
+    and measures the duration of its operations.
+    """
+
+    engine: Union[Engine, Connection]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._in_transaction = False
+        for operation in JOBSTORE_OPERATIONS:
+            setattr(self, operation, _timed(getattr(self, operation), operation))
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Run all the job store statements of the block in a single transaction,
+        which is rolled back if the block raises.
+        """
+        engine = self.engine
+        with engine.begin() as connection:
+            # all the statements of the job store go through self.engine
+            self.engine = connection
+            self._in_transaction = True
+            try:
+                yield
+            finally:
+                self.engine = engine
+                self._in_transaction = False
+
+    def add_job(self, job: Job) -> None:
+        if self._in_transaction:
+            # an integrity error would abort the whole transaction on some
+            # databases, check for conflicts first
+            if self.has_job(job.id):
+                raise ConflictingIdError(job.id)
+        super().add_job(job)
+
+    def has_job(self, job_id: Text) -> bool:
+        """
+        Return True if the job exists, without loading it.
+        """
+        selectable = select([self.jobs_t.c.id]).where(self.jobs_t.c.id == job_id)
+        return bool(self.engine.execute(selectable).scalar())
+
+    def count_jobs_by_prefix(self, prefix: Text) -> int:
+        """
+        Return the number of jobs whose id starts with prefix, without loading them.
+        """
+        selectable = select([func.count()]).where(self._prefix_clause(prefix))
+        return self.engine.execute(selectable).scalar()
+
+    def _prefix_clause(self, prefix: Text):
+        """
+        Return the condition on the ids that start with prefix.
+        """
+        # SQLite doesn't use the primary key index for LIKE, but it compares
+        # the ids byte by byte, so the prefix is a range of ids. Collations of
+        # other databases may not order them this way.
+        if self.engine.dialect.name == "sqlite" and prefix and prefix.isascii():
+            upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+            return (self.jobs_t.c.id >= prefix) & (self.jobs_t.c.id < upper)
+        return self.jobs_t.c.id.startswith(prefix, autoescape=True)
+
+    def get_jobs_by_prefix(
+        self,
+        prefix: Text,
+        after: Optional[Text] = None,
+        before: Optional[Text] = None,
+        limit: Optional[int] = None,
+    ) -> List[Job]:
+        """
+        Return the jobs whose id starts with prefix, sorted by id. If `before` is
+        given, the last `limit` jobs before it are returned, otherwise the first
+        `limit` jobs after `after`.
+        """
+        selectable = select([self.jobs_t.c.id, self.jobs_t.c.job_state]).where(
+            self._prefix_clause(prefix)
+        )
+        if before is not None:
+            selectable = selectable.where(self.jobs_t.c.id < before).order_by(
+                self.jobs_t.c.id.desc()
+            )
+        else:
+            if after is not None:
+                selectable = selectable.where(self.jobs_t.c.id > after)
+            selectable = selectable.order_by(self.jobs_t.c.id)
+        if limit is not None:
+            selectable = selectable.limit(limit)
+
+        jobs = []
+        for row in self.engine.execute(selectable):
+            try:
+                jobs.append(self._reconstitute_job(row.job_state))
+            except BaseException:
+                self._logger.exception('Unable to restore job "%s"', row.id)
+        return jobs[::-1] if before is not None else jobs
+
+
+def _timed(method: Callable, operation: Text) -> Callable:
+    """
+    Wrap a job store method to measure its duration.
+    """
+
+    @functools.wraps(method)
+    def inner(*args, **kwargs):
+        with JOBSTORE_DURATION.time(operation=operation):
+            return method(*args, **kwargs)
+
+    return inner
@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Text
+
+from apscheduler.events import (
+    EVENT_JOB_ERROR,
+    EVENT_JOB_EXECUTED,
+    EVENT_JOB_MISSED,
+    EVENT_JOB_REMOVED,
+    EVENT_JOB_SUBMITTED,
+    JobEvent,
+    JobExecutionEvent,
+    JobSubmissionEvent,
+)
+from apscheduler.schedulers.base import BaseScheduler
+from apscheduler.triggers.base import BaseTrigger
+
+from randompicker.metrics import COALESCED_RUNS, ERRORS, MISSED_RUNS, SCHEDULER_LAG
+
+
+# events handled by the lag tracker
+LAG_EVENTS = (
+    EVENT_JOB_SUBMITTED
+    | EVENT_JOB_EXECUTED
+    | EVENT_JOB_ERROR
+    | EVENT_JOB_MISSED
+    | EVENT_JOB_REMOVED
+)
+
+LAG_STAGES = ("start", "delivery")
+
+# upper bound of the runs counted as coalesced, for a single run
+MAX_COALESCED_RUNS = 1000
+
+
+class LagTracker:
+    """
+    Scheduler listener that measures how late the jobs run:
+    - start: from the scheduled time to the submission of the run
+    - delivery: from the scheduled time to the end of the run, when the
+      message was sent
+
+    It also counts the missed runs, and the runs coalesced with a later one.
+    Failed runs are counted by `count_job_error`, and the runs missed while
+    the scheduler was down by `recover_missed_jobs`.
+
+    The runs caught up after a restart are measured from the run time they
+    missed, filled in `missed_run_times` by `recover_missed_jobs`, rather than
+    from their catch-up slot.
+    """
+
+    def __init__(self, scheduler: BaseScheduler):
+        self.scheduler = scheduler
+        # last scheduled run time submitted, by job id
+        self.last_run_times: Dict[Text, datetime] = {}
+        # missed run time of the runs being caught up, by job id
+        self.missed_run_times: Dict[Text, datetime] = {}
+
+    def handle_event(self, event: JobEvent) -> None:
+        now = datetime.now(timezone.utc)
+        if isinstance(event, JobSubmissionEvent):
+            run_time = self.missed_run_times.get(
+                event.job_id, event.scheduled_run_times[-1]
+            )
+            SCHEDULER_LAG.observe((now - run_time).total_seconds(), stage="start")
+            self._count_coalesced_runs(event.job_id, run_time)
+        elif isinstance(event, JobExecutionEvent):
+            run_time = self.missed_run_times.pop(event.job_id, event.scheduled_run_time)
+            if event.code == EVENT_JOB_EXECUTED:
+                SCHEDULER_LAG.observe(
+                    (now - run_time).total_seconds(), stage="delivery"
+                )
+            elif event.code == EVENT_JOB_MISSED:
+                MISSED_RUNS.inc()
+        elif event.code == EVENT_JOB_REMOVED:
+            self.last_run_times.pop(event.job_id, None)
+            self.missed_run_times.pop(event.job_id, None)
+
+    def _count_coalesced_runs(self, job_id: Text, run_time: datetime) -> None:
+        """
+        Count the fire times of the job trigger between its last run
+        and this one, which were coalesced into this run.
+        """
+        last_run_time = self.last_run_times.get(job_id)
+        self.last_run_times[job_id] = run_time
+        if last_run_time is None:
+            return
+
+        job = self.scheduler.get_job(job_id)
+        if job is None:  # one-off jobs are removed once submitted
+            return
+        coalesced = count_fire_times(job.trigger, last_run_time, run_time)
+        if coalesced:
+            COALESCED_RUNS.inc(coalesced)
+
+    def get_stats(self) -> Dict:
+        """
+        Return the lag quantiles and the number of missed and coalesced runs.
+        """
+        return {
+            "lag": {
+                stage: {
+                    "count": SCHEDULER_LAG.get_count(stage=stage),
+                    **{
+                        f"p{int(quantile * 100)}": value
+                        for quantile, value in SCHEDULER_LAG.get_quantiles(
+                            stage=stage
+                        ).items()
+                    },
+                }
+                for stage in LAG_STAGES
+            },
+            "missed_runs": MISSED_RUNS.get(),
+            "coalesced_runs": COALESCED_RUNS.get(),
+            "failed_runs": ERRORS.get(source="job"),
+        }
+
+
+def count_fire_times(trigger: BaseTrigger, start: datetime, end: datetime) -> int:
+    """
+    Count the fire times of the trigger strictly between start and end.
+    """
+    count = 0
+    fire_time = _get_fire_time_after(trigger, start)
+    while fire_time is not None and fire_time < end and count < MAX_COALESCED_RUNS:
+        count += 1
+        fire_time = _get_fire_time_after(trigger, fire_time)
+    return count
+
+
+def _get_fire_time_after(trigger: BaseTrigger, time: datetime) -> Optional[datetime]:
+    return trigger.get_next_fire_time(time, time + timedelta(microseconds=1))
@@ -0,0 +1,170 @@
+import copy
+from datetime import datetime, timezone
+import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
+import random
+from typing import Any, Dict, List, Sequence, Text
+
+from randompicker.encoding import json_dumps
+from randompicker.metrics import LOG_RECORDS_DROPPED
+
+
+# loggers whose records go through the queue, those configured by sanic
+QUEUED_LOGGERS = ("sanic.root", "sanic.error", "sanic.access")
+
+# attributes of all log records, the others are extra fields
+RECORD_ATTRIBUTES = frozenset(
+    vars(logging.LogRecord("", logging.INFO, "", 0, "", (), None))
+) | {"message", "asctime"}
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep a ratio of the records of some loggers, and of their children, below
+    the warning level. Warnings and errors are always kept.
+    """
+
+    def __init__(self, rates: Dict[Text, float]):
+        super().__init__()
+        self.rates = rates
+
+    def get_rate(self, name: Text) -> float:
+        while True:
+            if name in self.rates:
+                return self.rates[name]
+            if "." not in name:
+                return 1.0
+            name = name.rsplit(".", 1)[0]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        if random.random() < self.get_rate(record.name):
+            return True
+        LOG_RECORDS_DROPPED.inc(reason="sampled")
+        return False
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Put the records in a bounded queue, dropping them when it is full rather
+    than blocking the event loop.
+    """
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)  # type: ignore
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(reason="queue_full")
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Merge the arguments in the message, and format the exception, so that
+        the record can be formatted in another thread. Unlike the default
+        implementation, the message isn't formatted, so the handlers of the
+        listener keep their own formatters.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None  # type: ignore
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class DispatchingHandler(logging.Handler):
+    """
+    Handle the records from the queue with the original handlers of their
+    logger.
+    """
+
+    def __init__(self, handlers: Dict[Text, List[logging.Handler]]):
+        super().__init__()
+        self.handlers = handlers
+
+    def handle(self, record: logging.LogRecord) -> None:
+        # records of child loggers are handled by their configured ancestor
+        name = record.name
+        while name not in self.handlers and "." in name:
+            name = name.rsplit(".", 1)[0]
+        for handler in self.handlers.get(name, ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def emit(self, record: logging.LogRecord) -> None:  # pragma: no cover
+        self.handle(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format the records as JSON objects, with their extra fields.
+    """
+
+    def format(self, record: logging.LogRecord) -> Text:
+        data: Dict[Text, Any] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES and key not in data:
+                data[key] = value if isinstance(value, (int, float)) else str(value)
+        return json_dumps(data)
+
+
+def parse_sampling_rates(rates: Text) -> Dict[Text, float]:
+    """
+    Parse sampling rates of loggers, such as `sanic.access=0.1,sanic.root=0.5`.
+    """
+    parsed = {}
+    for rate in rates.split(","):
+        if rate.strip():
+            name, _, value = rate.partition("=")
+            parsed[name.strip()] = float(value)
+    return parsed
+
+
+def start_logging_queue(
+    maxsize: int,
+    sampling_rates: Dict[Text, float],
+    json_format: bool = False,
+    loggers: Sequence[Text] = QUEUED_LOGGERS,
+) -> QueueListener:
+    """
+    Replace the handlers of the loggers by a queue, whose records are written
+    by the original handlers in a thread, and return the listener of the queue
+    to stop it.
+    """
+    log_queue: queue.Queue = queue.Queue(maxsize)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sampling_rates))
+
+    handlers = {}
+    for name in loggers:
+        logger = logging.getLogger(name)
+        handlers[name] = logger.handlers
+        logger.handlers = [queue_handler]
+        if json_format:
+            for handler in handlers[name]:
+                handler.setFormatter(JsonFormatter())
+
+    listener = QueueListener(log_queue, DispatchingHandler(handlers))
+    listener.start()
+    return listener
+
+
+def stop_logging_queue(listener: QueueListener) -> None:
+    """
+    Write the records left in the queue, and restore the original handlers.
+    """
+    listener.stop()
+    (dispatcher,) = listener.handlers  # type: ignore
+    for name, handlers in dispatcher.handlers.items():
+        logging.getLogger(name).handlers = handlers
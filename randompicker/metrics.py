@@ -0,0 +1,340 @@
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+import time
+from typing import (
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Sequence,
+    Text,
+    Tuple,
+    TypeVar,
+)
+
+
+# upper bounds (in seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metric:
+    """
+    Base class of the metrics, which are rendered in the Prometheus text format.
+    Label values are given as keyword arguments, for all the label names.
+    """
+
+    type = "untyped"
+
+    def __init__(
+        self, name: Text, documentation: Text, labelnames: Sequence[Text] = ()
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[Text, Text]) -> Tuple[Text, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[Tuple[Text, Dict[Text, Text], float]]:
+        """
+        Yield the samples of the metric: name suffix, labels and value.
+        """
+        raise NotImplementedError  # pragma: no cover
+
+    def render(self) -> List[Text]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(labels)} {value!r}")
+        return lines
+
+
+class Counter(Metric):
+    """
+    A value that only goes up, such as a number of events.
+    """
+
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values: Dict[Tuple[Text, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: Text) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels: Text) -> float:
+        return self.values.get(self._key(labels), 0)
+
+    def samples(self):
+        for key, value in self.values.items():
+            yield "", dict(zip(self.labelnames, key)), float(value)
+
+
+class Gauge(Metric):
+    """
+    A value read when the metrics are rendered, from a function for each
+    set of labels.
+    """
+
+    type = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.functions: Dict[Tuple[Text, ...], Callable[[], float]] = {}
+
+    def set_function(self, function: Callable[[], float], **labels: Text) -> None:
+        self.functions[self._key(labels)] = function
+
+    def samples(self):
+        for key, function in self.functions.items():
+            yield "", dict(zip(self.labelnames, key)), float(function())
+
+
+class Histogram(Metric):
+    """
+    A distribution of values, such as durations, counted in buckets.
+    """
+
+    type = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(buckets)
+        # for each set of labels: count per bucket (the last one is +Inf), sum
+        self.values: Dict[Tuple[Text, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Text) -> None:
+        key = self._key(labels)
+        try:
+            counts, total = self.values[key]
+        except KeyError:
+            counts, total = self.values[key] = [0] * (len(self.buckets) + 1), [0.0]
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    @contextmanager
+    def time(self, **labels: Text) -> Iterator[None]:
+        """
+        Observe the duration of the block, in seconds.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def get_count(self, **labels: Text) -> int:
+        values = self.values.get(self._key(labels))
+        return sum(values[0]) if values else 0
+
+    def samples(self):
+        for key, (counts, total) in self.values.items():
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield "_bucket", {**labels, "le": le}, float(cumulative)
+            yield "_sum", labels, total[0]
+            yield "_count", labels, float(cumulative)
+
+
+class Summary(Metric):
+    """
+    A distribution of values, such as durations, summarized by quantiles
+    over a sliding window of the last observations.
+    """
+
+    type = "summary"
+
+    def __init__(
+        self,
+        *args,
+        quantiles: Sequence[float] = (0.5, 0.9, 0.99),
+        window: int = 1000,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.quantiles = tuple(quantiles)
+        self.window = window
+        # for each set of labels: last observations, sum and count of all of them
+        self.values: Dict[Tuple[Text, ...], Tuple[Deque[float], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Text) -> None:
+        key = self._key(labels)
+        try:
+            observations, totals = self.values[key]
+        except KeyError:
+            observations, totals = self.values[key] = deque(maxlen=self.window), [0, 0]
+        observations.append(value)
+        totals[0] += value
+        totals[1] += 1
+
+    def get_quantiles(self, **labels: Text) -> Dict[float, float]:
+        """
+        Return the quantiles of the last observations, by nearest rank.
+        """
+        values = self.values.get(self._key(labels))
+        if not values:
+            return {}
+        observations = sorted(values[0])
+        return {
+            quantile: observations[
+                min(int(quantile * len(observations)), len(observations) - 1)
+            ]
+            for quantile in self.quantiles
+        }
+
+    def get_count(self, **labels: Text) -> int:
+        values = self.values.get(self._key(labels))
+        return int(values[1][1]) if values else 0
+
+    def samples(self):
+        for key, (_, totals) in self.values.items():
+            labels = dict(zip(self.labelnames, key))
+            for quantile, value in self.get_quantiles(**labels).items():
+                yield "", {**labels, "quantile": repr(quantile)}, float(value)
+            yield "_sum", labels, float(totals[0])
+            yield "_count", labels, float(totals[1])
+
+
+MetricType = TypeVar("MetricType", bound=Metric)
+
+
+class Registry:
+    """
+    The set of metrics exposed by the `/metrics` endpoint.
+    """
+
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: MetricType) -> MetricType:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> Text:
+        """
+        Render all the metrics in the Prometheus text format.
+        """
+        return "".join(
+            f"{line}\n" for metric in self.metrics for line in metric.render()
+        )
+
+
+def _format_labels(labels: Dict[Text, Text]) -> Text:
+    if not labels:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+REGISTRY = Registry()
+
+REQUEST_DURATION = REGISTRY.register(
+    Histogram(
+        "randompicker_request_duration_seconds",
+        "Duration of the HTTP requests, by route.",
+        ["route", "method"],
+    )
+)
+SLACK_API_DURATION = REGISTRY.register(
+    Histogram(
+        "randompicker_slack_api_duration_seconds",
+        "Duration of the Slack API calls, by method.",
+        ["method"],
+    )
+)
+JOBSTORE_DURATION = REGISTRY.register(
+    Histogram(
+        "randompicker_jobstore_duration_seconds",
+        "Duration of the job store operations.",
+        ["operation"],
+    )
+)
+PICKS = REGISTRY.register(
+    Counter("randompicker_picks_total", "Number of people picked.", ["strategy"])
+)
+ERRORS = REGISTRY.register(
+    Counter(
+        "randompicker_errors_total",
+        "Number of errors, from failed requests, Slack API calls and jobs.",
+        ["source"],
+    )
+)
+HELP_FALLBACKS = REGISTRY.register(
+    Counter(
+        "randompicker_help_fallbacks_total",
+        "Number of commands that were not understood, answered with the help.",
+    )
+)
+CACHE_HIT_RATIO = REGISTRY.register(
+    Gauge(
+        "randompicker_cache_hit_ratio",
+        "Ratio of lookups served from the cache.",
+        ["cache"],
+    )
+)
+SCHEDULER_LAG = REGISTRY.register(
+    Summary(
+        "randompicker_scheduler_lag_seconds",
+        "Delay between the scheduled time of the picks and the start of their "
+        "run, or the delivery of their message.",
+        ["stage"],
+    )
+)
+MISSED_RUNS = REGISTRY.register(
+    Counter(
+        "randompicker_missed_runs_total",
+        "Number of runs of the jobs that were skipped, past their grace time.",
+    )
+)
+COALESCED_RUNS = REGISTRY.register(
+    Counter(
+        "randompicker_coalesced_runs_total",
+        "Number of runs of the jobs that were merged with a later run.",
+    )
+)
+EVENT_LOOP_LAG = REGISTRY.register(
+    Gauge(
+        "randompicker_event_loop_lag_seconds",
+        "Delay of the event loop in running scheduled callbacks, smoothed.",
+    )
+)
+SHED_REQUESTS = REGISTRY.register(
+    Counter(
+        "randompicker_shed_requests_total",
+        "Number of requests refused while the event loop was lagging, by kind of work.",
+        ["kind"],
+    )
+)
+DEDUPLICATED_RETRIES = REGISTRY.register(
+    Counter(
+        "randompicker_deduplicated_retries_total",
+        "Number of requests retried by Slack, answered with the original result.",
+    )
+)
+LOG_RECORDS_DROPPED = REGISTRY.register(
+    Counter(
+        "randompicker_log_records_dropped_total",
+        "Number of log records dropped, sampled out or because the queue was full.",
+        ["reason"],
+    )
+)
+LIMITED_REQUESTS = REGISTRY.register(
+    Counter(
+        "randompicker_limited_requests_total",
+        "Number of commands refused by the rate limits, and of jobs refused by "
+        "the limits of active jobs.",
+        ["limit"],
+    )
+)
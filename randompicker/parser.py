@@ -1,17 +1,38 @@
+from copy import deepcopy
 from datetime import datetime
 import re
-from typing import Dict, Optional, Text, Union
+from typing import Dict, Optional, Text, Tuple, Union, TYPE_CHECKING
 
-import dateparser
 from dateutil.rrule import rrulestr
-from recurrent import RecurringEvent
+
+from randompicker.cache import LRUCache
+
+if TYPE_CHECKING:  # pragma: no cover
+    from recurrent import RecurringEvent
 
 
 HELP_RE = re.compile(r"^help.*$")
 LIST_RE = re.compile(r"^\s*list\s*$")
+STATS_RE = re.compile(r"^\s*stats\s*$")
+
+
+# common recurring frequencies, recognized without the `recurrent` module:
+# every [other] day|weekday|weekend|<weekdays> [at <time>]
+WEEKDAY_NAME_PATTERN = (
+    r"(?:mondays?|mon|tuesdays?|tues|tue|wednesdays?|wed"
+    r"|thursdays?|thurs|thu|fridays?|fri|saturdays?|sat|sundays?|sun)"
+)
+COMMON_FREQUENCY_RE = re.compile(
+    r"^every (?P<other>other )?"
+    fr"(?P<days>day|weekday|weekends?|{WEEKDAY_NAME_PATTERN}"
+    fr"(?:(?:,| and|, and) {WEEKDAY_NAME_PATTERN})*)"
+    r"(?: at (?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?(?P<meridiem>am|pm)?)?$"
+)
+WEEKDAY_SEPARATOR_RE = re.compile(r",? and |, ")
 
 
-FREQUENCY_PATTERN = r"(on|every|next|today|tomorrow) (.+)"
+# parsed recurring events, keyed by normalized expression
+RECURRING_EVENT_CACHE = LRUCache(maxsize=256)
 
 
 # /pickrandom @group to do something
@@ -19,11 +40,13 @@ FREQUENCY_PATTERN = r"(on|every|next|today|tomorrow) (.+)"
 # /pickrandom #channel to do something
 # /pickrandom @group to do something on Monday at 9am
 # /pickrandom @group to do something next Monday at 9am
-COMMAND_RE = re.compile(
-    fr"^<(?:#|!subteam\^)(?P<target>[A-Z0-9]+)(?:|[^>]+)?>\s+"  # group or channel id
-    fr"to (?P<task>.+?)\s*"  # task to do
-    fr"(?P<frequency>{FREQUENCY_PATTERN})?$"  # optional date or frequency
-)
+# /pickrandom @group 2 people to do something every day
+MAX_COMMAND_LENGTH = 1000
+TARGET_PREFIXES = ("<#", "<!subteam^")
+TARGET_CHARS = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789")
+DIGITS = frozenset("0123456789")
+COUNT_WORDS = ("people", "persons", "person")
+FREQUENCY_KEYWORDS = ("on ", "every ", "next ", "today ", "tomorrow ")
 
 
 def is_list_command(command: Text) -> bool:
@@ -33,39 +56,160 @@ def is_list_command(command: Text) -> bool:
     return bool(LIST_RE.match(command))
 
 
+def is_stats_command(command: Text) -> bool:
+    """
+    Return True if the command is the stats command.
+    """
+    return bool(STATS_RE.match(command))
+
+
+def is_batch_command(command: Text) -> bool:
+    """
+    Return True if the command spans several lines, one command per line.
+    """
+    return "\n" in command.strip()
+
+
 def parse_command(command: Text) -> Optional[Dict]:
     """
     Parse the slash command and returns a dict containing the following keys:
     - target: the group or channel
     - task: the task to perform
     - frequency: optional frequency
+    - count: the number of people to pick, 1 by default
+
+    The command is scanned in linear time, and commands longer than
+    `MAX_COMMAND_LENGTH` are rejected.
+    """
+    command = command.strip()
+    if len(command) > MAX_COMMAND_LENGTH:
+        return None
+
+    # group or channel id: <#C1234|name> or <!subteam^S1234|name>
+    for prefix in TARGET_PREFIXES:
+        if command.startswith(prefix):
+            target_start = len(prefix)
+            break
+    else:
+        return None
+    target_end = target_start
+    while target_end < len(command) and command[target_end] in TARGET_CHARS:
+        target_end += 1
+    mention_end = command.find(">", target_end)
+    if target_end == target_start or mention_end == -1:
+        return None
+
+    # at least one whitespace, then an optional "<count> people"
+    task_start = _skip_whitespace(command, mention_end + 1)
+    if task_start == mention_end + 1:
+        return None
+    count, task_start = _parse_count(command, task_start)
+    if count == 0:
+        return None
+
+    # then "to "
+    if not command.startswith("to ", task_start):
+        return None
+
+    task, frequency = _split_task_and_frequency(command[task_start + 3 :])
+    if task is None:
+        return None
+    return {
+        "target": command[target_start:target_end],
+        "task": task,
+        "frequency": frequency,
+        "count": count,
+    }
+
+
+def _parse_count(command: Text, start: int) -> Tuple[int, int]:
+    """
+    Parse an optional "<count> people" followed by whitespace from start.
+    Return the count (1 if there is none) and the index after it.
+    """
+    end = start
+    while end < len(command) and command[end] in DIGITS:
+        end += 1
+    if end == start or not command.startswith(" ", end):
+        return 1, start
+
+    word_start = _skip_whitespace(command, end)
+    for word in COUNT_WORDS:
+        word_end = word_start + len(word)
+        if command.startswith(word, word_start):
+            next_start = _skip_whitespace(command, word_end)
+            if next_start > word_end:
+                return int(command[start:end]), next_start
+    return 1, start
+
+
+def _split_task_and_frequency(text: Text) -> Tuple[Optional[Text], Optional[Text]]:
+    """
+    Split the end of a command between the task and the optional frequency.
+
+    The task is the shortest non-empty single-line prefix followed by either
+    nothing but whitespace, or whitespace and a frequency: a frequency keyword
+    followed by the rest of the line.
+    """
+    last_newline = text.rfind("\n")
+    task_max_end = text.find("\n")
+    if task_max_end == -1:
+        task_max_end = len(text)
+
+    # index of the next non-whitespace character, for each position
+    next_non_whitespace = [len(text)] * (len(text) + 1)
+    for index in range(len(text) - 1, -1, -1):
+        next_non_whitespace[index] = (
+            next_non_whitespace[index + 1] if text[index].isspace() else index
+        )
+
+    for task_end in range(1, task_max_end + 1):
+        frequency_start = next_non_whitespace[task_end]
+        if frequency_start == len(text):
+            return text[:task_end], None
+        for keyword in FREQUENCY_KEYWORDS:
+            if text.startswith(keyword, frequency_start):
+                frequency_value_start = frequency_start + len(keyword)
+                if last_newline < frequency_value_start < len(text):
+                    return text[:task_end], text[frequency_start:]
+                break
+
+    return None, None
+
+
+def _skip_whitespace(text: Text, index: int) -> int:
+    """
+    Return the index of the first non-whitespace character from index.
     """
-    match = COMMAND_RE.match(command.strip())
-    return match.groupdict() if match else None
+    while index < len(text) and text[index].isspace():
+        index += 1
+    return index
 
 
-def parse_frequency(frequency: Text) -> Optional[Union[datetime, RecurringEvent]]:
+def parse_frequency(frequency: Text,) -> Optional[Union[datetime, "RecurringEvent"]]:
     """
     Parse frequency or date using `recurrent` and `dateparser` module.
     """
     if frequency.startswith("every"):
-        rec = RecurringEvent()
-        parsed_rrule = rec.parse(frequency)
-        if rec.bymonthday or rec.byyearday:
-            # not supported
-            return None
-
-        try:
-            rrulestr(parsed_rrule)  # this validates the parsing
-        except (ValueError, TypeError):
-            return None
-        else:
-            # ensure that hours are set, otherwise default to 9am
-            if not rec.byhour and not rec.byminute:
-                rec.byhour.append("9")
-                rec.byminute.append("0")
+        key = normalize_frequency(frequency)
+        rec = parse_common_frequency(key)
+        if rec is not None:
             return rec
+
+        rec = RECURRING_EVENT_CACHE.get(key)
+        if rec is None:
+            rec = parse_recurring_event(frequency)
+            # events starting or ending at a relative date depend
+            # on the current date, they cannot be cached
+            if rec is None or rec.dtstart or rec.until:
+                return rec
+            RECURRING_EVENT_CACHE.set(key, rec)
+        # callers get their own copy, so that they can't alter the cache
+        return deepcopy(rec)
     else:
+        # imported lazily, it is slow to import
+        import dateparser
+
         value = dateparser.parse(frequency, settings={"PREFER_DATES_FROM": "future"})
         if value and not value.hour and not value.minute:
             # default 9am if no times
@@ -73,7 +217,98 @@ def parse_frequency(frequency: Text) -> Optional[Union[datetime, RecurringEvent]
         return value
 
 
-def convert_recurring_event_to_trigger_format(event: RecurringEvent):
+def parse_recurring_event(frequency: Text) -> Optional["RecurringEvent"]:
+    """
+    Parse a recurring frequency using the `recurrent` module.
+    """
+    from recurrent import RecurringEvent
+
+    rec = RecurringEvent()
+    parsed_rrule = rec.parse(frequency)
+    if rec.bymonthday or rec.byyearday:
+        # not supported
+        return None
+
+    try:
+        rrulestr(parsed_rrule)  # this validates the parsing
+    except (ValueError, TypeError):
+        return None
+
+    # ensure that hours are set, otherwise default to 9am
+    if not rec.byhour and not rec.byminute:
+        rec.byhour.append("9")
+        rec.byminute.append("0")
+    return rec
+
+
+def parse_common_frequency(frequency: Text) -> Optional["RecurringEvent"]:
+    """
+    Parse the most common recurring frequencies without the `recurrent` module,
+    with the same output. Return None if the frequency is not recognized.
+
+    `frequency` must be normalized, see `normalize_frequency`.
+    """
+    match = COMMON_FREQUENCY_RE.match(frequency)
+    if not match:
+        return None
+
+    hour, minute = 9, 0  # default to 9am
+    if match.group("hour"):
+        hour = int(match.group("hour"))
+        minute = int(match.group("minute") or 0)
+        meridiem = match.group("meridiem")
+        # `recurrent` parses 12pm and 24h times before 8:00 differently,
+        # and an hour without minutes as an interval, leave them to it
+        if minute > 59:
+            return None
+        elif meridiem == "am" and 1 <= hour <= 12:
+            hour = hour % 12
+        elif meridiem == "pm" and 1 <= hour <= 11:
+            hour += 12
+        elif meridiem or not match.group("minute") or not 8 <= hour <= 23:
+            return None
+
+    from recurrent import RecurringEvent
+
+    days = match.group("days")
+    if match.group("other") and days == "weekends":
+        # `recurrent` parses "every other weekends" as every week
+        return None
+
+    rec = RecurringEvent()
+    rec.interval = 2 if match.group("other") else 1
+    if days == "day":
+        rec.freq = "daily"
+    else:
+        rec.freq = "weekly"
+        if days == "weekday":
+            rec.weekdays = ["MO", "TU", "WE", "TH", "FR"]
+        elif days.startswith("weekend"):
+            rec.weekdays = ["SA", "SU"]
+        else:
+            rec.weekdays = [day[:2].upper() for day in WEEKDAY_SEPARATOR_RE.split(days)]
+    rec.byhour = [str(hour)]
+    rec.byminute = [str(minute)]
+    return rec
+
+
+def preload_parsers() -> None:
+    """
+    Import and exercise the parsing libraries, so that the first
+    command doesn't pay for their loading time.
+    """
+    parse_frequency("every day at 9am")
+    parse_frequency("tomorrow at 9am")
+
+
+def normalize_frequency(frequency: Text) -> Text:
+    """
+    Normalize case and whitespace of a frequency expression.
+    """
+    return " ".join(frequency.lower().split())
+
+
+def convert_recurring_event_to_trigger_format(event: "RecurringEvent"):
     """
     Convert RecurringEvent instances to the APScheduler trigger cron format.
 
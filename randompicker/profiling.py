@@ -0,0 +1,115 @@
+import cProfile
+from datetime import datetime
+import os
+import re
+from typing import Dict, List, Optional, Text
+
+from apscheduler.events import (
+    EVENT_JOB_ERROR,
+    EVENT_JOB_EXECUTED,
+    EVENT_JOB_SUBMITTED,
+    JobEvent,
+)
+
+
+# events handled by the profiler, to profile job runs
+PROFILING_EVENTS = EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR
+
+UNSAFE_FILENAME_CHARS_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+class Profiler:
+    """
+    Opt-in cProfile captures of single requests or job runs, saved in the
+    pstats format to `directory`.
+
+    The profiler of a thread can only run once at a time: while a capture runs,
+    other requests or jobs are not profiled. As the event loop runs other tasks
+    while the profiled one awaits, their calls are also part of the profile.
+    """
+
+    def __init__(self, directory: Text):
+        self.directory = directory
+        self.armed_requests = 0
+        self.armed_jobs: List[Optional[Text]] = []
+        self.active: Optional[cProfile.Profile] = None
+        self.job_profiles: Dict[Text, cProfile.Profile] = {}
+
+    def arm_request(self) -> None:
+        """
+        Profile the next request.
+        """
+        self.armed_requests += 1
+
+    def arm_job(self, job_id: Optional[Text] = None) -> None:
+        """
+        Profile the next run of the job, or of any job if job_id is None.
+        """
+        self.armed_jobs.append(job_id)
+
+    def start(self) -> Optional[cProfile.Profile]:
+        """
+        Start a capture, unless one is already running.
+        """
+        if self.active is not None:
+            return None
+        self.active = cProfile.Profile()
+        self.active.enable()
+        return self.active
+
+    def stop(self, profile: cProfile.Profile, name: Text) -> Text:
+        """
+        Stop a capture, and save it to a file whose path is returned.
+        """
+        profile.disable()
+        self.active = None
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(
+            self.directory,
+            f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-"
+            f"{UNSAFE_FILENAME_CHARS_RE.sub('_', name)}.prof",
+        )
+        profile.dump_stats(path)
+        return path
+
+    def start_request(self, forced: bool = False) -> Optional[cProfile.Profile]:
+        """
+        Start the capture of a request if it is forced or armed.
+        """
+        if not forced and not self.armed_requests:
+            return None
+        profile = self.start()
+        if profile is not None and not forced:
+            self.armed_requests -= 1
+        return profile
+
+    def handle_event(self, event: JobEvent) -> None:
+        """
+        Scheduler listener that captures the armed job runs, from their
+        submission to their end.
+        """
+        if event.code == EVENT_JOB_SUBMITTED:
+            for index, job_id in enumerate(self.armed_jobs):
+                if job_id is None or job_id == event.job_id:
+                    profile = self.start()
+                    if profile is not None:
+                        del self.armed_jobs[index]
+                        self.job_profiles[event.job_id] = profile
+                    break
+        elif event.job_id in self.job_profiles:
+            self.stop(self.job_profiles.pop(event.job_id), f"job-{event.job_id}")
+
+    def list_profiles(self) -> List[Text]:
+        """
+        Return the paths of the saved profiles, the latest first.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            (
+                os.path.join(self.directory, filename)
+                for filename in os.listdir(self.directory)
+                if filename.endswith(".prof")
+            ),
+            reverse=True,
+        )
@@ -0,0 +1,88 @@
+import time
+from typing import Hashable, Text, TYPE_CHECKING
+
+from randompicker.cache import LRUCache
+from randompicker.metrics import LIMITED_REQUESTS
+
+if TYPE_CHECKING:  # pragma: no cover
+    from randompicker.jobstore import RandomPickerJobStore
+
+
+RATE_LIMITED_MESSAGE = (
+    "Whoa, that's a lot of commands :sweat_smile: Please wait a bit and try again."
+)
+TEAM_JOBS_LIMIT_MESSAGE = (
+    "Your workspace has reached the limit of {limit} random picks. "
+    "Remove some of them with `/pickrandom list` to add new ones."
+)
+CHANNEL_JOBS_LIMIT_MESSAGE = (
+    "This channel has reached the limit of {limit} random picks. "
+    "Remove some of them with `/pickrandom list` to add new ones."
+)
+
+
+class QuotaExceeded(Exception):
+    """
+    Raised when a limit is reached, with a message for the user.
+    """
+
+
+class RateLimiter:
+    """
+    Token buckets by key: each key can be used `rate` times per minute, with
+    bursts of up to `rate` uses. Only the most recently used keys are tracked.
+    """
+
+    def __init__(self, rate: float, maxsize: int = 10000):
+        self.rate = rate
+        # tokens left and time of the last refill, by key
+        self.buckets = LRUCache(maxsize)
+
+    def allow(self, key: Hashable) -> bool:
+        """
+        Use a token for key, and return False if there are none left.
+        """
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            tokens = self.rate
+        else:
+            tokens, last_time = bucket
+            tokens = min(self.rate, tokens + (now - last_time) * self.rate / 60)
+        allowed = tokens >= 1
+        self.buckets.set(key, (tokens - 1 if allowed else tokens, now))
+        return allowed
+
+
+def check_job_quotas(
+    jobstore: "RandomPickerJobStore",
+    job_id: Text,
+    team_id: Text,
+    channel_id: Text,
+    max_team_jobs: int,
+    max_channel_jobs: int,
+) -> None:
+    """
+    Raise QuotaExceeded if adding the job would exceed the number of active
+    jobs of the team or of the channel. Replacing a job is always allowed.
+    """
+    if jobstore.has_job(job_id):
+        return
+
+    team_jobs = jobstore.count_jobs_by_prefix(f"{team_id}-")
+    if team_jobs >= max_team_jobs:
+        LIMITED_REQUESTS.inc(limit="team_jobs")
+        raise QuotaExceeded(TEAM_JOBS_LIMIT_MESSAGE.format(limit=max_team_jobs))
+    # the channel can't be at its limit if the whole team is below it:
+    # the jobs are only loaded when needed
+    if team_jobs >= max_channel_jobs:
+        channel_jobs = sum(
+            1
+            for job in jobstore.get_jobs_by_prefix(f"{team_id}-")
+            if job.kwargs.get("channel_id") == channel_id
+        )
+        if channel_jobs >= max_channel_jobs:
+            LIMITED_REQUESTS.inc(limit="channel_jobs")
+            raise QuotaExceeded(
+                CHANNEL_JOBS_LIMIT_MESSAGE.format(limit=max_channel_jobs)
+            )
@@ -0,0 +1,170 @@
+import random
+from typing import Dict, Iterable, List, Optional, Set, Text, Tuple
+
+
+# A rotation is a shuffle bag, persisted in the job kwargs as a dict:
+# - order: a permutation of the members, the ones before the cursor
+#   were already picked during the current round
+# - cursor: the index of the next member to pick
+# Everyone is picked once before anyone is picked twice.
+
+
+def new_rotation(members: Iterable[Text]) -> Dict:
+    """
+    Return a rotation over members, in random order.
+    """
+    order = list(members)
+    random.shuffle(order)
+    return {"order": order, "cursor": 0}
+
+
+def migrate_previous_picks(previous_user_picks: Set[Text], members: Set[Text]) -> Dict:
+    """
+    Return a rotation equivalent to the legacy `previous_user_picks` state:
+    the members already picked are placed before the cursor.
+    """
+    picked = list(previous_user_picks & members)
+    rotation = new_rotation(members - previous_user_picks)
+    rotation["order"][:0] = picked
+    rotation["cursor"] = len(picked)
+    return rotation
+
+
+def sync_rotation(rotation: Dict, members: Set[Text]) -> None:
+    """
+    Update the rotation in place when members join or leave the target.
+
+    Members who left are spliced out of the order. Members who joined are
+    appended, then swapped with a random member who wasn't picked yet during
+    this round, so that they are picked at a random point of the round.
+    """
+    order = rotation["order"]
+    known = set(order)
+    if known == members:
+        return
+
+    left = known - members
+    if left:
+        rotation["cursor"] -= sum(
+            1 for user in order[: rotation["cursor"]] if user in left
+        )
+        order[:] = [user for user in order if user not in left]
+
+    for user in members - known:
+        order.append(user)
+        index = random.randint(rotation["cursor"], len(order) - 1)
+        order[index], order[-1] = order[-1], order[index]
+
+
+def pick_from_rotation(rotation: Dict, count: int = 1) -> List[Text]:
+    """
+    Pick the next `count` distinct members of the rotation (all of them if there
+    are fewer members), and advance its cursor.
+
+    When every member was picked, a new round starts with a new order, that
+    doesn't start with the members picked last, when possible.
+    """
+    order = rotation["order"]
+    if not order:
+        raise ValueError("Cannot pick from an empty rotation")
+
+    count = min(count, len(order))
+    picks: List[Text] = []
+    while len(picks) < count:
+        if rotation["cursor"] >= len(order):
+            _start_round(order, set(picks) | {order[-1]}, count - len(picks))
+            rotation["cursor"] = 0
+        picks.append(order[rotation["cursor"]])
+        rotation["cursor"] += 1
+    return picks
+
+
+def _start_round(order: List[Text], recent: Set[Text], head: int) -> None:
+    """
+    Shuffle the order in place for a new round, and move the recent members
+    out of its first `head` positions, when possible.
+    """
+    random.shuffle(order)
+    blocked = [index for index in range(head) if order[index] in recent]
+    if not blocked:
+        return
+    free = [index for index in range(head, len(order)) if order[index] not in recent]
+    for index, other in zip(blocked, random.sample(free, min(len(blocked), len(free)))):
+        order[index], order[other] = order[other], order[index]
+
+
+def load_rotation(
+    members: Set[Text],
+    rotation: Optional[Dict] = None,
+    previous_user_picks: Optional[Set[Text]] = None,
+) -> Dict:
+    """
+    Return the rotation of a job in sync with the current members, creating it
+    or migrating it from the legacy `previous_user_picks` if needed.
+    """
+    if rotation is None:
+        if previous_user_picks:
+            return migrate_previous_picks(previous_user_picks, members)
+        return new_rotation(members)
+
+    sync_rotation(rotation, members)
+    return rotation
+
+
+# Weighted picking favours the members who were picked the least recently
+# and the least often. Its state is persisted in the job kwargs as a dict:
+# - runs: the number of picks so far
+# - picks: for each member, their number of picks, and the number of runs
+#   when they were last picked
+ROTATION_STRATEGY = "rotation"
+WEIGHTED_STRATEGY = "weighted"
+PICKING_STRATEGIES = (ROTATION_STRATEGY, WEIGHTED_STRATEGY)
+
+
+def pick_weighted(
+    members: Set[Text], state: Optional[Dict] = None, count: int = 1
+) -> Tuple[List[Text], Dict]:
+    """
+    Pick `count` distinct members (all of them if there are fewer members),
+    each with probability proportional to their score, and return them with
+    the updated state.
+
+    The score of a member is the product of:
+    - recency: the number of runs since their last pick, capped to the number
+      of members, so that the last members picked are never picked again
+    - frequency: one more than the difference between the highest number of
+      picks and theirs, so that the members picked less often catch up
+
+    Members who join start with the lowest number of picks of the others.
+    """
+    if not members:
+        raise ValueError("Cannot pick from an empty set of members")
+
+    state = state or {"runs": 0, "picks": {}}
+    runs = state["runs"]
+    picks = state["picks"]
+    if len(picks) != len(members) or not members.issuperset(picks):
+        min_count = min((picked for picked, _ in picks.values()), default=0)
+        picks = {
+            user: picks.get(user) or [min_count, runs - len(members)]
+            for user in members
+        }
+
+    candidates = list(picks)
+    max_count = max(picked for picked, _ in picks.values())
+    weights = [
+        min(runs - last_run, len(candidates)) * (1 + max_count - picked)
+        for picked, last_run in picks.values()
+    ]
+    users = []
+    for _ in range(min(count, len(candidates))):
+        if any(weights):
+            index = random.choices(range(len(candidates)), weights)[0]
+        else:  # only members picked during the last run are left
+            index = random.randrange(len(candidates))
+        users.append(candidates.pop(index))
+        weights.pop(index)
+
+    for user in users:
+        picks[user] = [picks[user][0] + 1, runs + 1]
+    return users, {"runs": runs + 1, "picks": picks}
@@ -1,16 +1,71 @@
+import asyncio
 import functools
-import random
-from typing import Optional, Set, Text
+import hashlib
+import time
+from typing import Dict, List, NamedTuple, Optional, Set, Text
 
 from sanic import response
 from sanic.log import logger
 from slack import WebClient
 
-from randompicker.constants import SLACK_SIGNING_SECRET, SLACK_TOKEN
+from randompicker.cache import TTLCache
+from randompicker.constants import SLACK_API_URL, SLACK_SIGNING_SECRET, SLACK_TOKEN
 from randompicker.format import format_slack_message
+from randompicker.metrics import (
+    DEDUPLICATED_RETRIES,
+    ERRORS,
+    PICKS,
+    SLACK_API_DURATION,
+)
+from randompicker.rotation import (
+    ROTATION_STRATEGY,
+    WEIGHTED_STRATEGY,
+    load_rotation,
+    pick_from_rotation,
+    pick_weighted,
+)
 
 
-slack_client = WebClient(token=SLACK_TOKEN, run_async=True)
+# Slack retries the requests not answered within 3 seconds, up to 3 times
+# in the next minutes: the results of the requests are kept long enough
+# to answer these retries
+SLACK_RETRY_HEADER = "X-Slack-Retry-Num"
+SLACK_RESULTS_TTL = 600
+# results (or futures of the results) of the requests, by fingerprint
+slack_results = TTLCache(maxsize=1000, ttl=SLACK_RESULTS_TTL)
+
+
+class InstrumentedWebClient(WebClient):
+    """
+    Slack client that measures the duration of the API calls, by method.
+    """
+
+    def api_call(self, api_method: str, **kwargs):
+        start = time.perf_counter()
+        result = super().api_call(api_method, **kwargs)
+        if asyncio.isfuture(result):
+            result.add_done_callback(
+                functools.partial(self._observe_api_call, api_method, start)
+            )
+        else:
+            SLACK_API_DURATION.observe(time.perf_counter() - start, method=api_method)
+        return result
+
+    @staticmethod
+    def _observe_api_call(api_method: str, start: float, future: asyncio.Future):
+        SLACK_API_DURATION.observe(time.perf_counter() - start, method=api_method)
+        if future.cancelled() or future.exception():
+            ERRORS.inc(source="slack")
+
+
+slack_client = InstrumentedWebClient(
+    token=SLACK_TOKEN, run_async=True, base_url=SLACK_API_URL
+)
+
+
+class PickResult(NamedTuple):
+    users: List[Text]
+    rotation: Dict
 
 
 async def list_users_target(target: Text) -> Set[Text]:
@@ -19,7 +74,16 @@ async def list_users_target(target: Text) -> Set[Text]:
     """
     if target.startswith("C"):  # channel
         channel_info = await slack_client.conversations_members(channel=target)
-        return set(channel_info["members"])
+        members = set(channel_info["members"])
+        # members of large channels are paginated
+        cursor = channel_info.get("response_metadata", {}).get("next_cursor")
+        while cursor:
+            channel_info = await slack_client.conversations_members(
+                channel=target, cursor=cursor
+            )
+            members.update(channel_info["members"])
+            cursor = channel_info.get("response_metadata", {}).get("next_cursor")
+        return members
     elif target.startswith("S"):  # usergroup
         group_info = await slack_client.usergroups_users_list(usergroup=target)
         return set(group_info["users"])
@@ -31,29 +95,37 @@ async def pick_user_and_send_message(
     channel_id: Text,
     target: Text,
     task: Text,
+    rotation: Optional[Dict] = None,
     previous_user_picks: Optional[Set[Text]] = None,
-) -> Set[Text]:
+    strategy: Optional[Text] = None,
+    count: int = 1,
+) -> PickResult:
     """
     This function is scheduled from `schedule_randompick_for_later`.
+    It picks `count` distinct users and mentions them in a single message.
+
+    Return the picked users, and the updated rotation that the next run
+    of the job continues.
+    `previous_user_picks` is the state of jobs scheduled before rotations,
+    it is migrated to a rotation.
+
+    The `weighted` strategy picks users according to how recently and how
+    often they were picked, instead of a rotation.
     """
     users = await list_users_target(target)
-    # if some users were never picked, reduce the set of
-    # pick-able users. Otherwise do not change it, and reset previous_user_pics
-    previous_user_picks = previous_user_picks or set()
-    users_never_picked = users - previous_user_picks
-    if users_never_picked:
-        users = users_never_picked
+    if strategy == WEIGHTED_STRATEGY:
+        picked_users, rotation = pick_weighted(users, rotation, count)
     else:
-        previous_user_picks = set()
-    user = random.sample(users, 1)[0]
-    previous_user_picks.add(user)
+        rotation = load_rotation(users, rotation, previous_user_picks)
+        picked_users = pick_from_rotation(rotation, count)
+    PICKS.inc(len(picked_users), strategy=strategy or ROTATION_STRATEGY)
 
     logger.info("Sending message to Slack API")
     await slack_client.chat_postMessage(
-        channel=channel_id, text=format_slack_message(user, task)
+        channel=channel_id, text=format_slack_message(picked_users, task)
     )
     logger.info("Done.")
-    return previous_user_picks
+    return PickResult(picked_users, rotation)
 
 
 def requires_slack_signature(func):
@@ -74,3 +146,44 @@ def requires_slack_signature(func):
         return await func(request)
 
     return inner
+
+
+def deduplicate_slack_retries(func):
+    """
+    Decorator to answer the retries of a request by Slack with the result of
+    the original request, waiting for it if it is still in progress, rather
+    than handling them again. To be used under `requires_slack_signature`.
+
+    Requests without the retry header are always handled, as users can send
+    the same command twice on purpose.
+    """
+
+    @functools.wraps(func)
+    async def inner(request):
+        fingerprint = hashlib.sha256(
+            request.path.encode("utf-8") + b"\0" + request.body
+        ).digest()
+        if SLACK_RETRY_HEADER in request.headers:
+            result = slack_results.get(fingerprint)
+            if result is not None:
+                resp = await asyncio.shield(result)
+                # handle the retry if the original request failed
+                if resp is not None:
+                    DEDUPLICATED_RETRIES.inc()
+                    logger.info(
+                        "Answering retry %s of %s from cache",
+                        request.headers[SLACK_RETRY_HEADER],
+                        request.path,
+                    )
+                    return resp
+
+        result = asyncio.get_event_loop().create_future()
+        slack_results.set(fingerprint, result)
+        resp = None
+        try:
+            resp = await func(request)
+            return resp
+        finally:
+            result.set_result(resp)
+
+    return inner
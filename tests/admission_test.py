@@ -0,0 +1,72 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from randompicker import admission
+from randompicker.format import SLACK_ACTION_NEXT_PAGE, SLACK_ACTION_REMOVE_JOB
+
+
+def fake_request(path, json_loads=json.loads, **form):
+    app = SimpleNamespace(config=SimpleNamespace(JSON_LOADS=json_loads))
+    return SimpleNamespace(app=app, path=path, form=form)
+
+
+def test_classify_request():
+    def classify_command(text):
+        return admission.classify_request(fake_request("/slashcommand", text=text))
+
+    assert classify_command("list") == admission.LISTING_WORK
+    assert classify_command("stats") == admission.LISTING_WORK
+    assert classify_command("<#C1234|general> to play music every day") == (
+        admission.SCHEDULING_WORK
+    )
+    assert classify_command(
+        "<#C1234|general> to play music\n<#C1234|general> to dance every day"
+    ) == (admission.SCHEDULING_WORK)
+    assert classify_command("<#C1234|general> to play music") is None
+    assert classify_command("help") is None
+
+    def classify_action(action_id):
+        payload = json.dumps({"actions": [{"action_id": action_id}]})
+        return admission.classify_request(fake_request("/actions", payload=payload))
+
+    assert classify_action(SLACK_ACTION_NEXT_PAGE) == admission.LISTING_WORK
+    assert classify_action(SLACK_ACTION_REMOVE_JOB) is None
+    assert admission.classify_request(fake_request("/actions", payload="{")) is None
+    # the payload is decoded like the actions endpoint does
+    json_loads = Mock(return_value={"actions": [{"action_id": SLACK_ACTION_NEXT_PAGE}]})
+    request = fake_request("/actions", json_loads=json_loads, payload="payload")
+    assert admission.classify_request(request) == admission.LISTING_WORK
+    json_loads.assert_called_once_with("payload")
+
+    assert admission.classify_request(fake_request("/admin/schedules")) == (
+        admission.SCHEDULING_WORK
+    )
+    assert admission.classify_request(fake_request("/metrics")) is None
+
+
+def test_loop_lag_monitor():
+    monitor = admission.LoopLagMonitor(threshold=0.5)
+    assert not monitor.overloaded
+    monitor.update(1.0)
+    assert monitor.overloaded
+    # the lag decays progressively
+    monitor.update(0.0)
+    assert monitor.lag == 0.5
+    assert not monitor.overloaded
+    monitor.update(0.8)
+    assert monitor.lag == 0.8
+
+
+async def test_loop_lag_monitor_run():
+    monitor = admission.LoopLagMonitor(threshold=0.05, interval=0.01)
+    task = asyncio.ensure_future(monitor.run())
+    await asyncio.sleep(0.02)
+    # block the event loop, the next measure is late
+    time.sleep(0.1)
+    await asyncio.sleep(0.005)
+    task.cancel()
+    assert monitor.lag >= 0.05
+    assert monitor.overloaded
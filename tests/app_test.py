@@ -1,19 +1,44 @@
 from datetime import datetime
 import json
-from unittest.mock import call
+import os
+import subprocess
+import sys
+import urllib.parse
+from unittest.mock import Mock, call
 
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.date import DateTrigger
 import pytest
 import requests
 
-from randompicker import app as randompicker_app
+from randompicker import app as randompicker_app, jobs
+from randompicker.admission import BUSY_MESSAGE
 from randompicker.format import (
     HELP,
     SLACK_ACTION_REMOVE_JOB,
     SLACK_ACTION_CLOSE,
+    SLACK_ACTION_NEXT_PAGE,
+    SLACK_ACTION_PREVIOUS_PAGE,
     CLOSE_BLOCK,
 )
+from randompicker.metrics import SHED_REQUESTS
+from randompicker.quotas import RATE_LIMITED_MESSAGE, RateLimiter
+
+
+def test_lazy_imports():
+    # slow modules are only imported on first use
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, randompicker.app; "
+            "print(sorted({'dateparser', 'recurrent', 'cron_descriptor'} & set(sys.modules)))",
+        ],
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    assert output.stdout.strip() == "[]"
 
 
 async def test_index(test_cli):
@@ -52,6 +77,7 @@ async def test_POST_slashcommand_help(api_post):
     assert resp.status == 200
     body = await resp.json()
     assert body == HELP
+    assert await resp.read() == randompicker_app.HELP_JSON
 
 
 async def test_POST_slashcommand_help_by_default(api_post):
@@ -90,6 +116,62 @@ async def test_POST_slashcommand_pickrandom_now(api_post, mock_slack_api):
     mock_slack_api.conversations_members.assert_called_with(channel="C012X7LEUSV")
 
 
+async def test_POST_slashcommand_retry(test_cli, api_signature, mock_slack_api):
+    data = urllib.parse.urlencode(
+        {
+            "text": "<#C012X7LEUSV|general> to play the retry music",
+            "user_id": "U1337",
+            "channel_id": "C1234",
+            "team_id": "T0007",
+        }
+    )
+    headers = {
+        **api_signature(data),
+        "Content-Type": "application/x-www-form-urlencoded",
+    }
+    resp = await test_cli.post("/slashcommand", data=data, headers=headers)
+    assert resp.status == 200
+    resp = await test_cli.post(
+        "/slashcommand", data=data, headers={**headers, "X-Slack-Retry-Num": "1"}
+    )
+    assert resp.status == 200
+    # the message is only sent once
+    assert len(mock_slack_api.chat_postMessage.mock_calls) == 1
+
+
+async def test_POST_slashcommand_stats(api_post, mock_slack_api):
+    stats_data = {
+        "text": "stats",
+        "user_id": "U1337",
+        "channel_id": "C1234",
+        "team_id": "T0007",
+    }
+    resp = await api_post("/slashcommand", data=stats_data)
+    assert resp.status == 200
+    body = await resp.json()
+    assert body["blocks"][0]["text"]["text"] == "Nobody has been picked yet."
+
+    for _ in range(2):
+        resp = await api_post(
+            "/slashcommand",
+            data={
+                "text": "<#C012X7LEUSV|general> to play music",
+                "user_id": "U1337",
+                "channel_id": "C1234",
+                "team_id": "T0007",
+            },
+        )
+        assert resp.status == 200
+
+    resp = await api_post("/slashcommand", data=stats_data)
+    assert resp.status == 200
+    body = await resp.json()
+    lines = body["blocks"][0]["text"]["text"].split("\n")
+    assert lines[0] == "*Most picked people*"
+    assert lines[1].startswith(("<@U1>: ", "<@U2>: "))
+    assert sum(int(line.split(" ")[1]) for line in lines[1:]) == 2
+
+
 async def test_POST_slashcommand_pickrandom_now_group(api_post, mock_slack_api):
     resp = await api_post(
         "/slashcommand",
@@ -155,6 +237,46 @@ async def test_POST_slashcommand_pickrandom_periodic(api_post, mock_slack_api):
     assert str(scheduled_job.trigger) == str(
         CronTrigger(day_of_week="*", hour="9", minute="0", timezone="Europe/Berlin")
     )
+    assert scheduled_job.name == "at 09:00 AM, every day"
+
+
+async def test_POST_slashcommand_pickrandom_several_people(api_post, mock_slack_api):
+    resp = await api_post(
+        "/slashcommand",
+        data={
+            "text": "<#C012X7LEUSV|general> 2 people to review code every day",
+            "user_id": "U1337",
+            "channel_id": "C1234",
+            "team_id": "T0007",
+        },
+    )
+    assert resp.status == 200
+    body = await resp.read()
+    assert body.decode() == (
+        f"OK, I will pick 2 people from <#C012X7LEUSV> "
+        f"to review code at 09:00 AM, every day"
+    )
+    scheduled_job = randompicker_app.scheduler.get_jobs()[0]
+    assert scheduled_job.kwargs == {
+        "channel_id": "C1234",
+        "target": "C012X7LEUSV",
+        "task": "review code",
+        "count": 2,
+    }
+
+    resp = await api_post(
+        "/slashcommand",
+        data={
+            "text": "list",
+            "user_id": "U1337",
+            "channel_id": "C1234",
+            "team_id": "T0007",
+        },
+    )
+    body = await resp.json()
+    assert body["blocks"][1]["text"]["text"] == (
+        "_/pickrandom_ <#C012X7LEUSV> 2 people to review code at 09:00 AM, every day"
+    )
 
 
 @pytest.mark.freeze_time("2020-04-28 8:20")
@@ -188,6 +310,237 @@ async def test_POST_slashcommand_pickrandom_on_specific_date(api_post, mock_slac
     )
 
 
+async def test_POST_slashcommand_batch(api_post, mock_slack_api):
+    resp = await api_post(
+        "/slashcommand",
+        data={
+            "text": "<#C012X7LEUSV|general> to play music every day\n"
+            "<!subteam^S013R9HGXJ5|test-group> to do groceries every Monday at 10am\n"
+            "\n"
+            "<#C012X7LEUSV|general> to play music on my birthday\n"
+            "<#C012X7LEUSV|general> to play music now\n"
+            "something else",
+            "user_id": "U1337",
+            "channel_id": "C1234",
+            "team_id": "T0007",
+        },
+    )
+    assert resp.status == 200
+    assert resp.content_type == "text/plain"
+    body = await resp.read()
+    assert body.decode() == (
+        ":white_check_mark: I will pick someone from <#C012X7LEUSV> "
+        "to play music at 09:00 AM, every day\n"
+        ":white_check_mark: I will pick someone from <!subteam^S013R9HGXJ5> "
+        "to do groceries at 10:00 AM, every Monday\n"
+        ':x: Line 3: I don\'t understand the frequency "on my birthday"\n'
+        ":x: Line 4: A frequency is required to schedule a random pick\n"
+        ":x: Line 5: I don't understand this command"
+    )
+    mock_slack_api.users_info.assert_called_once_with(user="U1337")
+    scheduled_jobs = randompicker_app.scheduler.get_jobs()
+    assert sorted(job.kwargs["task"] for job in scheduled_jobs) == [
+        "do groceries",
+        "play music",
+    ]
+
+
+async def test_POST_slashcommand_rate_limit(api_post, mock_slack_api, monkeypatch):
+    monkeypatch.setattr(randompicker_app, "user_rate_limiter", RateLimiter(rate=1))
+    data = {
+        "text": "<#C012X7LEUSV|general> to play music",
+        "user_id": "U1337",
+        "channel_id": "C1234",
+        "team_id": "T0007",
+    }
+    resp = await api_post("/slashcommand", data=data)
+    assert (await resp.text()) == ""
+    resp = await api_post("/slashcommand", data=data)
+    assert resp.status == 200
+    assert (await resp.text()) == RATE_LIMITED_MESSAGE
+    assert len(mock_slack_api.chat_postMessage.mock_calls) == 1
+    # other users can still send commands
+    resp = await api_post("/slashcommand", data={**data, "user_id": "U1338"})
+    assert (await resp.text()) == ""
+
+
+async def test_POST_slashcommand_job_limits(api_post, mock_slack_api, monkeypatch):
+    monkeypatch.setattr(randompicker_app, "MAX_JOBS_PER_TEAM", 3)
+    monkeypatch.setattr(randompicker_app, "MAX_JOBS_PER_CHANNEL", 1)
+    data = {"user_id": "U1337", "channel_id": "C1234", "team_id": "T0007"}
+    resp = await api_post(
+        "/slashcommand",
+        data={**data, "text": "<#C012X7LEUSV|general> to play music every day"},
+    )
+    assert (await resp.text()).startswith("OK, I will pick")
+    resp = await api_post(
+        "/slashcommand",
+        data={**data, "text": "<#C012X7LEUSV|general> to dance every day"},
+    )
+    assert (await resp.text()) == (
+        ":x: This channel has reached the limit of 1 random picks. "
+        "Remove some of them with `/pickrandom list` to add new ones."
+    )
+
+    resp = await api_post(
+        "/slashcommand",
+        data={
+            **data,
+            "channel_id": "C5678",
+            "text": "<#C012X7LEUSV|general> to code every day\n"
+            "<#C012X7LEUSV|general> to dance every day\n"
+            "<#C012X7LEUSV|general> to sing every day",
+        },
+    )
+    assert (await resp.text()).splitlines() == [
+        ":white_check_mark: I will pick someone from <#C012X7LEUSV> "
+        "to code at 09:00 AM, every day",
+        ":x: Line 2: This channel has reached the limit of 1 random picks. "
+        "Remove some of them with `/pickrandom list` to add new ones.",
+        ":x: Line 3: This channel has reached the limit of 1 random picks. "
+        "Remove some of them with `/pickrandom list` to add new ones.",
+    ]
+    assert len(randompicker_app.scheduler.get_jobs()) == 2
+
+
+async def test_POST_slashcommand_batch_unsupported_frequency(api_post, mock_slack_api):
+    resp = await api_post(
+        "/slashcommand",
+        data={
+            "text": "<#C012X7LEUSV|general> to play music every day\n"
+            "<#C012X7LEUSV|general> to dance every first Monday of the month\n"
+            "<#C012X7LEUSV|general> to sing every Monday at 10am",
+            "user_id": "U1337",
+            "channel_id": "C1234",
+            "team_id": "T0007",
+        },
+    )
+    assert resp.status == 200
+    assert (await resp.text()).splitlines() == [
+        ":white_check_mark: I will pick someone from <#C012X7LEUSV> "
+        "to play music at 09:00 AM, every day",
+        ":x: Line 2: I can't schedule the frequency "
+        '"every first Monday of the month"',
+        ":white_check_mark: I will pick someone from <#C012X7LEUSV> "
+        "to sing at 10:00 AM, every Monday",
+    ]
+    scheduled_jobs = randompicker_app.scheduler.get_jobs()
+    assert sorted(job.kwargs["task"] for job in scheduled_jobs) == [
+        "play music",
+        "sing",
+    ]
+
+
+async def test_POST_admin_schedules_require_token(test_cli):
+    resp = await test_cli.post("/admin/schedules", json={})
+    assert resp.status == 401
+    resp = await test_cli.post(
+        "/admin/schedules", json={}, headers={"Authorization": "Bearer wrong"}
+    )
+    assert resp.status == 401
+
+
+async def test_POST_admin_schedules(test_cli, mock_slack_api):
+    resp = await test_cli.post(
+        "/admin/schedules",
+        json={
+            "team_id": "T0007",
+            "user_id": "U1337",
+            "channel_id": "C1234",
+            "timezone": "Europe/Paris",
+            "schedules": [
+                {
+                    "target": "C012X7LEUSV",
+                    "task": "play music",
+                    "frequency": "every day",
+                },
+                {"target": "X012", "task": "play music", "frequency": "every day"},
+            ],
+        },
+        headers={"Authorization": "Bearer admin-secret"},
+    )
+    assert resp.status == 200
+    body = await resp.json()
+    assert body == {
+        "results": [
+            {
+                "ok": True,
+                "target": "C012X7LEUSV",
+                "task": "play music",
+                "job_id": "T0007-U1337-d20842f2b7ffade8e0569d88fba8df0fe0f8062b",
+                "description": "at 09:00 AM, every day",
+            },
+            {"ok": False, "error": "Unknown channel or group X012"},
+        ]
+    }
+    mock_slack_api.users_info.assert_not_called()
+    scheduled_job = randompicker_app.scheduler.get_job(body["results"][0]["job_id"])
+    assert str(scheduled_job.trigger) == str(
+        CronTrigger(day_of_week="*", hour="9", minute="0", timezone="Europe/Paris")
+    )
+    randompicker_app.scheduler.remove_all_jobs()
+
+
+async def test_POST_admin_schedules_unknown_timezone(test_cli, mock_slack_api):
+    resp = await test_cli.post(
+        "/admin/schedules",
+        json={
+            "team_id": "T0007",
+            "user_id": "U1337",
+            "channel_id": "C1234",
+            "timezone": "Mars/Phobos",
+            "schedules": [
+                {
+                    "target": "C012X7LEUSV",
+                    "task": "play music",
+                    "frequency": "every day",
+                }
+            ],
+        },
+        headers={"Authorization": "Bearer admin-secret"},
+    )
+    assert resp.status == 400
+    assert await resp.json() == {"error": "Unknown timezone Mars/Phobos"}
+    assert randompicker_app.scheduler.get_jobs() == []
+
+
+async def test_POST_admin_schedules_strategy(test_cli, mock_slack_api):
+    resp = await test_cli.post(
+        "/admin/schedules",
+        json={
+            "team_id": "T0007",
+            "user_id": "U1337",
+            "channel_id": "C1234",
+            "timezone": "Europe/Paris",
+            "schedules": [
+                {
+                    "target": "C012X7LEUSV",
+                    "task": "play music",
+                    "frequency": "every day",
+                    "strategy": "weighted",
+                },
+                {
+                    "target": "C012X7LEUSV",
+                    "task": "sing",
+                    "frequency": "every day",
+                    "strategy": "loudest",
+                },
+            ],
+        },
+        headers={"Authorization": "Bearer admin-secret"},
+    )
+    assert resp.status == 200
+    body = await resp.json()
+    assert body["results"][0]["strategy"] == "weighted"
+    assert body["results"][1] == {
+        "ok": False,
+        "error": "Unknown picking strategy loudest",
+    }
+    scheduled_job = randompicker_app.scheduler.get_job(body["results"][0]["job_id"])
+    assert scheduled_job.kwargs["strategy"] == "weighted"
+    randompicker_app.scheduler.remove_all_jobs()
+
+
 async def test_POST_slashcommand_list_empty(api_post):
     resp = await api_post(
         "/slashcommand",
@@ -290,6 +643,178 @@ async def test_POST_slashcommand_list(api_post, mock_slack_api):
     }
 
 
+async def test_POST_slashcommand_list_cache(api_post, mock_slack_api, mocker):
+    list_scheduled_jobs_page = mocker.spy(randompicker_app, "list_scheduled_jobs_page")
+    list_data = {
+        "text": "list",
+        "user_id": "U1337",
+        "channel_id": "C1234",
+        "team_id": "T0007",
+    }
+    resp = await api_post("/slashcommand", data=list_data)
+    assert (await resp.json())["blocks"][0]["text"]["text"] == (
+        "You haven't configured any random picks."
+    )
+    # the team jobs didn't change, the list is cached
+    resp = await api_post("/slashcommand", data=list_data)
+    assert list_scheduled_jobs_page.call_count == 1
+
+    # adding a job invalidates the cached list
+    resp = await api_post(
+        "/slashcommand",
+        data={
+            "text": "<#C012X7LEUSV|general> to play music every day",
+            "user_id": "U1337",
+            "channel_id": "C1234",
+            "team_id": "T0007",
+        },
+    )
+    assert resp.status == 200
+    resp = await api_post("/slashcommand", data=list_data)
+    assert len((await resp.json())["blocks"]) == 3
+    assert list_scheduled_jobs_page.call_count == 2
+
+
+async def test_POST_slashcommand_list_json_encoder(
+    app, api_post, mock_slack_api, monkeypatch
+):
+    resp = await api_post(
+        "/slashcommand",
+        data={
+            "text": "<#C012X7LEUSV|general> to play music every day",
+            "user_id": "U1337",
+            "channel_id": "C1234",
+            "team_id": "T0007",
+        },
+    )
+    assert resp.status == 200
+    json_dumps = Mock(return_value='{"blocks":[]}')
+    monkeypatch.setitem(app.config, "JSON_DUMPS", json_dumps)
+
+    resp = await api_post(
+        "/slashcommand",
+        data={
+            "text": "list",
+            "user_id": "U1337",
+            "channel_id": "C1234",
+            "team_id": "T0007",
+        },
+    )
+    assert resp.status == 200
+    assert await resp.json() == {"blocks": []}
+    json_dumps.assert_called_once()
+
+
+async def test_GET_metrics(test_cli, api_post):
+    resp = await api_post(
+        "/slashcommand",
+        data={
+            "text": "stuff",
+            "user_id": "U1337",
+            "channel_id": "C1234",
+            "team_id": "T0007",
+        },
+    )
+    assert resp.status == 200
+    resp = await test_cli.get("/metrics")
+    assert resp.status == 200
+    assert resp.content_type == "text/plain"
+    body = (await resp.read()).decode()
+    assert (
+        'randompicker_request_duration_seconds_count{route="/slashcommand",'
+        'method="POST"}' in body
+    )
+    assert "# TYPE randompicker_help_fallbacks_total counter" in body
+    assert 'randompicker_cache_hit_ratio{cache="listing"}' in body
+
+
+async def test_load_shedding(test_cli, api_post, mock_slack_api, monkeypatch):
+    monkeypatch.setattr(randompicker_app.loop_lag_monitor, "threshold", -1.0)
+    data = {"user_id": "U1337", "channel_id": "C1234", "team_id": "T0007"}
+    shed_listing = SHED_REQUESTS.get(kind="listing")
+    shed_scheduling = SHED_REQUESTS.get(kind="scheduling")
+
+    resp = await api_post("/slashcommand", data={**data, "text": "list"})
+    assert resp.status == 200
+    assert (await resp.text()) == BUSY_MESSAGE
+    resp = await api_post(
+        "/slashcommand",
+        data={**data, "text": "<#C012X7LEUSV|general> to play music every day"},
+    )
+    assert (await resp.text()) == BUSY_MESSAGE
+    mock_slack_api.users_info.assert_not_called()
+    resp = await test_cli.post(
+        "/admin/schedules", json={}, headers={"Authorization": "Bearer admin-secret"}
+    )
+    assert resp.status == 503
+    assert SHED_REQUESTS.get(kind="listing") == shed_listing + 1
+    assert SHED_REQUESTS.get(kind="scheduling") == shed_scheduling + 2
+
+    # immediate picks are still served
+    resp = await api_post(
+        "/slashcommand", data={**data, "text": "<#C012X7LEUSV|general> to play music"}
+    )
+    assert resp.status == 200
+    assert (await resp.text()) == ""
+    mock_slack_api.chat_postMessage.assert_called()
+
+
+async def test_GET_admin_scheduler(test_cli):
+    resp = await test_cli.get("/admin/scheduler")
+    assert resp.status == 401
+    resp = await test_cli.get(
+        "/admin/scheduler", headers={"Authorization": "Bearer admin-secret"}
+    )
+    assert resp.status == 200
+    body = await resp.json()
+    assert set(body) == {"lag", "missed_runs", "coalesced_runs", "failed_runs"}
+    assert set(body["lag"]) == {"start", "delivery"}
+
+
+async def test_admin_profiling(test_cli, api_post, monkeypatch, tmp_path):
+    monkeypatch.setattr(randompicker_app.profiler, "directory", str(tmp_path))
+    headers = {"Authorization": "Bearer admin-secret"}
+    resp = await test_cli.post(
+        "/admin/profiling", json={"target": "other"}, headers=headers
+    )
+    assert resp.status == 400
+    resp = await test_cli.post(
+        "/admin/profiling", json={"target": "request"}, headers=headers
+    )
+    assert resp.status == 200
+    assert (await resp.json())["armed_requests"] == 1
+
+    # the next request is profiled
+    resp = await api_post(
+        "/slashcommand",
+        data={
+            "text": "help",
+            "user_id": "U1337",
+            "channel_id": "C1234",
+            "team_id": "T0007",
+        },
+    )
+    assert resp.status == 200
+    # and requests with the profile header
+    resp = await test_cli.get("/metrics", headers={"X-Profile-Token": "other"})
+    resp = await test_cli.get("/metrics", headers={"X-Profile-Token": "admin-secret"})
+    assert resp.status == 200
+
+    resp = await test_cli.get("/admin/profiling", headers=headers)
+    body = await resp.json()
+    assert body["armed_requests"] == 0
+    assert [os.path.basename(path).split("-", 1)[1] for path in body["profiles"]] == [
+        "request-_metrics.prof",
+        "request-_slashcommand.prof",
+    ]
+
+    resp = await test_cli.post(
+        "/admin/profiling", json={"target": "job", "job_id": "T1-xxx"}, headers=headers
+    )
+    assert (await resp.json())["armed_jobs"] == ["T1-xxx"]
+    randompicker_app.profiler.armed_jobs.clear()
+
+
 async def test_GET_actions(test_cli):
     resp = await test_cli.get("/actions")
     assert resp.status == 405
@@ -385,6 +910,181 @@ async def test_POST_actions_removed_job(api_post, mocker, mock_slack_api):
     )
 
 
+@pytest.mark.parametrize(
+    "action_id,cursor_index,expected_index",
+    [(SLACK_ACTION_NEXT_PAGE, 0, 1), (SLACK_ACTION_PREVIOUS_PAGE, 1, 0)],
+)
+async def test_POST_actions_change_page(
+    api_post,
+    mocker,
+    mock_slack_api,
+    monkeypatch,
+    action_id,
+    cursor_index,
+    expected_index,
+):
+    mocker.patch.object(requests, "post")
+    monkeypatch.setattr(jobs, "JOBS_PAGE_SIZE", 1)
+    for task in ("play guitar", "play piano"):
+        resp = await api_post(
+            "/slashcommand",
+            data={
+                "text": f"<#C012X7LEUSV|general> to {task} every day",
+                "user_id": "U1337",
+                "channel_id": "C1234",
+                "team_id": "T0007",
+            },
+        )
+        assert resp.status == 200
+    scheduled_jobs = sorted(
+        randompicker_app.scheduler.get_jobs(), key=lambda job: job.id
+    )
+
+    resp = await api_post(
+        "/actions",
+        data={
+            "payload": json.dumps(
+                {
+                    "team": {"id": "T0007"},
+                    "user": {"id": "U1337"},
+                    "channel": {"id": "C42"},
+                    "response_url": "http://resp.url",
+                    "actions": [
+                        {
+                            "action_id": action_id,
+                            "value": scheduled_jobs[cursor_index].id,
+                        }
+                    ],
+                }
+            ),
+        },
+    )
+    assert resp.status == 200
+    requests.post.assert_called_once()
+    blocks = requests.post.call_args[1]["json"]["blocks"]
+    # category, job, pagination and close blocks
+    assert len(blocks) == 4
+    expected_job = scheduled_jobs[expected_index]
+    assert blocks[1]["accessory"]["value"] == expected_job.id
+    assert blocks[2]["elements"] == [
+        {
+            "type": "button",
+            "text": {
+                "type": "plain_text",
+                "text": "Previous" if expected_index else "Next",
+            },
+            "value": expected_job.id,
+            "action_id": SLACK_ACTION_PREVIOUS_PAGE
+            if expected_index
+            else SLACK_ACTION_NEXT_PAGE,
+        }
+    ]
+
+
+async def test_POST_actions_removed_job_patch_message(api_post, mocker, mock_slack_api):
+    mocker.patch.object(requests, "post")
+    for task in ("play guitar", "play piano"):
+        resp = await api_post(
+            "/slashcommand",
+            data={
+                "text": f"<#C012X7LEUSV|general> to {task} every day",
+                "user_id": "U1337",
+                "channel_id": "C1234",
+                "team_id": "T0007",
+            },
+        )
+        assert resp.status == 200
+    resp = await api_post(
+        "/slashcommand",
+        data={
+            "text": "list",
+            "user_id": "U1337",
+            "channel_id": "C42",
+            "team_id": "T0007",
+        },
+    )
+    message = await resp.json()
+    removed_block, kept_block = message["blocks"][1:3]
+    mocker.spy(randompicker_app, "list_scheduled_jobs_page")
+
+    resp = await api_post(
+        "/actions",
+        data={
+            "payload": json.dumps(
+                {
+                    "team": {"id": "T0007"},
+                    "user": {"id": "U1337"},
+                    "channel": {"id": "C42"},
+                    "response_url": "http://resp.url",
+                    "actions": [
+                        {
+                            "action_id": SLACK_ACTION_REMOVE_JOB,
+                            "value": removed_block["accessory"]["value"],
+                        },
+                    ],
+                    "message": message,
+                }
+            ),
+        },
+    )
+    assert resp.status == 200
+    assert len(randompicker_app.scheduler.get_jobs()) == 1
+    requests.post.assert_called_with(
+        "http://resp.url",
+        json={"blocks": [message["blocks"][0], kept_block, CLOSE_BLOCK]},
+    )
+    randompicker_app.list_scheduled_jobs_page.assert_not_called()
+
+
+async def test_POST_actions_removed_last_job_of_page(
+    api_post, mocker, mock_slack_api, monkeypatch
+):
+    mocker.patch.object(requests, "post")
+    monkeypatch.setattr(jobs, "JOBS_PAGE_SIZE", 1)
+    for task in ("play guitar", "play piano", "play drums"):
+        resp = await api_post(
+            "/slashcommand",
+            data={
+                "text": f"<#C012X7LEUSV|general> to {task} every day",
+                "user_id": "U1337",
+                "channel_id": "C1234",
+                "team_id": "T0007",
+            },
+        )
+        assert resp.status == 200
+    job_ids = sorted(job.id for job in randompicker_app.scheduler.get_jobs())
+
+    async def remove_job(job_id, cursor):
+        page = await randompicker_app.list_and_format_scheduled_jobs(
+            "T0007", "C42", cursor
+        )
+        resp = await api_post(
+            "/actions",
+            data={
+                "payload": json.dumps(
+                    {
+                        "team": {"id": "T0007"},
+                        "user": {"id": "U1337"},
+                        "channel": {"id": "C42"},
+                        "response_url": "http://resp.url",
+                        "actions": [
+                            {"action_id": SLACK_ACTION_REMOVE_JOB, "value": job_id}
+                        ],
+                        "message": page,
+                    }
+                ),
+            },
+        )
+        assert resp.status == 200
+        blocks = requests.post.call_args[1]["json"]["blocks"]
+        return [block["accessory"]["value"] for block in blocks if "accessory" in block]
+
+    # the second page is replaced by the jobs after it
+    assert await remove_job(job_ids[1], job_ids[0]) == [job_ids[2]]
+    # the last page is replaced by the previous page
+    assert await remove_job(job_ids[2], job_ids[0]) == [job_ids[0]]
+
+
 async def test_POST_actions_close(api_post, mocker):
     mocker.patch.object(requests, "post")
     resp = await api_post(
@@ -0,0 +1,59 @@
+from randompicker import cache
+from randompicker.cache import LRUCache, TTLCache, VersionedCache
+
+
+def test_lru_cache():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # evicts "b", the least recently used
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("b", "default") == "default"
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.hits == 3
+    assert cache.misses == 2
+    assert cache.hit_rate == 0.6
+
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.hit_rate == 0.0
+
+
+def test_versioned_cache():
+    cache = VersionedCache(maxsize=10)
+    cache.set("T1", "a", 1)
+    cache.set("T2", "a", 2)
+    assert cache.get("T1", "a") == 1
+
+    cache.bump("T1")
+    assert cache.get("T1", "a") is None
+    assert cache.get("T2", "a") == 2
+    cache.set("T1", "a", 3)
+    assert cache.get("T1", "a") == 3
+    assert cache.hit_rate == 0.75
+
+    cache.clear()
+    assert cache.get("T2", "a") is None
+
+
+def test_ttl_cache(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now)
+    ttl_cache = TTLCache(maxsize=2, ttl=60)
+    ttl_cache.set("a", 1)
+    assert ttl_cache.get("a") == 1
+    now += 59
+    ttl_cache.set("b", 2)
+    assert ttl_cache.get("a") == 1
+    now += 1
+    assert ttl_cache.get("a") is None
+    assert ttl_cache.get("a", 0) == 0
+    assert len(ttl_cache) == 1
+    assert ttl_cache.get("b") == 2
+    assert (ttl_cache.hits, ttl_cache.misses) == (3, 2)
+    ttl_cache.set("c", 3)
+    ttl_cache.set("d", 4)
+    assert ttl_cache.get("b") is None
@@ -3,6 +3,12 @@ import os
 os.environ.setdefault("SLACK_TOKEN", "xoxb-00000000")
 os.environ.setdefault("SLACK_SIGNING_SECRET", "1b5d1a00001001010be0a59fce1b8977")
 os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("ADMIN_TOKEN", "admin-secret")
+# the event loop of the tests lags, only shed requests on purpose
+os.environ.setdefault("LOAD_SHEDDING_LAG", "60")
+# the tests send many commands as the same user
+os.environ.setdefault("USER_COMMAND_RATE", "10000")
+os.environ.setdefault("TEAM_COMMAND_RATE", "10000")
 
 from asyncio import Future
 import hashlib
@@ -14,6 +20,7 @@ import pytest
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 from randompicker import app as randompicker_app, slack_utils
+from randompicker.jobstore import RandomPickerJobStore
 
 
 @pytest.yield_fixture
@@ -83,15 +90,13 @@ def api_post(test_cli, api_signature):
 
 
 @pytest.fixture
-def scheduler(loop) -> Generator[AsyncIOScheduler, None, None]:
-    scheduler = AsyncIOScheduler(
-        {
-            "apscheduler.jobstores.default": {
-                "type": "sqlalchemy",
-                "url": os.environ["DATABASE_URL"],
-            },
-        }
-    )
+def jobstore() -> RandomPickerJobStore:
+    return RandomPickerJobStore(url=os.environ["DATABASE_URL"])
+
+
+@pytest.fixture
+def scheduler(loop, jobstore) -> Generator[AsyncIOScheduler, None, None]:
+    scheduler = AsyncIOScheduler(jobstores={"default": jobstore})
     scheduler.start()
     yield scheduler
     scheduler.shutdown()
@@ -0,0 +1,17 @@
+import json
+
+from randompicker import encoding
+from randompicker.format import HELP
+
+
+def test_encode_json():
+    encoded = encoding.encode_json(HELP)
+    assert isinstance(encoded, bytes)
+    assert json.loads(encoded) == HELP
+    assert b"_/pickrandom_" in encoded
+
+
+def test_static_json_response():
+    resp = encoding.static_json_response(b'{"ok":true}')
+    assert resp.body == b'{"ok":true}'
+    assert resp.content_type == "application/json"
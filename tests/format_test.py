@@ -1,12 +1,14 @@
-from datetime import datetime
+from datetime import datetime, timezone
 
 from apscheduler.job import Job
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.date import DateTrigger
+import cron_descriptor
 import pytest
 
 from randompicker import format as format_
+from randompicker.history import PickStats
 
 
 def dummy_func(target, task):
@@ -50,6 +52,28 @@ test_jobs = [
 ]
 
 
+def test_format_pick_stats():
+    assert format_.format_pick_stats([]) == format_.NO_STATS
+    stats = [
+        PickStats("U1", 3, datetime(2020, 5, 6, 9, tzinfo=timezone.utc)),
+        PickStats("U2", 1, datetime(2020, 5, 4, 9, tzinfo=timezone.utc)),
+    ]
+    assert format_.format_pick_stats(stats) == {
+        "blocks": [
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": "*Most picked people*\n"
+                    "<@U1>: 3 picks, last on <!date^1588755600^{date_short}|2020-05-06>\n"
+                    "<@U2>: 1 pick, last on <!date^1588582800^{date_short}|2020-05-04>",
+                },
+            },
+            format_.CLOSE_BLOCK,
+        ]
+    }
+
+
 @pytest.mark.asyncio
 async def test_format_scheduled_jobs():
     expected = {
@@ -142,6 +166,72 @@ async def test_format_scheduled_jobs():
     assert value == expected_empty
 
 
+@pytest.mark.asyncio
+async def test_format_scheduled_jobs_pagination():
+    value = await format_.format_scheduled_jobs("C1234", test_jobs[:1], "xxx", "yyy")
+    assert value["blocks"][-2:] == [
+        {
+            "type": "actions",
+            "elements": [
+                {
+                    "type": "button",
+                    "text": {"type": "plain_text", "text": "Previous"},
+                    "value": "xxx",
+                    "action_id": format_.SLACK_ACTION_PREVIOUS_PAGE,
+                },
+                {
+                    "type": "button",
+                    "text": {"type": "plain_text", "text": "Next"},
+                    "value": "yyy",
+                    "action_id": format_.SLACK_ACTION_NEXT_PAGE,
+                },
+            ],
+        },
+        format_.CLOSE_BLOCK,
+    ]
+
+    value = await format_.format_scheduled_jobs("C1234", test_jobs[:1], None, "yyy")
+    assert [element["text"]["text"] for element in value["blocks"][-2]["elements"]] == [
+        "Next"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_remove_job_block():
+    message = await format_.format_scheduled_jobs("C1234", test_jobs)
+    blocks = message["blocks"]
+
+    # last job of its category
+    assert format_.remove_job_block(blocks, "xxx") == {"blocks": blocks[2:]}
+    # category with other jobs
+    assert format_.remove_job_block(blocks, "zzz") == {
+        "blocks": blocks[:3] + blocks[4:]
+    }
+    # last category
+    assert format_.remove_job_block(blocks, "yyy") == {
+        "blocks": blocks[:5] + blocks[7:]
+    }
+    # unknown job
+    assert format_.remove_job_block(blocks, "???") == {"blocks": blocks}
+
+    # last job
+    message = await format_.format_scheduled_jobs("C1234", test_jobs[:1])
+    assert format_.remove_job_block(message["blocks"], "xxx") == format_.NO_JOBS
+    # last job of the page
+    message = await format_.format_scheduled_jobs("C1234", test_jobs[:1], "xxx")
+    assert format_.remove_job_block(message["blocks"], "xxx") is None
+
+
+@pytest.mark.asyncio
+async def test_get_page_start():
+    message = await format_.format_scheduled_jobs("C1234", test_jobs, "xxx", "yyy")
+    assert format_.get_page_start(message["blocks"]) == "xxx"
+    message = await format_.format_scheduled_jobs("C1234", test_jobs, None, "yyy")
+    assert format_.get_page_start(message["blocks"]) is None
+    message = await format_.format_scheduled_jobs("C1234", test_jobs)
+    assert format_.get_page_start(message["blocks"]) is None
+
+
 test_triggers = [
     # crons
     (CronTrigger(hour="9", minute="0"), "at 09:00 AM, every day",),
@@ -182,6 +272,47 @@ def test_format_trigger(trigger, expected):
     assert format_.format_trigger(trigger) == expected
 
 
+def test_format_job_trigger(mocker):
+    mocker.patch.object(cron_descriptor, "get_description")
+    job = Job(
+        id="xxx",
+        scheduler=test_scheduler,
+        func=dummy_func,
+        args=(),
+        kwargs={"target": "C1234", "task": "play music"},
+        trigger=CronTrigger(day_of_week="mon", hour="9", minute="0", week="*"),
+        name="at 09:00 AM, every Monday",
+    )
+    assert format_.format_job_trigger(job) == "at 09:00 AM, every Monday"
+    cron_descriptor.get_description.assert_not_called()
+
+
+def test_format_job_trigger_legacy_job():
+    # jobs scheduled without a description are named after their function
+    assert format_.format_job_trigger(test_jobs[0]) == "at 09:00 AM, every Monday"
+
+
+def test_format_trigger_memoized(mocker):
+    format_._format_cron_fields.cache_clear()
+    mocker.spy(cron_descriptor, "get_description")
+    for _ in range(3):
+        assert (
+            format_.format_trigger(CronTrigger(day_of_week="tue", hour="9", minute="0"))
+            == "at 09:00 AM, every Tuesday"
+        )
+    assert cron_descriptor.get_description.call_count == 1
+
+
+def test_preload_formatters(mocker):
+    format_._format_cron_fields.cache_clear()
+    mocker.spy(cron_descriptor, "get_description")
+    format_.preload_formatters()
+    assert cron_descriptor.get_description.call_count == 1
+    # the description of the most common frequency is cached along
+    format_.format_trigger(CronTrigger(hour="9", minute="0", timezone="Europe/Paris"))
+    assert cron_descriptor.get_description.call_count == 1
+
+
 test_slack_ids_messages = [
     ("C01234", "<#C01234> you have been picked to play music"),
     ("U01234", "<@U01234> you have been picked to play music"),
@@ -191,7 +322,14 @@ test_slack_ids_messages = [
 
 @pytest.mark.parametrize("slack_id,expected", test_slack_ids_messages)
 def test_format_slack_message(slack_id, expected):
-    assert format_.format_slack_message(slack_id, "play music") == expected
+    assert format_.format_slack_message([slack_id], "play music") == expected
+
+
+def test_format_slack_message_several_users():
+    assert (
+        format_.format_slack_message(["U1", "U2", "U3"], "review code")
+        == "<@U1>, <@U2> and <@U3> you have been picked to review code"
+    )
 
 
 test_slack_ids = [
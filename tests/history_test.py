@@ -0,0 +1,62 @@
+from datetime import datetime, timezone
+
+from apscheduler.events import EVENT_JOB_EXECUTED, JobExecutionEvent
+import pytest
+from sqlalchemy import create_engine, func, select
+
+from randompicker import history as history_
+from randompicker.slack_utils import PickResult
+
+
+@pytest.fixture
+def history():
+    return history_.PickHistory(create_engine("sqlite://"), batch_size=3)
+
+
+def count_rows(history, table):
+    return history.engine.execute(select([func.count()]).select_from(table)).scalar()
+
+
+def test_pick_history_batches(history):
+    history.record("T1", "T1-U1-xxx", ["U1"], datetime(2020, 5, 4, 9))
+    history.record("T1", None, ["U2"], datetime(2020, 5, 4, 10))
+    assert len(history.pending) == 2
+    assert count_rows(history, history.history_t) == 0
+
+    # the third pick fills the batch
+    history.record("T2", "T2-U1-xxx", ["U1"], datetime(2020, 5, 4, 11))
+    assert history.pending == []
+    assert count_rows(history, history.history_t) == 3
+    assert count_rows(history, history.stats_t) == 3
+
+
+def test_pick_history_stats(history):
+    history.record("T1", "T1-U1-xxx", ["U1", "U2"], datetime(2020, 5, 4, 9))
+    history.record("T1", "T1-U1-xxx", ["U1"], datetime(2020, 5, 5, 9))
+    history.flush()
+    history.record("T1", "T1-U1-yyy", ["U1"], datetime(2020, 5, 6, 9))
+    history.record("T2", "T2-U1-xxx", ["U3"], datetime(2020, 5, 6, 9))
+
+    # pending picks are written first
+    assert history.get_stats("T1") == [
+        history_.PickStats("U1", 3, datetime(2020, 5, 6, 9).astimezone(timezone.utc)),
+        history_.PickStats("U2", 1, datetime(2020, 5, 4, 9).astimezone(timezone.utc)),
+    ]
+    assert count_rows(history, history.history_t) == 5
+    assert [stats.user_id for stats in history.get_stats("T1", limit=1)] == ["U1"]
+    assert history.get_stats("T3") == []
+
+
+def test_record_pick_history(history):
+    event = JobExecutionEvent(
+        EVENT_JOB_EXECUTED,
+        "T1-U1-xxx",
+        "default",
+        datetime.now(),
+        retval=PickResult(["U2", "U3"], {}),
+    )
+    history_.record_pick_history(history, event)
+    assert [pick[:3] for pick in history.pending] == [
+        ("T1", "T1-U1-xxx", "U2"),
+        ("T1", "T1-U1-xxx", "U3"),
+    ]
@@ -1,11 +1,20 @@
-from datetime import datetime
-from unittest.mock import MagicMock, Mock
+from datetime import datetime, timedelta, timezone
 
 import pytest
 from recurrent import RecurringEvent
-from apscheduler.events import JobExecutionEvent, EVENT_JOB_EXECUTED
+from apscheduler.events import (
+    EVENT_ALL_JOBS_REMOVED,
+    EVENT_JOB_EXECUTED,
+    EVENT_JOB_REMOVED,
+    JobEvent,
+    JobExecutionEvent,
+    SchedulerEvent,
+)
 
 from randompicker import jobs
+from randompicker.cache import VersionedCache
+from randompicker.metrics import COALESCED_RUNS, MISSED_RUNS
+from randompicker.slack_utils import PickResult
 
 
 rec_event = RecurringEvent()
@@ -38,31 +47,262 @@ test_frequencies = [
 ]
 
 
+def test_make_job_id_count():
+    job_id = jobs.make_job_id("T123456", "U78910", "play music", "C1234", rec_event)
+    assert (
+        jobs.make_job_id("T123456", "U78910", "play music", "C1234", rec_event, 1)
+        == job_id
+    )
+    assert (
+        jobs.make_job_id("T123456", "U78910", "play music", "C1234", rec_event, 2)
+        != job_id
+    )
+
+
 @pytest.mark.parametrize("frequency,task,target,expected", test_frequencies)
 def test_make_job_id(frequency, task, target, expected):
     assert jobs.make_job_id("T123456", "U78910", task, target, frequency) == expected
 
 
-def test_list_scheduled_jobs():
-    job1 = Mock(id="T123456-U78910-0a0ca9f0c52fec59b714ea1a1c7f5f9928d33fd3")
-    job2 = Mock(id="T123456-U78911-0a0ca9f0c52fec59b714ea1a1c7f5f9928d33fd3")
-    job3 = Mock(id="T123457-U78910-0a0ca9f0c52fec59b714ea1a1c7f5f9928d33fd3")
-    job4 = Mock(id="T123456-U78910-broken")
-    scheduler = MagicMock()
-    scheduler.get_jobs.return_value = [job1, job2, job3, job4]
-    assert jobs.list_scheduled_jobs(scheduler, "T123456") == [job1, job2]
+def fake_job(rotation=None, previous_user_picks=None):
+    pass
 
 
-def fake_job(previous_user_picks=None):
-    pass
+def test_list_scheduled_jobs_page(scheduler, jobstore, monkeypatch):
+    monkeypatch.setattr(jobs, "JOBS_PAGE_SIZE", 2)
+    job_ids = [f"T123456-U78910-{index:040x}" for index in range(5)]
+    for job_id in job_ids + [
+        "T123457-U78910-0a0ca9f0c52fec59b714ea1a1c7f5f9928d33fd3",
+        "T123456-U78910-broken",
+    ]:
+        scheduler.add_job(fake_job, id=job_id, trigger="cron", hour="9")
+
+    page = jobs.list_scheduled_jobs_page(jobstore, "T123456")
+    assert [job.id for job in page.jobs] == job_ids[:2]
+    assert page.previous_cursor is None
+    assert page.next_cursor == job_ids[1]
+
+    page = jobs.list_scheduled_jobs_page(jobstore, "T123456", page.next_cursor)
+    assert [job.id for job in page.jobs] == job_ids[2:4]
+    assert page.previous_cursor == job_ids[2]
+    assert page.next_cursor == job_ids[3]
+
+    last_page = jobs.list_scheduled_jobs_page(jobstore, "T123456", page.next_cursor)
+    assert [job.id for job in last_page.jobs] == job_ids[4:]
+    assert last_page.previous_cursor == job_ids[4]
+    assert last_page.next_cursor is None
+
+    page = jobs.list_scheduled_jobs_page(
+        jobstore, "T123456", last_page.previous_cursor, backwards=True
+    )
+    assert [job.id for job in page.jobs] == job_ids[2:4]
+    assert page.previous_cursor == job_ids[2]
+    assert page.next_cursor == job_ids[3]
+
+    page = jobs.list_scheduled_jobs_page(
+        jobstore, "T123456", page.previous_cursor, backwards=True
+    )
+    assert [job.id for job in page.jobs] == job_ids[:2]
+    assert page.previous_cursor is None
+    assert page.next_cursor == job_ids[1]
+
+
+def test_list_scheduled_jobs_page_empty(jobstore, scheduler):
+    assert jobs.list_scheduled_jobs_page(jobstore, "T123456") == ([], None, None)
 
 
 def test_update_picker_rotation(scheduler):
-    scheduler.add_job(fake_job, id="xxx", trigger="cron", day_of_week="*")
+    scheduler.add_job(
+        fake_job,
+        id="xxx",
+        trigger="cron",
+        day_of_week="*",
+        kwargs={"previous_user_picks": {"U2"}},
+    )
+    rotation = {"order": ["U2", "U1"], "cursor": 2}
     event = JobExecutionEvent(
-        EVENT_JOB_EXECUTED, "xxx", "default", datetime.now(), retval={"U1"}
+        EVENT_JOB_EXECUTED,
+        "xxx",
+        "default",
+        datetime.now(),
+        retval=PickResult(["U1"], rotation),
     )
     jobs.update_picker_rotation(scheduler, event)
 
     job = scheduler.get_job("xxx")
-    assert job.kwargs["previous_user_picks"] == {"U1"}
+    # the legacy state is replaced by the rotation
+    assert job.kwargs == {"rotation": rotation}
+
+
+def test_invalidate_team_cache():
+    cache = VersionedCache(maxsize=10)
+    cache.set("T1", "list", 1)
+    cache.set("T2", "list", 2)
+
+    jobs.invalidate_team_cache(
+        cache, JobEvent(EVENT_JOB_REMOVED, "T1-U1-xxx", "default")
+    )
+    assert cache.get("T1", "list") is None
+    assert cache.get("T2", "list") == 2
+
+    jobs.invalidate_team_cache(cache, SchedulerEvent(EVENT_ALL_JOBS_REMOVED))
+    assert cache.get("T2", "list") is None
+
+
+def test_recover_missed_jobs(scheduler, jobstore, monkeypatch):
+    scheduler.pause()
+    now = datetime(2020, 6, 10, 9, 5, tzinfo=timezone.utc)
+    # missed 5 minutes ago, deadline in 5 minutes
+    scheduler.add_job(
+        fake_job,
+        id="recent",
+        trigger="cron",
+        hour="9",
+        minute="0",
+        misfire_grace_time=600,
+        next_run_time=now - timedelta(minutes=5),
+    )
+    # missed 9 minutes ago, deadline in 1 minute
+    scheduler.add_job(
+        fake_job,
+        id="urgent",
+        trigger="date",
+        run_date=now - timedelta(minutes=9),
+        misfire_grace_time=600,
+        next_run_time=now - timedelta(minutes=9),
+    )
+    # missed 20 minutes ago, past its deadline
+    scheduler.add_job(
+        fake_job,
+        id="too-late-cron",
+        trigger="cron",
+        hour="8",
+        minute="45",
+        misfire_grace_time=600,
+        next_run_time=now - timedelta(minutes=20),
+    )
+    scheduler.add_job(
+        fake_job,
+        id="too-late-date",
+        trigger="date",
+        run_date=now - timedelta(minutes=20),
+        misfire_grace_time=600,
+        next_run_time=now - timedelta(minutes=20),
+    )
+    # not missed
+    scheduler.add_job(
+        fake_job,
+        id="future",
+        trigger="cron",
+        hour="10",
+        minute="0",
+        next_run_time=now + timedelta(minutes=55),
+    )
+
+    loaded_job_ids = []
+    reconstitute_job = jobstore._reconstitute_job
+
+    def record_loaded_job(job_state):
+        job = reconstitute_job(job_state)
+        loaded_job_ids.append(job.id)
+        return job
+
+    monkeypatch.setattr(jobstore, "_reconstitute_job", record_loaded_job)
+
+    missed_run_times = {}
+    assert jobs.recover_missed_jobs(jobstore, 0.5, now, missed_run_times) == (2, 2)
+    # the jobs that are not due are never loaded
+    assert set(loaded_job_ids) == {
+        "recent",
+        "too-late-cron",
+        "too-late-date",
+        "urgent",
+    }
+    assert missed_run_times == {
+        "urgent": now - timedelta(minutes=9),
+        "recent": now - timedelta(minutes=5),
+    }
+
+    assert scheduler.get_job("urgent").next_run_time == now
+    assert scheduler.get_job("recent").next_run_time == now + timedelta(seconds=2)
+    assert scheduler.get_job("too-late-cron").next_run_time == datetime(
+        2020, 6, 11, 8, 45, tzinfo=timezone.utc
+    )
+    assert scheduler.get_job("too-late-date") is None
+    assert scheduler.get_job("future").next_run_time == now + timedelta(minutes=55)
+
+
+def test_recover_missed_jobs_rate_exceeds_deadline(scheduler, jobstore):
+    scheduler.pause()
+    now = datetime(2020, 6, 10, 9, 5, tzinfo=timezone.utc)
+    for index in range(3):
+        scheduler.add_job(
+            fake_job,
+            id=f"job{index}",
+            trigger="date",
+            run_date=now - timedelta(seconds=5),
+            misfire_grace_time=60,
+            next_run_time=now - timedelta(seconds=5),
+        )
+
+    # one pick every 40 seconds, only the first two fit in the grace period
+    assert jobs.recover_missed_jobs(jobstore, 1 / 40, now) == (2, 1)
+    assert len(scheduler.get_jobs()) == 2
+
+
+@pytest.mark.parametrize("rate", [0, -1])
+def test_recover_missed_jobs_disabled(scheduler, jobstore, rate):
+    scheduler.pause()
+    now = datetime(2020, 6, 10, 9, 5, tzinfo=timezone.utc)
+    scheduler.add_job(
+        fake_job,
+        id="cron",
+        trigger="cron",
+        hour="9",
+        minute="0",
+        misfire_grace_time=600,
+        next_run_time=now - timedelta(minutes=5),
+    )
+    scheduler.add_job(
+        fake_job,
+        id="date",
+        trigger="date",
+        run_date=now - timedelta(minutes=5),
+        misfire_grace_time=600,
+        next_run_time=now - timedelta(minutes=5),
+    )
+
+    assert jobs.recover_missed_jobs(jobstore, rate, now) == (0, 2)
+    assert scheduler.get_job("cron").next_run_time == datetime(
+        2020, 6, 11, 9, tzinfo=timezone.utc
+    )
+    assert scheduler.get_job("date") is None
+
+
+def test_recover_missed_jobs_metrics(scheduler, jobstore):
+    scheduler.pause()
+    now = datetime(2020, 6, 10, 9, 5, tzinfo=timezone.utc)
+    # every minute, missed for 20 minutes: the last run is caught up
+    scheduler.add_job(
+        fake_job,
+        id="minutely",
+        trigger="cron",
+        minute="*",
+        misfire_grace_time=600,
+        next_run_time=now - timedelta(minutes=20),
+    )
+    # past its deadline
+    scheduler.add_job(
+        fake_job,
+        id="expired",
+        trigger="date",
+        run_date=now - timedelta(minutes=20),
+        misfire_grace_time=600,
+        next_run_time=now - timedelta(minutes=20),
+    )
+    missed = MISSED_RUNS.get()
+    coalesced = COALESCED_RUNS.get()
+
+    assert jobs.recover_missed_jobs(jobstore, 1, now) == (1, 1)
+    assert MISSED_RUNS.get() == missed + 1
+    assert COALESCED_RUNS.get() == coalesced + 20
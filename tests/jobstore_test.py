@@ -0,0 +1,59 @@
+import pytest
+
+from randompicker.metrics import JOBSTORE_DURATION
+
+
+def fake_job():
+    pass
+
+
+def test_jobstore_count_jobs(scheduler, jobstore):
+    assert jobstore.count_jobs_by_prefix("T123456-") == 0
+    for job_id in ["T123456-U1-a", "T123456-U2-b", "T1234567-U1-c"]:
+        scheduler.add_job(fake_job, id=job_id, trigger="cron", hour="9")
+    assert jobstore.count_jobs_by_prefix("T123456-") == 2
+    assert jobstore.has_job("T123456-U1-a")
+    assert not jobstore.has_job("T123456-U1-x")
+
+
+def test_jobstore_prefix_boundaries(scheduler, jobstore):
+    for job_id in ["T1-", "T1-a", "T1.", "T1,", "T1_a", "T1%", "T1-\u00e9"]:
+        scheduler.add_job(fake_job, id=job_id, trigger="cron", hour="9")
+    assert jobstore.count_jobs_by_prefix("T1-") == 3
+    assert jobstore.count_jobs_by_prefix("T1_") == 1
+    assert jobstore.count_jobs_by_prefix("T1%") == 1
+    assert [job.id for job in jobstore.get_jobs_by_prefix("T1-")] == [
+        "T1-",
+        "T1-a",
+        "T1-\u00e9",
+    ]
+
+
+def test_jobstore_durations(scheduler, jobstore):
+    count = JOBSTORE_DURATION.get_count(operation="add_job")
+    scheduler.add_job(fake_job, id="xxx", trigger="cron", hour="9")
+    assert JOBSTORE_DURATION.get_count(operation="add_job") == count + 1
+
+
+def test_jobstore_transaction(scheduler, jobstore):
+    scheduler.add_job(fake_job, id="existing", trigger="cron", hour="9")
+    with jobstore.transaction():
+        scheduler.add_job(fake_job, id="new", trigger="cron", hour="9")
+        scheduler.add_job(
+            fake_job, id="existing", trigger="cron", hour="10", replace_existing=True
+        )
+
+    assert sorted(job.id for job in scheduler.get_jobs()) == ["existing", "new"]
+    assert str(scheduler.get_job("existing").trigger.fields[5]) == "10"
+
+
+def test_jobstore_transaction_rollback(scheduler, jobstore):
+    with pytest.raises(RuntimeError):
+        with jobstore.transaction():
+            scheduler.add_job(fake_job, id="new", trigger="cron", hour="9")
+            raise RuntimeError()
+
+    assert scheduler.get_jobs() == []
+    # the job store works as usual outside of transactions
+    scheduler.add_job(fake_job, id="new", trigger="cron", hour="9")
+    assert scheduler.get_job("new") is not None
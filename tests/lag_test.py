@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta, timezone
+
+from apscheduler.events import (
+    EVENT_JOB_ERROR,
+    EVENT_JOB_EXECUTED,
+    EVENT_JOB_MISSED,
+    EVENT_JOB_REMOVED,
+    EVENT_JOB_SUBMITTED,
+    JobEvent,
+    JobExecutionEvent,
+    JobSubmissionEvent,
+)
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+
+from randompicker import lag
+from randompicker.metrics import COALESCED_RUNS, MISSED_RUNS, SCHEDULER_LAG, Summary
+
+
+def fake_job():
+    pass
+
+
+def test_count_fire_times():
+    trigger = CronTrigger(minute="*/10", timezone="UTC")
+    start = datetime(2020, 6, 10, 9, tzinfo=timezone.utc)
+    assert lag.count_fire_times(trigger, start, start) == 0
+    assert lag.count_fire_times(trigger, start, start + timedelta(minutes=10)) == 0
+    assert lag.count_fire_times(trigger, start, start + timedelta(minutes=40)) == 3
+    assert lag.count_fire_times(trigger, start, start + timedelta(days=1000)) == (
+        lag.MAX_COALESCED_RUNS
+    )
+    trigger = DateTrigger(start, timezone="UTC")
+    assert lag.count_fire_times(trigger, start, start + timedelta(days=1)) == 0
+
+
+def test_lag_tracker(scheduler):
+    tracker = lag.LagTracker(scheduler)
+    scheduler.add_job(fake_job, id="xxx", trigger="cron", minute="*/10")
+    now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    run_time = now.replace(minute=now.minute // 10 * 10)
+    start_count = SCHEDULER_LAG.get_count(stage="start")
+    delivery_count = SCHEDULER_LAG.get_count(stage="delivery")
+    coalesced = COALESCED_RUNS.get()
+    missed = MISSED_RUNS.get()
+
+    tracker.handle_event(
+        JobSubmissionEvent(EVENT_JOB_SUBMITTED, "xxx", "default", [run_time])
+    )
+    tracker.handle_event(
+        JobExecutionEvent(EVENT_JOB_EXECUTED, "xxx", "default", run_time)
+    )
+    assert SCHEDULER_LAG.get_count(stage="start") == start_count + 1
+    assert SCHEDULER_LAG.get_count(stage="delivery") == delivery_count + 1
+    assert SCHEDULER_LAG.get_quantiles(stage="delivery")[0.5] >= 0
+    assert COALESCED_RUNS.get() == coalesced
+
+    # the next run comes 30 minutes later: two runs were coalesced
+    tracker.handle_event(
+        JobSubmissionEvent(
+            EVENT_JOB_SUBMITTED, "xxx", "default", [run_time + timedelta(minutes=30)]
+        )
+    )
+    assert COALESCED_RUNS.get() == coalesced + 2
+
+    tracker.handle_event(JobExecutionEvent(EVENT_JOB_MISSED, "xxx", "default", now))
+    assert MISSED_RUNS.get() == missed + 1
+
+    tracker.handle_event(JobEvent(EVENT_JOB_REMOVED, "xxx", "default"))
+    assert tracker.last_run_times == {}
+
+    stats = tracker.get_stats()
+    assert stats["missed_runs"] == MISSED_RUNS.get()
+    assert stats["coalesced_runs"] == COALESCED_RUNS.get()
+    assert set(stats["lag"]["delivery"]) == {"count", "p50", "p90", "p99"}
+
+
+def test_lag_tracker_recovered_run(scheduler, monkeypatch):
+    scheduler_lag = Summary("lag", "", ["stage"])
+    monkeypatch.setattr(lag, "SCHEDULER_LAG", scheduler_lag)
+    tracker = lag.LagTracker(scheduler)
+    now = datetime.now(timezone.utc)
+    # missed 7 minutes ago, caught up now
+    tracker.missed_run_times["xxx"] = now - timedelta(minutes=7)
+
+    tracker.handle_event(
+        JobSubmissionEvent(EVENT_JOB_SUBMITTED, "xxx", "default", [now])
+    )
+    tracker.handle_event(JobExecutionEvent(EVENT_JOB_EXECUTED, "xxx", "default", now))
+    assert scheduler_lag.get_quantiles(stage="start")[0.5] >= 7 * 60
+    assert scheduler_lag.get_quantiles(stage="delivery")[0.5] >= 7 * 60
+    assert tracker.missed_run_times == {}
+
+    # the next runs are measured from their scheduled time
+    scheduler_lag = Summary("lag", "", ["stage"])
+    monkeypatch.setattr(lag, "SCHEDULER_LAG", scheduler_lag)
+    tracker.handle_event(
+        JobSubmissionEvent(EVENT_JOB_SUBMITTED, "xxx", "default", [now])
+    )
+    tracker.handle_event(JobExecutionEvent(EVENT_JOB_EXECUTED, "xxx", "default", now))
+    assert scheduler_lag.get_quantiles(stage="delivery")[0.5] < 60
+
+
+def test_lag_tracker_recovered_run_error(scheduler):
+    tracker = lag.LagTracker(scheduler)
+    now = datetime.now(timezone.utc)
+    tracker.missed_run_times["xxx"] = now - timedelta(minutes=7)
+    tracker.handle_event(
+        JobSubmissionEvent(EVENT_JOB_SUBMITTED, "xxx", "default", [now])
+    )
+    tracker.handle_event(JobExecutionEvent(EVENT_JOB_ERROR, "xxx", "default", now))
+    assert tracker.missed_run_times == {}
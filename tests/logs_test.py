@@ -0,0 +1,98 @@
+import json
+import logging
+import queue
+
+from randompicker import logs
+from randompicker.metrics import LOG_RECORDS_DROPPED
+
+
+class ListHandler(logging.Handler):
+    def __init__(self, level=logging.NOTSET):
+        super().__init__(level)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def make_record(name="test", level=logging.INFO, msg="Picked %s", args=("U1",)):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def test_parse_sampling_rates():
+    assert logs.parse_sampling_rates("") == {}
+    assert logs.parse_sampling_rates("sanic.access=0.1, sanic.root=0.5") == {
+        "sanic.access": 0.1,
+        "sanic.root": 0.5,
+    }
+
+
+def test_sampling_filter(mocker):
+    sampling_filter = logs.SamplingFilter({"sanic": 0.25, "sanic.error": 1.0})
+    assert sampling_filter.get_rate("sanic.access") == 0.25
+    assert sampling_filter.get_rate("sanic.error.slack") == 1.0
+    assert sampling_filter.get_rate("apscheduler") == 1.0
+
+    sampled = LOG_RECORDS_DROPPED.get(reason="sampled")
+    mocker.patch.object(logs.random, "random", return_value=0.5)
+    assert not sampling_filter.filter(make_record("sanic.access"))
+    assert sampling_filter.filter(make_record("sanic.access", logging.WARNING))
+    assert sampling_filter.filter(make_record("sanic.error"))
+    mocker.patch.object(logs.random, "random", return_value=0.1)
+    assert sampling_filter.filter(make_record("sanic.access"))
+    assert LOG_RECORDS_DROPPED.get(reason="sampled") == sampled + 1
+
+
+def test_dropping_queue_handler():
+    log_queue = queue.Queue(1)
+    handler = logs.DroppingQueueHandler(log_queue)
+    dropped = LOG_RECORDS_DROPPED.get(reason="queue_full")
+    handler.handle(make_record())
+    handler.handle(make_record())
+    assert LOG_RECORDS_DROPPED.get(reason="queue_full") == dropped + 1
+
+    record = log_queue.get_nowait()
+    assert (record.msg, record.args) == ("Picked U1", None)
+
+
+def test_json_formatter():
+    record = make_record()
+    record.status = 200
+    record.request = ("GET", "/metrics")
+    data = json.loads(logs.JsonFormatter().format(record))
+    assert set(data) == {"time", "level", "logger", "message", "status", "request"}
+    assert data["message"] == "Picked U1"
+    assert data["level"] == "INFO"
+    assert data["status"] == 200
+    assert data["request"] == "('GET', '/metrics')"
+
+
+def test_logging_queue():
+    logger = logging.getLogger("randompicker.test")
+    logger.setLevel(logging.INFO)
+    handler = ListHandler()
+    error_handler = ListHandler(logging.ERROR)
+    logger.handlers = [handler, error_handler]
+
+    listener = logs.start_logging_queue(
+        100, {"randompicker.test.sampled": 0.0}, loggers=["randompicker.test"]
+    )
+    assert isinstance(logger.handlers[0], logs.DroppingQueueHandler)
+    logger.info("Picked %s", "U1")
+    logging.getLogger("randompicker.test.sampled").info("Sampled out")
+    logging.getLogger("randompicker.test.child").info("From a child")
+    try:
+        raise ValueError("oops")
+    except ValueError:
+        logger.exception("Failed")
+    logs.stop_logging_queue(listener)
+
+    assert logger.handlers == [handler, error_handler]
+    assert [record.getMessage() for record in handler.records] == [
+        "Picked U1",
+        "From a child",
+        "Failed",
+    ]
+    assert [record.getMessage() for record in error_handler.records] == ["Failed"]
+    assert "ValueError: oops" in error_handler.records[0].exc_text
+    logger.handlers = []
@@ -0,0 +1,79 @@
+from randompicker import metrics
+
+
+def test_counter():
+    registry = metrics.Registry()
+    counter = registry.register(
+        metrics.Counter("picks_total", "Number of picks.", ["strategy"])
+    )
+    counter.inc(strategy="rotation")
+    counter.inc(2, strategy="weighted")
+    counter.inc(strategy="rotation")
+    assert counter.get(strategy="rotation") == 2
+    assert counter.get(strategy="other") == 0
+    assert registry.render() == (
+        "# HELP picks_total Number of picks.\n"
+        "# TYPE picks_total counter\n"
+        'picks_total{strategy="rotation"} 2.0\n'
+        'picks_total{strategy="weighted"} 2.0\n'
+    )
+
+
+def test_gauge():
+    gauge = metrics.Gauge("hit_ratio", "Hit ratio.", ["cache"])
+    gauge.set_function(lambda: 0.5, cache='a "quoted"\nname')
+    assert gauge.render() == [
+        "# HELP hit_ratio Hit ratio.",
+        "# TYPE hit_ratio gauge",
+        'hit_ratio{cache="a \\"quoted\\"\\nname"} 0.5',
+    ]
+
+
+def test_histogram(mocker):
+    histogram = metrics.Histogram(
+        "duration_seconds", "Duration.", ["route"], buckets=(0.1, 1.0)
+    )
+    histogram.observe(0.05, route="/a")
+    histogram.observe(0.1, route="/a")
+    histogram.observe(3, route="/a")
+    perf_counter = mocker.patch.object(metrics.time, "perf_counter")
+    perf_counter.side_effect = [10.0, 10.5]
+    with histogram.time(route="/b"):
+        pass
+
+    assert histogram.get_count(route="/a") == 3
+    assert histogram.get_count(route="/c") == 0
+    assert histogram.render() == [
+        "# HELP duration_seconds Duration.",
+        "# TYPE duration_seconds histogram",
+        'duration_seconds_bucket{route="/a",le="0.1"} 2.0',
+        'duration_seconds_bucket{route="/a",le="1.0"} 2.0',
+        'duration_seconds_bucket{route="/a",le="+Inf"} 3.0',
+        'duration_seconds_sum{route="/a"} 3.15',
+        'duration_seconds_count{route="/a"} 3.0',
+        'duration_seconds_bucket{route="/b",le="0.1"} 0.0',
+        'duration_seconds_bucket{route="/b",le="1.0"} 1.0',
+        'duration_seconds_bucket{route="/b",le="+Inf"} 1.0',
+        'duration_seconds_sum{route="/b"} 0.5',
+        'duration_seconds_count{route="/b"} 1.0',
+    ]
+
+
+def test_summary():
+    summary = metrics.Summary(
+        "lag_seconds", "Lag.", ["stage"], quantiles=(0.5, 0.9), window=10
+    )
+    assert summary.get_quantiles(stage="start") == {}
+    for value in range(20):
+        summary.observe(value, stage="start")
+    # the quantiles are computed over the last 10 observations
+    assert summary.get_quantiles(stage="start") == {0.5: 15, 0.9: 19}
+    assert summary.get_count(stage="start") == 20
+    assert summary.render() == [
+        "# HELP lag_seconds Lag.",
+        "# TYPE lag_seconds summary",
+        'lag_seconds{stage="start",quantile="0.5"} 15.0',
+        'lag_seconds{stage="start",quantile="0.9"} 19.0',
+        'lag_seconds_sum{stage="start"} 190.0',
+        'lag_seconds_count{stage="start"} 20.0',
+    ]
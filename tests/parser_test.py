@@ -1,4 +1,7 @@
 from datetime import datetime
+import random
+import re
+import time
 
 from apscheduler.triggers.cron import CronTrigger
 import pytest
@@ -20,32 +23,70 @@ def test_is_list_command(command, expected):
     assert parser.is_list_command(command) is expected
 
 
+@pytest.mark.parametrize(
+    "command,expected", [("stats", True), (" stats ", True), ("stats all", False)]
+)
+def test_is_stats_command(command, expected):
+    assert parser.is_stats_command(command) is expected
+
+
 test_commands = [
     ("stuff", None),
     (
         "<#C012X7LEUSV|general> to play music",
-        {"target": "C012X7LEUSV", "task": "play music", "frequency": None},
+        {"target": "C012X7LEUSV", "task": "play music", "frequency": None, "count": 1},
     ),
     (
         "<#C012X7LEUSV|general> to play music every day",
-        {"target": "C012X7LEUSV", "task": "play music", "frequency": "every day"},
+        {
+            "target": "C012X7LEUSV",
+            "task": "play music",
+            "frequency": "every day",
+            "count": 1,
+        },
     ),
     (
         "<#C012X7LEUSV|general> to play music                 ",
-        {"target": "C012X7LEUSV", "task": "play music", "frequency": None},
+        {"target": "C012X7LEUSV", "task": "play music", "frequency": None, "count": 1},
     ),
     (
         "<#C012X7LEUSV|general> to play music on monday",
-        {"target": "C012X7LEUSV", "task": "play music", "frequency": "on monday"},
+        {
+            "target": "C012X7LEUSV",
+            "task": "play music",
+            "frequency": "on monday",
+            "count": 1,
+        },
     ),
     (
         "<#C012X7LEUSV|general> to play music next monday",
-        {"target": "C012X7LEUSV", "task": "play music", "frequency": "next monday"},
+        {
+            "target": "C012X7LEUSV",
+            "task": "play music",
+            "frequency": "next monday",
+            "count": 1,
+        },
     ),
     (
         "<!subteam^S013R9HGXJ5|test-group> to play music",
-        {"target": "S013R9HGXJ5", "task": "play music", "frequency": None},
+        {"target": "S013R9HGXJ5", "task": "play music", "frequency": None, "count": 1},
     ),
+    (
+        "<!subteam^S013R9HGXJ5|test-group> 2 people to review code every day",
+        {
+            "target": "S013R9HGXJ5",
+            "task": "review code",
+            "frequency": "every day",
+            "count": 2,
+        },
+    ),
+    (
+        "<#C012X7LEUSV|general>  1 person  to play music",
+        {"target": "C012X7LEUSV", "task": "play music", "frequency": None, "count": 1},
+    ),
+    ("<#C012X7LEUSV|general> 0 people to play music", None),
+    ("<#C012X7LEUSV|general> 2 personal to play music", None),
+    ("<#C012X7LEUSV|general> 3 people", None),
 ]
 
 
@@ -54,6 +95,82 @@ def test_parse_command(command, expected):
     assert parser.parse_command(command) == expected
 
 
+# the regular expression that parse_command replaced, used as a reference
+REFERENCE_COMMAND_RE = re.compile(
+    r"^<(?:#|!subteam\^)(?P<target>[A-Z0-9]+)(?:|[^>]+)?>\s+"
+    r"to (?P<task>.+?)\s*"
+    r"(?P<frequency>(on|every|next|today|tomorrow) (.+))?$"
+)
+fuzz_tokens = [
+    "<#",
+    "<!subteam^",
+    "C012X7LEUSV",
+    "S0",
+    "a",
+    "|general",
+    ">",
+    ">",
+    " ",
+    " ",
+    "  ",
+    "\n",
+    "\t",
+    "to ",
+    "to ",
+    "on ",
+    "on",
+    "every ",
+    "next ",
+    "today ",
+    "tomorrow ",
+    "day",
+    "upon ",
+]
+
+
+def test_parse_command_fuzz():
+    rand = random.Random(42)
+    for _ in range(5000):
+        command = "".join(rand.choice(fuzz_tokens) for _ in range(rand.randint(0, 16)))
+        if rand.random() < 0.5:
+            command = "<#C012X7LEUSV|general> to " + command
+        match = REFERENCE_COMMAND_RE.match(command.strip())
+        expected = (
+            {
+                **{key: match.group(key) for key in ("target", "task", "frequency")},
+                "count": 1,
+            }
+            if match
+            else None
+        )
+        assert parser.parse_command(command) == expected, command
+
+
+pathological_commands = [
+    "<#C012X7LEUSV|general> to " + " " * 2000 + "x",
+    "<#C012X7LEUSV|general> to " + "a " * 1000,
+    "<#C012X7LEUSV|general> to " + "on " * 700,
+    "<#C012X7LEUSV|general> to " + "every\n" * 300,
+    "<#C012X7LEUSV|general> to x" + " \t" * 1000 + "on",
+    "<#" + "C" * 2000,
+    "<!subteam^S1" + " " * 2000 + "> to x",
+]
+
+
+@pytest.mark.parametrize("command", pathological_commands)
+def test_parse_command_pathological_input(command):
+    for length in (parser.MAX_COMMAND_LENGTH, len(command) * 100):
+        start = time.perf_counter()
+        parser.parse_command(command[:length])
+        assert time.perf_counter() - start < 0.05
+
+
+def test_parse_command_too_long():
+    command = "<#C012X7LEUSV|general> to play music"
+    assert parser.parse_command(command) is not None
+    assert parser.parse_command(command + " " + "x" * parser.MAX_COMMAND_LENGTH) is None
+
+
 test_frequencies = [
     ("every day", {"freq": "daily", "interval": 1, "byhour": "9", "byminute": "0",}),
     ("every year", {"interval": 1, "freq": "yearly", "byhour": "9", "byminute": "0",}),
@@ -97,6 +214,101 @@ def test_parse_frequency(frequency, expected):
     assert output.get_params() == expected
 
 
+common_frequency_days = [
+    "day",
+    "other day",
+    "weekday",
+    "other weekday",
+    "weekend",
+    "weekends",
+    "other weekends",
+    "monday",
+    "Mondays",
+    "tue",
+    "tues",
+    "thurs",
+    "other Wednesday",
+    "Monday and Thursday",
+    "mon, wed and fri",
+    "Monday, Wednesday, and Friday",
+    "other tuesday and thursday",
+    "saturday and sunday",
+]
+# left to the `recurrent` module, which parses them differently
+common_frequency_fallback_days = {"other weekends"}
+common_frequency_times = [
+    "",
+    " at 9am",
+    " at 12am",
+    " at 12:30am",
+    " at 1pm",
+    " at 11:45pm",
+    " at 8:00",
+    " at 10:30",
+    " at 09:05",
+    " at 23:59",
+]
+
+
+@pytest.mark.parametrize("days", common_frequency_days)
+@pytest.mark.parametrize("time", common_frequency_times)
+def test_parse_common_frequency(days, time):
+    frequency = f"every {days}{time}"
+    expected = parser.parse_recurring_event(frequency).get_params()
+    output = parser.parse_common_frequency(parser.normalize_frequency(frequency))
+    if days in common_frequency_fallback_days:
+        assert output is None
+    else:
+        assert isinstance(output, RecurringEvent)
+        # same output as the `recurrent` module
+        assert output.get_params() == expected
+    assert parser.parse_frequency(frequency).get_params() == expected
+
+
+test_uncommon_frequencies = [
+    "every day at 12pm",
+    "every day at 7:00",
+    "every day at 9",
+    "every day at 9 am",
+    "every day at 10:60",
+    "every day at 25:00",
+    "every day at noon",
+    "every 2 weeks on monday",
+    "every month",
+    "every monday until next month",
+]
+
+
+@pytest.mark.parametrize("frequency", test_uncommon_frequencies)
+def test_parse_common_frequency_fallback(frequency):
+    assert parser.parse_common_frequency(parser.normalize_frequency(frequency)) is None
+
+
+def test_parse_frequency_cache():
+    parser.RECURRING_EVENT_CACHE.clear()
+    first = parser.parse_frequency("every 2 weeks  on Monday")
+    first.byhour.append("10")  # callers cannot alter the cached value
+    second = parser.parse_frequency("every 2 weeks on monday")
+    assert second is not first
+    assert second.get_params() == {
+        "byday": "MO",
+        "byhour": "9",
+        "byminute": "0",
+        "freq": "weekly",
+        "interval": 2,
+    }
+    assert parser.RECURRING_EVENT_CACHE.hits == 1
+    assert len(parser.RECURRING_EVENT_CACHE) == 1
+
+
+@pytest.mark.freeze_time("2020-04-28 8:20")
+def test_parse_frequency_relative_dates_not_cached():
+    parser.RECURRING_EVENT_CACHE.clear()
+    output = parser.parse_frequency("every day until next month")
+    assert output.get_params()["until"] == "20200501"
+    assert len(parser.RECURRING_EVENT_CACHE) == 0
+
+
 test_specific_dates = [
     ("tomorrow at 9am", datetime(2020, 4, 29, 9, 0)),
     ("today at 10am", datetime(2020, 4, 28, 10, 0)),
@@ -0,0 +1,55 @@
+from datetime import datetime
+import pstats
+
+from apscheduler.events import (
+    EVENT_JOB_EXECUTED,
+    EVENT_JOB_SUBMITTED,
+    JobExecutionEvent,
+    JobSubmissionEvent,
+)
+
+from randompicker.profiling import Profiler
+
+
+def test_profiler_request(tmp_path):
+    profiler = Profiler(str(tmp_path / "profiles"))
+    assert profiler.list_profiles() == []
+    assert profiler.start_request() is None
+
+    profiler.arm_request()
+    profile = profiler.start_request()
+    assert profile is not None
+    assert profiler.armed_requests == 0
+    # a single capture runs at a time
+    assert profiler.start_request(forced=True) is None
+    sum(range(1000))
+    path = profiler.stop(profile, "request-/slash command")
+
+    assert path.endswith("-request-_slash_command.prof")
+    assert profiler.list_profiles() == [path]
+    assert pstats.Stats(path).total_calls > 0
+
+    profile = profiler.start_request(forced=True)
+    assert profile is not None
+    profiler.stop(profile, "request-/actions")
+    assert len(profiler.list_profiles()) == 2
+
+
+def test_profiler_job(tmp_path):
+    profiler = Profiler(str(tmp_path))
+    now = datetime.now()
+    profiler.handle_event(JobSubmissionEvent(EVENT_JOB_SUBMITTED, "T1-xxx", "", [now]))
+    assert profiler.job_profiles == {}
+
+    profiler.arm_job("T1-yyy")
+    profiler.handle_event(JobSubmissionEvent(EVENT_JOB_SUBMITTED, "T1-xxx", "", [now]))
+    assert profiler.job_profiles == {}
+    profiler.handle_event(JobSubmissionEvent(EVENT_JOB_SUBMITTED, "T1-yyy", "", [now]))
+    assert list(profiler.job_profiles) == ["T1-yyy"]
+    assert profiler.armed_jobs == []
+
+    profiler.handle_event(JobExecutionEvent(EVENT_JOB_EXECUTED, "T1-yyy", "", now))
+    assert profiler.job_profiles == {}
+    assert profiler.active is None
+    [path] = profiler.list_profiles()
+    assert path.endswith("-job-T1-yyy.prof")
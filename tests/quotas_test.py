@@ -0,0 +1,60 @@
+import pytest
+
+from randompicker import quotas
+from randompicker.metrics import LIMITED_REQUESTS
+
+
+def fake_job(**kwargs):
+    pass
+
+
+def test_rate_limiter(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(quotas.time, "monotonic", lambda: now)
+    limiter = quotas.RateLimiter(rate=3)
+    assert [limiter.allow("U1") for _ in range(4)] == [True, True, True, False]
+    assert limiter.allow("U2")
+
+    # a token every 20 seconds
+    now += 10
+    assert not limiter.allow("U1")
+    now += 10
+    assert limiter.allow("U1")
+    assert not limiter.allow("U1")
+
+    # up to the burst size
+    now += 3600
+    assert [limiter.allow("U1") for _ in range(4)] == [True, True, True, False]
+
+
+def test_check_job_quotas(scheduler, jobstore):
+    def add_job(job_id, channel_id):
+        scheduler.add_job(
+            fake_job,
+            id=job_id,
+            trigger="cron",
+            hour="9",
+            kwargs={"channel_id": channel_id},
+        )
+
+    def check(job_id, channel_id):
+        quotas.check_job_quotas(
+            jobstore, job_id, "T1", channel_id, max_team_jobs=3, max_channel_jobs=2,
+        )
+
+    add_job("T1-U1-a", "C1")
+    add_job("T2-U1-b", "C1")
+    check("T1-U1-b", "C1")
+    add_job("T1-U1-b", "C1")
+
+    limited = LIMITED_REQUESTS.get(limit="channel_jobs")
+    with pytest.raises(quotas.QuotaExceeded, match="This channel has reached"):
+        check("T1-U1-c", "C1")
+    assert LIMITED_REQUESTS.get(limit="channel_jobs") == limited + 1
+    # jobs can be replaced
+    check("T1-U1-b", "C1")
+    check("T1-U1-c", "C2")
+    add_job("T1-U1-c", "C2")
+
+    with pytest.raises(quotas.QuotaExceeded, match="Your workspace has reached"):
+        check("T1-U1-d", "C3")
@@ -0,0 +1,147 @@
+from collections import Counter
+from copy import deepcopy
+
+from randompicker import rotation
+
+
+def test_new_rotation():
+    state = rotation.new_rotation({"U1", "U2", "U3"})
+    assert sorted(state["order"]) == ["U1", "U2", "U3"]
+    assert state["cursor"] == 0
+
+
+def test_pick_from_rotation():
+    members = {"U1", "U2", "U3"}
+    state = rotation.new_rotation(members)
+    for _ in range(10):
+        picks = [rotation.pick_from_rotation(state)[0] for _ in range(3)]
+        # everyone is picked once per round
+        assert set(picks) == members
+        assert state["cursor"] == 3
+
+    # a new round never starts with the last pick
+    for _ in range(20):
+        last_pick = state["order"][-1]
+        assert rotation.pick_from_rotation(state) != [last_pick]
+        state["cursor"] = 3
+
+
+def test_pick_from_rotation_single_member():
+    state = rotation.new_rotation({"U1"})
+    assert rotation.pick_from_rotation(state) == ["U1"]
+    assert rotation.pick_from_rotation(state) == ["U1"]
+    assert rotation.pick_from_rotation(state, count=2) == ["U1"]
+
+
+def test_pick_from_rotation_several():
+    members = {"U1", "U2", "U3", "U4", "U5"}
+    state = rotation.new_rotation(members)
+    for _ in range(50):
+        picks = rotation.pick_from_rotation(state, count=3)
+        # the picks are distinct, even across rounds
+        assert len(set(picks)) == 3
+        assert set(picks) <= members
+
+    state = {"order": ["U1", "U2", "U3", "U4", "U5"], "cursor": 4}
+    picks = rotation.pick_from_rotation(state, count=3)
+    assert picks[0] == "U5"
+    # the new round doesn't start with the members picked last
+    assert "U5" not in picks[1:]
+    assert state["cursor"] == 2
+    assert "U5" not in state["order"][:2]
+
+
+def test_sync_rotation_members_left():
+    state = {"order": ["U1", "U2", "U3", "U4"], "cursor": 2}
+    rotation.sync_rotation(state, {"U2", "U3"})
+    assert state == {"order": ["U2", "U3"], "cursor": 1}
+
+
+def test_sync_rotation_members_joined():
+    state = {"order": ["U1", "U2", "U3"], "cursor": 2}
+    rotation.sync_rotation(state, {"U1", "U2", "U3", "U4", "U5"})
+    # new members can only be picked later in this round
+    assert state["order"][:2] == ["U1", "U2"]
+    assert sorted(state["order"][2:]) == ["U3", "U4", "U5"]
+    assert state["cursor"] == 2
+
+
+def test_sync_rotation_joined_uniformly():
+    positions: Counter = Counter()
+    for _ in range(3000):
+        state = {"order": ["U1", "U2"], "cursor": 0}
+        rotation.sync_rotation(state, {"U1", "U2", "U3"})
+        positions[state["order"].index("U3")] += 1
+    assert all(800 < positions[index] < 1200 for index in range(3))
+
+
+def test_load_rotation_migrates_previous_picks():
+    state = rotation.load_rotation({"U1", "U2", "U3"}, previous_user_picks={"U1", "U4"})
+    assert state["order"][0] == "U1"
+    assert sorted(state["order"][1:]) == ["U2", "U3"]
+    assert state["cursor"] == 1
+    assert rotation.pick_from_rotation(state) in (["U2"], ["U3"])
+
+
+def test_load_rotation_existing():
+    state = {"order": ["U1", "U2"], "cursor": 1}
+    assert rotation.load_rotation({"U1", "U2"}, state) is state
+    state = rotation.load_rotation({"U1", "U2"})
+    assert sorted(state["order"]) == ["U1", "U2"]
+    assert state["cursor"] == 0
+
+
+def test_pick_weighted():
+    members = {"U1", "U2", "U3"}
+    [user], state = rotation.pick_weighted(members)
+    assert user in members
+    assert state == {"runs": 1, "picks": {**state["picks"], user: [1, 1]}}
+    assert sorted(state["picks"]) == ["U1", "U2", "U3"]
+
+    counts: Counter = Counter({user: 1})
+    for _ in range(299):
+        previous_user = user
+        [user], state = rotation.pick_weighted(members, state)
+        # the last member picked is never picked again
+        assert user != previous_user
+        counts[user] += 1
+    assert state["runs"] == 300
+    assert all(90 <= counts[user] <= 110 for user in members)
+
+
+def test_pick_weighted_favours_least_picked():
+    state = {"runs": 10, "picks": {"U1": [5, 10], "U2": [5, 9], "U3": [0, 0]}}
+    counts: Counter = Counter(
+        rotation.pick_weighted({"U1", "U2", "U3"}, deepcopy(state))[0][0]
+        for _ in range(1000)
+    )
+    # weights: U1 0 * 1, U2 1 * 1, U3 3 * 6
+    assert counts["U1"] == 0
+    assert counts["U3"] > 850
+
+
+def test_pick_weighted_members_change():
+    state = {"runs": 4, "picks": {"U1": [2, 4], "U2": [2, 3]}}
+    user, state = rotation.pick_weighted({"U2", "U3"}, state)
+    assert set(state["picks"]) == {"U2", "U3"}
+    # members who join start with the lowest number of picks
+    assert state["picks"]["U3"] in ([2, 2], [3, 5])
+    assert state["runs"] == 5
+
+
+def test_pick_weighted_single_member():
+    users, state = rotation.pick_weighted({"U1"})
+    users, state = rotation.pick_weighted({"U1"}, state, count=2)
+    assert users == ["U1"]
+    assert state == {"runs": 2, "picks": {"U1": [2, 2]}}
+
+
+def test_pick_weighted_several():
+    state = {"runs": 3, "picks": {"U1": [1, 3], "U2": [1, 2], "U3": [1, 1]}}
+    users, state = rotation.pick_weighted({"U1", "U2", "U3"}, state, count=3)
+    assert sorted(users) == ["U1", "U2", "U3"]
+    assert state["picks"] == {"U1": [2, 4], "U2": [2, 4], "U3": [2, 4]}
+
+    users, state = rotation.pick_weighted({"U1", "U2", "U3", "U4"}, state, count=2)
+    assert len(set(users)) == 2
+    assert state["runs"] == 5
@@ -1,9 +1,15 @@
+import asyncio
 from datetime import datetime
+from types import SimpleNamespace
 from unittest.mock import call
 
 import pytest
 
+from slack import WebClient
+from slack.errors import SlackApiError
+
 from randompicker import slack_utils
+from randompicker.metrics import DEDUPLICATED_RETRIES, ERRORS, SLACK_API_DURATION
 
 
 @pytest.mark.asyncio
@@ -14,6 +20,29 @@ async def test_list_users_target_channel(mock_slack_api):
     mock_slack_api.usergroups_users_list.assert_not_called()
 
 
+@pytest.mark.asyncio
+async def test_list_users_target_channel_pages(mocker):
+    pages = [
+        {"members": ["U1", "U2"], "response_metadata": {"next_cursor": "page2"}},
+        {"members": ["U3"], "response_metadata": {"next_cursor": "page3"}},
+        {"members": ["U4"], "response_metadata": {"next_cursor": ""}},
+    ]
+    futures = []
+    for page in pages:
+        futures.append(asyncio.Future())
+        futures[-1].set_result(page)
+    conversations_members = mocker.patch.object(
+        slack_utils.slack_client, "conversations_members", side_effect=futures
+    )
+    users = await slack_utils.list_users_target("C000001")
+    assert users == {"U1", "U2", "U3", "U4"}
+    assert conversations_members.mock_calls == [
+        call(channel="C000001"),
+        call(channel="C000001", cursor="page2"),
+        call(channel="C000001", cursor="page3"),
+    ]
+
+
 @pytest.mark.asyncio
 async def test_list_users_target_group(mock_slack_api):
     users = await slack_utils.list_users_target("S000001")
@@ -40,7 +69,9 @@ async def test_pick_user_and_send_message(mock_slack_api):
         call(channel="C000001", text="<@U1> you have been picked to play music"),
         call(channel="C000001", text="<@U2> you have been picked to play music"),
     )
-    assert picked == {"U1"} or picked == {"U2"}
+    assert picked.users in (["U1"], ["U2"])
+    assert sorted(picked.rotation["order"]) == ["U1", "U2"]
+    assert picked.rotation["cursor"] == 1
 
 
 @pytest.mark.asyncio
@@ -58,7 +89,7 @@ async def test_pick_user_and_send_message_rotation(mock_slack_api):
     assert (
         slack_utils.slack_client.chat_postMessage.mock_calls[0] in possible_mock_calls
     )
-    assert picked == {"U1"} or picked == {"U2"}
+    assert picked.rotation["cursor"] == 1
     remaining_call = [
         kall
         for kall in possible_mock_calls
@@ -69,20 +100,127 @@ async def test_pick_user_and_send_message_rotation(mock_slack_api):
     # second run
     slack_utils.slack_client.chat_postMessage.reset_mock()
     picked = await slack_utils.pick_user_and_send_message(
-        "C000001", "C000002", "play music", picked
+        "C000001", "C000002", "play music", picked.rotation
     )
-    assert picked == {"U1", "U2"}
+    assert picked.rotation["cursor"] == 2
     mock_slack_api.chat_postMessage.assert_called()
     assert slack_utils.slack_client.chat_postMessage.mock_calls[0] == remaining_call
 
     # reset run
     slack_utils.slack_client.chat_postMessage.reset_mock()
     picked = await slack_utils.pick_user_and_send_message(
-        "C000001", "C000002", "play music", picked
+        "C000001", "C000002", "play music", picked.rotation
     )
     mock_slack_api.chat_postMessage.assert_called()
     assert slack_utils.slack_client.chat_postMessage.mock_calls[0] in (
         call(channel="C000001", text="<@U1> you have been picked to play music"),
         call(channel="C000001", text="<@U2> you have been picked to play music"),
     )
-    assert picked == {"U1"} or picked == {"U2"}
+    assert picked.rotation["cursor"] == 1
+
+
+@pytest.mark.asyncio
+async def test_pick_user_and_send_message_previous_picks(mock_slack_api):
+    picked = await slack_utils.pick_user_and_send_message(
+        "C000001", "C000002", "play music", previous_user_picks={"U1"}
+    )
+    mock_slack_api.chat_postMessage.assert_called_once_with(
+        channel="C000001", text="<@U2> you have been picked to play music"
+    )
+    assert picked == (["U2"], {"order": ["U1", "U2"], "cursor": 2})
+
+
+@pytest.mark.asyncio
+async def test_pick_user_and_send_message_weighted(mock_slack_api):
+    picked = await slack_utils.pick_user_and_send_message(
+        "C000001",
+        "C000002",
+        "play music",
+        rotation={"runs": 2, "picks": {"U1": [1, 2], "U2": [1, 1]}},
+        strategy="weighted",
+    )
+    mock_slack_api.chat_postMessage.assert_called_once_with(
+        channel="C000001", text="<@U2> you have been picked to play music"
+    )
+    assert picked == (["U2"], {"runs": 3, "picks": {"U1": [1, 2], "U2": [2, 3]}})
+
+
+@pytest.mark.asyncio
+async def test_pick_user_and_send_message_several(mock_slack_api):
+    picked = await slack_utils.pick_user_and_send_message(
+        "C000001", "C000002", "review code", count=2
+    )
+    mock_slack_api.conversations_members.assert_called_once_with(channel="C000002")
+    mock_slack_api.chat_postMessage.assert_called_once()
+    assert mock_slack_api.chat_postMessage.call_args[1]["text"] in (
+        "<@U1> and <@U2> you have been picked to review code",
+        "<@U2> and <@U1> you have been picked to review code",
+    )
+    assert sorted(picked.users) == ["U1", "U2"]
+    assert picked.rotation["cursor"] == 2
+
+
+@pytest.mark.asyncio
+async def test_instrumented_web_client(mocker):
+    client = slack_utils.InstrumentedWebClient(token="xoxb", run_async=True)
+    count = SLACK_API_DURATION.get_count(method="users.info")
+    errors = ERRORS.get(source="slack")
+
+    future = asyncio.get_event_loop().create_future()
+    mocker.patch.object(WebClient, "api_call", return_value=future)
+    assert client.users_info(user="U1") is future
+    future.set_result({"ok": True})
+    await asyncio.sleep(0)  # run the done callbacks
+    assert SLACK_API_DURATION.get_count(method="users.info") == count + 1
+    assert ERRORS.get(source="slack") == errors
+
+    future = asyncio.get_event_loop().create_future()
+    WebClient.api_call.return_value = future
+    client.users_info(user="U1")
+    future.set_exception(SlackApiError("error", {"ok": False}))
+    with pytest.raises(SlackApiError):
+        await future
+    await asyncio.sleep(0)
+    assert SLACK_API_DURATION.get_count(method="users.info") == count + 2
+    assert ERRORS.get(source="slack") == errors + 1
+
+
+async def test_deduplicate_slack_retries():
+    calls = []
+    release = asyncio.Event()
+
+    @slack_utils.deduplicate_slack_retries
+    async def handler(request):
+        calls.append(request)
+        await release.wait()
+        if request.body == b"fail" and len(calls) == 1:
+            raise ValueError("oops")
+        return f"response {len(calls)}"
+
+    def fake_request(body, retry=None):
+        headers = {} if retry is None else {"X-Slack-Retry-Num": retry}
+        return SimpleNamespace(path="/slashcommand", body=body, headers=headers)
+
+    deduplicated = DEDUPLICATED_RETRIES.get()
+    original = asyncio.ensure_future(handler(fake_request(b"text=1")))
+    await asyncio.sleep(0)
+    # the retry waits for the original request in progress
+    retry = asyncio.ensure_future(handler(fake_request(b"text=1", "1")))
+    await asyncio.sleep(0)
+    release.set()
+    assert await original == "response 1"
+    assert await retry == "response 1"
+    # and later ones are answered from cache
+    assert await handler(fake_request(b"text=1", "2")) == "response 1"
+    assert len(calls) == 1
+    assert DEDUPLICATED_RETRIES.get() == deduplicated + 2
+
+    # requests that aren't retries are handled again
+    assert await handler(fake_request(b"text=1")) == "response 2"
+    assert await handler(fake_request(b"text=2", "1")) == "response 3"
+
+    # retries of failed requests are handled again
+    calls.clear()
+    with pytest.raises(ValueError):
+        await handler(fake_request(b"fail"))
+    assert await handler(fake_request(b"fail", "1")) == "response 2"